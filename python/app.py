@@ -1,11 +1,31 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import Depends, FastAPI, Header, HTTPException, Query, Request, Response
+from fastapi.exception_handlers import http_exception_handler, request_validation_exception_handler
+from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.exceptions import HTTPException as StarletteHTTPException
+from fastapi.responses import StreamingResponse
+import asyncio
+import bisect
+import inspect
 import json
 import os
 import datetime
-from typing import Dict, List, Any, Optional
-from pydantic import BaseModel
-from scraper import ContentScraper
+import threading
+from typing import Dict, Iterable, List, Any, Optional, Tuple
+from scraper import SOURCES, ContentScraper
+from store import ContentStore
+from database import ContentDatabase
+from refresh import Freshness, RefreshJob, RefreshManager
+from leader import LeaderElection, RefreshSpool
+from archive import ARCHIVE_DIR, ContentArchive, parse_bound
+from events import EventBroadcaster
+import metrics
+from payloads import (DynamicGZipMiddleware, Payload, accepts_encoding, encode_json, gzip_chunks,
+                      http_date, join_json_array, not_modified, respond)
+from models import (Article, Horoscope, Quote, Joke, BrainTeaser, YouTubeVideo,
+                    FeaturedContent, ContentItem, ItemBatch, SearchResult, FacetCounts, CONTENT_MODELS)
+from index import ARTICLE_TYPES, FACET_FIELDS, FacetIndex
+from related import TOP_K
 import uvicorn
 from apscheduler.schedulers.background import BackgroundScheduler
 
@@ -18,123 +38,350 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Next-Cursor", "Link", "X-Generation"],
 )
 
+# Cached payloads are sent precompressed by respond(); this only compresses
+# the rest, such as stats and job status
+app.add_middleware(DynamicGZipMiddleware)
+
+# Outermost, so request timings include compression
+app.add_middleware(metrics.MetricsMiddleware)
+
 # Data directory
 DATA_DIR = "./data"
 os.makedirs(DATA_DIR, exist_ok=True)
 
+# Storage backend: "files" serves generation directories, "sqlite" also keeps
+# every generation in an SQLite database and serves from it
+CONTENT_BACKEND = os.getenv("CONTENT_BACKEND", "files")
+db = ContentDatabase(os.path.join(DATA_DIR, "content.db")) if CONTENT_BACKEND == "sqlite" else None
+
 # Create a scraper instance
-scraper = ContentScraper(output_dir=DATA_DIR)
-
-# Models
-class Article(BaseModel):
-    id: str
-    title: str
-    summary: str
-    content: str
-    category: str
-    tags: List[str]
-    readTime: int
-    date: str
-    imageUrl: Optional[str] = None
-    source: Optional[str] = None
-
-class Horoscope(BaseModel):
-    id: str
-    title: str
-    summary: str
-    date: str
-    sign: str
-    prediction: str
-    imageUrl: Optional[str] = None
-
-class Quote(BaseModel):
-    id: str
-    title: str
-    summary: str
-    date: str
-    author: str
-    text: str
-    category: str
-    imageUrl: Optional[str] = None
-
-class Joke(BaseModel):
-    id: str
-    title: str
-    summary: str
-    date: str
-    text: str
-    category: str
-    imageUrl: Optional[str] = None
-
-class BrainTeaser(BaseModel):
-    id: str
-    title: str
-    summary: str
-    date: str
-    question: str
-    answer: str
-    difficulty: str
-    category: str
-    imageUrl: Optional[str] = None
-
-class YouTubeVideo(BaseModel):
-    id: str
-    title: str
-    summary: str
-    date: str
-    videoId: str
-    channelName: str
-    category: str
-    viewCount: int
-    imageUrl: Optional[str] = None
-
-class FeaturedContent(BaseModel):
-    featuredArticle: Article
-    techArticles: List[Article]
-    healthArticles: List[Article]
-    stockArticles: List[Article]
-    horoscopes: List[Horoscope]
-    quotes: List[Quote]
-    jokes: List[Joke]
-    brainTeasers: List[BrainTeaser]
-    youtubeVideos: List[YouTubeVideo]
+scraper = ContentScraper(output_dir=DATA_DIR, db=db)
 
-# Helper functions
-def load_json(filename: str) -> List[Dict[str, Any]]:
-    """Load JSON data from a file"""
-    filepath = os.path.join(DATA_DIR, filename)
-    try:
-        with open(filepath, 'r') as f:
-            return json.load(f)
-    except (FileNotFoundError, json.JSONDecodeError):
-        return []
+# Parsed content shared by every request in this process, loaded before
+# serving so the first requests don't find it empty
+store = ContentStore(DATA_DIR, db=db)
+store.load()
+
+# History of every item the scraper has published, read-only here
+archive = ContentArchive(os.path.join(DATA_DIR, ARCHIVE_DIR))
+
+# Tells connected clients about each generation published, by any process
+broadcaster = EventBroadcaster(DATA_DIR)
+
+# Runs refreshes off the event loop, sharing one run between concurrent triggers.
+# Each new generation is loaded on the refresh thread before requests see it.
+refresher = RefreshManager(scraper, on_published=lambda generation: store.load())
+
+# How long responses may be cached, from when their sources are next refreshed
+freshness = Freshness(DATA_DIR)
+
+# Headers of responses that must never be cached: job status, counters and
+# anything that changes state
+NO_STORE = {"Cache-Control": "no-store"}
+
+# Errors are sent with no-store, so that caches don't keep a 400 or 503 for as
+# long as the route's content would be fresh
+@app.exception_handler(StarletteHTTPException)
+async def http_error(request: Request, exc: StarletteHTTPException) -> Response:
+    response = await http_exception_handler(request, exc)
+    response.headers.setdefault("Cache-Control", "no-store")
+    return response
 
+@app.exception_handler(RequestValidationError)
+async def validation_error(request: Request, exc: RequestValidationError) -> Response:
+    response = await request_validation_exception_handler(request, exc)
+    response.headers.setdefault("Cache-Control", "no-store")
+    return response
+
+# Most ids /api/items:batch resolves in one request
+MAX_BATCH_IDS = 500
+
+# Most items /api/history returns in one request
+MAX_HISTORY_ITEMS = 500
+
+# Bytes of NDJSON /api/export collects before sending them
+EXPORT_CHUNK_SIZE = 64 * 1024
+
+# Longest /api/featured waits for the first generation, in seconds, before
+# answering 503
+COLD_START_TIMEOUT = 30.0
+
+# Retry-After sent with that 503, in seconds
+COLD_START_RETRY_AFTER = 10
+
+def snapshot_age() -> Optional[float]:
+    """Seconds since the served snapshot was published"""
+    updated_at = store.current().updated_at
+    return (datetime.datetime.now() - datetime.datetime.fromisoformat(updated_at)).total_seconds() if updated_at else None
+
+metrics.FunctionMetric("dailybytes_refresh_leader", "1 if this process runs refreshes",
+                       lambda: int(election.is_leader))
+metrics.FunctionMetric("dailybytes_snapshot_generation", "Generation being served", lambda: store.current().generation)
+metrics.FunctionMetric("dailybytes_snapshot_age_seconds", "Time since the served generation was published", snapshot_age)
+metrics.FunctionMetric("dailybytes_store_hits_total", "Store accesses served without checking the disk",
+                       lambda: store.hits, type="counter")
+metrics.FunctionMetric("dailybytes_store_misses_total", "Store accesses that checked the CURRENT pointer",
+                       lambda: store.misses, type="counter")
+metrics.FunctionMetric("dailybytes_store_reloads_total", "Snapshots loaded", lambda: store.reloads, type="counter")
+metrics.FunctionMetric("dailybytes_event_subscribers", "Clients connected to /api/events",
+                       lambda: broadcaster.subscribers)
+metrics.FunctionMetric("dailybytes_fetcher_requests_total", "HTTP requests made by scrapers",
+                       lambda: scraper.fetcher.requests, type="counter")
+metrics.FunctionMetric("dailybytes_fetcher_cache_hits_total", "Scraper fetches served from the HTTP cache",
+                       lambda: scraper.fetcher.cache_hits + scraper.fetcher.not_modified, type="counter")
+
+# Content type served by each section's list route
+ROUTE_TYPES = {
+    "tech": "tech_news",
+    "health": "health_tips",
+    "stocks": "stock_news",
+    "horoscopes": "horoscopes",
+    "quotes": "quotes",
+    "jokes": "jokes",
+    "brainteasers": "brain_teasers",
+    "videos": "youtube_trending",
+}
+
+# Helper functions
 def get_last_update_time() -> Optional[datetime.datetime]:
     """Get the timestamp of the last content update"""
-    filepath = os.path.join(DATA_DIR, "last_update.txt")
+    return published_at(store.current())
+
+def published_at(snapshot) -> Optional[datetime.datetime]:
+    """Get when a snapshot was published, which is when its content was last modified"""
     try:
-        with open(filepath, 'r') as f:
-            timestamp = f.read().strip()
-            return datetime.datetime.fromisoformat(timestamp)
-    except (FileNotFoundError, ValueError):
+        return datetime.datetime.fromisoformat(snapshot.updated_at) if snapshot.updated_at else None
+    except ValueError:
         return None
 
-def update_content():
-    """Run the scraper to update all content"""
-    print(f"[{datetime.datetime.now()}] Updating content...")
-    scraper.save_all_content()
-    print(f"[{datetime.datetime.now()}] Content updated successfully")
+def cache_headers(snapshot, sources: Iterable[str]) -> Dict[str, str]:
+    """Get the caching headers of a response built from some of a snapshot's sources"""
+    if not snapshot.generation:
+        # Nothing published yet, so the next request may well get content
+        return {"Cache-Control": "no-cache"}
+    return freshness.headers(sources)
+
+def respond_content(request: Request, snapshot, payload: Payload, sources: Iterable[str],
+                    headers: Optional[Dict[str, str]] = None) -> Response:
+    """Send a payload built from a snapshot, cacheable until its sources are next refreshed"""
+    return respond(request, payload, {**cache_headers(snapshot, sources), **(headers or {})},
+                   last_modified=published_at(snapshot))
+
+def parse_fields(name: str, fields: Optional[str]) -> Optional[Tuple[str, ...]]:
+    """Turn a ``fields=`` projection into model fields in declaration order, always with id"""
+    if not fields:
+        return None
+    requested = {field.strip() for field in fields.split(",") if field.strip()}
+    model_fields = list(CONTENT_MODELS[name].model_fields)
+    unknown = requested.difference(model_fields)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(sorted(unknown))}")
+    requested.add("id")
+    return tuple(field for field in model_fields if field in requested)
+
+# Query parameters that filter each facet field, as (parameter, alias, type,
+# comparison). A route only accepts the ones for its content type's fields.
+FILTER_PARAMETERS = {
+    "tags": [("tag", None, str, "equals")],
+    "source": [("source", None, str, "equals")],
+    "category": [("category", None, str, "equals")],
+    "difficulty": [("difficulty", None, str, "equals")],
+    "author": [("author", None, str, "equals")],
+    "channelName": [("channel", None, str, "equals")],
+    "readTime": [("maxReadTime", None, int, "at_most")],
+    "date": [("date_from", "from", str, "at_least"), ("date_to", "to", str, "at_most")],
+}
+
+class ContentFilters:
+    """Filters a list endpoint applies, by facet field"""
+    
+    def __init__(self, equals: Optional[Dict[str, Any]] = None, at_most: Optional[Dict[str, Any]] = None,
+                 at_least: Optional[Dict[str, Any]] = None):
+        self.equals = equals or {}
+        self.at_most = at_most or {}
+        self.at_least = at_least or {}
+    
+    def key(self) -> Tuple:
+        """Get a hashable form of the filters for caching"""
+        return (tuple(sorted(self.equals.items())), tuple(sorted(self.at_most.items())),
+                tuple(sorted(self.at_least.items())))
+    
+    def match(self, snapshot, name: str) -> int:
+        """Get the bitmap of matching items from the snapshot's facet index"""
+        return snapshot.index().facets[name].match(self.equals, self.at_most, self.at_least)
+    
+    def positions(self, snapshot, name: str) -> Optional[List[int]]:
+        """Get the positions of matching items, or None when no filter is set"""
+        if not (self.equals or self.at_most or self.at_least):
+            return None
+        return snapshot.cached(("filter", name, self.key()),
+                               lambda: FacetIndex.positions(self.match(snapshot, name)))
+
+def content_filters(name: str):
+    """Build the dependency reading a content type's filters from the query string.
+    
+    Its signature lists only the parameters of the content type's facet
+    fields, so that is all the route accepts and documents.
+    """
+    specs = [(field, parameter, kind) for field in FACET_FIELDS[name]
+             for parameter, _, _, kind in FILTER_PARAMETERS[field]]
+    
+    def dependency(**values) -> ContentFilters:
+        filters = ContentFilters()
+        for field, parameter, kind in specs:
+            if values[parameter] is not None:
+                getattr(filters, kind)[field] = values[parameter]
+        return filters
+    
+    dependency.__signature__ = inspect.Signature([
+        inspect.Parameter(parameter, inspect.Parameter.KEYWORD_ONLY, default=Query(None, alias=alias),
+                          annotation=Optional[kind])
+        for field in FACET_FIELDS[name] for parameter, alias, kind, _ in FILTER_PARAMETERS[field]
+    ])
+    return dependency
+
+def resume_position(snapshot, name: str, cursor: str) -> int:
+    """Get the position in a content type's list that a page after ``cursor`` starts from"""
+    position = snapshot.index().resume(name, cursor, len(snapshot.get(name)))
+    if position is None:
+        raise HTTPException(status_code=400, detail=f"Unknown cursor '{cursor}'")
+    return position
+
+def list_payload(snapshot, name: str, start: int, end: int,
+                 fields: Optional[Tuple[str, ...]] = None,
+                 positions: Optional[List[int]] = None, filter_key: Tuple = ()) -> Payload:
+    """Get the serialized items ``start:end`` of a content type, built once per snapshot.
+
+    With ``positions``, the range applies to just those items. Items were
+    validated against their model when the snapshot was loaded, so the body is
+    assembled from pre-encoded items without going through pydantic.
+    """
+    encoded = snapshot.encoded(name, fields)
+    
+    def build() -> Payload:
+        if positions is None:
+            return Payload(join_json_array(encoded[start:end]))
+        return Payload(join_json_array([encoded[p] for p in positions[start:end]]))
+    
+    return snapshot.cached((name, start, end, fields, filter_key), build)
+
+def list_response(request: Request, name: str, limit: Optional[int] = None,
+                  after: Optional[str] = None, fields: Optional[str] = None,
+                  filters: Optional[ContentFilters] = None) -> Response:
+    """Serve a page of a content type, optionally filtered.
+
+    ``after`` is the cursor of the last item of the previous page. When more
+    items follow, the cursor to pass next is sent in ``X-Next-Cursor`` and a
+    ``Link`` header.
+    """
+    snapshot = store.current()
+    items = snapshot.get(name)
+    positions = filters.positions(snapshot, name) if filters is not None else None
+    total = len(items) if positions is None else len(positions)
+    start = 0
+    if after is not None:
+        start = resume_position(snapshot, name, after)
+        if positions is not None:
+            start = bisect.bisect_left(positions, start)
+    end = start + slice(limit).indices(total - start)[1]
+    
+    headers = {}
+    if start < end < total:
+        last = end - 1 if positions is None else positions[end - 1]
+        next_cursor = f"{last}:{items[last]['id']}"
+        headers["X-Next-Cursor"] = next_cursor
+        headers["Link"] = f'<{request.url.include_query_params(after=next_cursor)}>; rel="next"'
+    payload = list_payload(snapshot, name, start, end, parse_fields(name, fields), positions,
+                           filters.key() if positions is not None else ())
+    return respond_content(request, snapshot, payload, (name,), headers)
+
+# Start of an item serialized together with its content type, per content type
+TYPED_PREFIXES = {name: b'{"type":' + encode_json(name) + b',"item":' for name in CONTENT_MODELS}
+
+def typed_item(snapshot, name: str, position: int) -> bytes:
+    """Serialize an item together with its content type, from its cached encoding"""
+    return TYPED_PREFIXES[name] + snapshot.encoded(name)[position] + b"}"
+
+def featured_payload(snapshot) -> Payload:
+    """Get the serialized homepage payload, built once per snapshot"""
+    def build() -> Payload:
+        tech_articles = snapshot.get("tech_news")
+        return Payload(encode_json({
+            "featuredArticle": tech_articles[0] if tech_articles else None,
+            "techArticles": tech_articles[:4],
+            "healthArticles": snapshot.get("health_tips")[:4],
+            "stockArticles": snapshot.get("stock_news")[:4],
+            "horoscopes": snapshot.get("horoscopes")[:4],
+            "quotes": snapshot.get("quotes")[:4],
+            "jokes": snapshot.get("jokes")[:4],
+            "brainTeasers": snapshot.get("brain_teasers")[:4],
+            "youtubeVideos": snapshot.get("youtube_trending")[:4]
+        }))
+    
+    return snapshot.structure("featured", build)
 
-# Schedule daily content updates
+# Only the elected leader among the processes sharing DATA_DIR scrapes. The
+# others pass manual refreshes to it through the spool and pick up its new
+# generations through the store.
 scheduler = BackgroundScheduler()
-scheduler.add_job(update_content, 'cron', hour=2, minute=0)  # Run at 2:00 AM
-scheduler.start()
+spool = RefreshSpool(DATA_DIR)
+# Spool request id -> the leader's job serving it, shared by the spool
+# poller and request handlers
+spooled_jobs: Dict[str, RefreshJob] = {}
+spooled_jobs_lock = threading.Lock()
+
+def serve_spool():
+    """Run refresh requests left by other processes and report on them"""
+    for request_id, sources in spool.drain():
+        try:
+            job = refresher.trigger(sources)
+        except ValueError as e:
+            spool.record(request_id, {"requestId": request_id, "status": "failed", "error": str(e)})
+            continue
+        with spooled_jobs_lock:
+            spooled_jobs[request_id] = job
+    with spooled_jobs_lock:
+        jobs = list(spooled_jobs.items())
+    for request_id, job in jobs:
+        spool.record(request_id, dict(job.to_dict(), requestId=request_id))
+        if job.status in ("succeeded", "failed"):
+            with spooled_jobs_lock:
+                spooled_jobs.pop(request_id, None)
+    spool.prune()
+
+def start_refreshing():
+    """Take over scheduled refreshes and the spool once elected leader"""
+    # Another process may have refreshed since this one started
+    scraper.source_state = scraper.load_source_state()
+    store.load()
+    # Refresh each source on its own interval
+    refresher.schedule(scheduler)
+    scheduler.add_job(serve_spool, 'interval', seconds=1, id="refresh-spool",
+                      coalesce=True, max_instances=1)
+    scheduler.start()
+
+election = LeaderElection(DATA_DIR, on_elected=start_refreshing)
+election.start()
+
+def request_refresh(sources: Optional[List[str]] = None) -> Tuple[str, str]:
+    """Start a refresh here if leader, or hand it to the leader; returns its id and status"""
+    if election.is_leader:
+        job = refresher.trigger(sources)
+        with spooled_jobs_lock:
+            spooled_jobs[job.id] = job
+        return job.id, job.status
+    unknown = set(sources or []) - set(SOURCES)
+    if unknown:
+        raise ValueError(f"unknown sources: {', '.join(sorted(unknown))}")
+    return spool.submit(sources), "queued"
 
 # Routes
 @app.get("/")
-async def root():
+async def root(response: Response):
+    response.headers.update(cache_headers(store.current(), SOURCES))
     last_update = get_last_update_time()
     return {
         "message": "Welcome to DailyBytes API",
@@ -148,122 +395,385 @@ async def root():
             "/api/quotes",
             "/api/jokes",
             "/api/brainteasers",
-            "/api/videos"
+            "/api/videos",
+            "/api/item/{id}",
+            "/api/search?q=",
+            "/api/items:batch?ids=",
+            "/api/export",
+            "/api/archive?category=&from=&to=",
+            "/api/history?category=&tag=&from=&to=",
+            "/api/events"
         ]
     }
 
 @app.get("/api/featured", response_model=FeaturedContent)
-async def get_featured_content():
+async def get_featured_content(request: Request):
     """Get featured content for the homepage"""
-    tech_articles = load_json("tech_news.json")
-    health_articles = load_json("health_tips.json")
-    stock_articles = load_json("stock_news.json")
-    horoscopes = load_json("horoscopes.json")
-    quotes = load_json("quotes.json")
-    jokes = load_json("jokes.json")
-    brain_teasers = load_json("brain_teasers.json")
-    youtube_videos = load_json("youtube_trending.json")
+    snapshot = store.current()
     
-    # If any data is missing, run the scraper
-    if not all([tech_articles, health_articles, stock_articles, horoscopes, quotes, jokes, brain_teasers, youtube_videos]):
-        update_content()
-        
-        # Reload data
-        tech_articles = load_json("tech_news.json")
-        health_articles = load_json("health_tips.json")
-        stock_articles = load_json("stock_news.json")
-        horoscopes = load_json("horoscopes.json")
-        quotes = load_json("quotes.json")
-        jokes = load_json("jokes.json")
-        brain_teasers = load_json("brain_teasers.json")
-        youtube_videos = load_json("youtube_trending.json")
+    # If any data is missing, refresh it in the background. Only wait for it
+    # when nothing has been published yet, and not for longer than
+    # COLD_START_TIMEOUT; otherwise keep serving the last snapshot. Followers
+    # leave the refresh to the leader, which starts every source that was
+    # never fetched as soon as it is elected.
+    if not snapshot.is_complete():
+        if election.is_leader:
+            job = refresher.trigger([name for name in SOURCES if not snapshot.get(name)])
+            if snapshot.generation == 0:
+                try:
+                    # Shielded, so a timeout doesn't cancel the job's future for other waiters
+                    await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(job.future)), COLD_START_TIMEOUT)
+                except Exception:
+                    # Timed out, or every attempt failed
+                    pass
+        elif snapshot.generation == 0:
+            for _ in range(int(COLD_START_TIMEOUT / 0.5)):
+                await asyncio.sleep(0.5)
+                if store.current().generation:
+                    break
+        snapshot = store.current()
+        if snapshot.generation == 0:
+            raise HTTPException(status_code=503, detail="Content is not available yet",
+                                headers={"Retry-After": str(COLD_START_RETRY_AFTER), **NO_STORE})
     
-    return {
-        "featuredArticle": tech_articles[0] if tech_articles else None,
-        "techArticles": tech_articles[:4],
-        "healthArticles": health_articles[:4],
-        "stockArticles": stock_articles[:4],
-        "horoscopes": horoscopes[:4],
-        "quotes": quotes[:4],
-        "jokes": jokes[:4],
-        "brainTeasers": brain_teasers[:4],
-        "youtubeVideos": youtube_videos[:4]
-    }
+    return respond_content(request, snapshot, featured_payload(snapshot), SOURCES)
 
 @app.get("/api/tech", response_model=List[Article])
-async def get_tech_articles(limit: int = 10):
+async def get_tech_articles(request: Request, limit: int = 10, after: Optional[str] = None,
+                            fields: Optional[str] = None,
+                            filters: ContentFilters = Depends(content_filters("tech_news"))):
     """Get tech news articles"""
-    articles = load_json("tech_news.json")
-    return articles[:limit]
+    return list_response(request, "tech_news", limit, after, fields, filters)
 
 @app.get("/api/health", response_model=List[Article])
-async def get_health_articles(limit: int = 10):
+async def get_health_articles(request: Request, limit: int = 10, after: Optional[str] = None,
+                              fields: Optional[str] = None,
+                              filters: ContentFilters = Depends(content_filters("health_tips"))):
     """Get health tips articles"""
-    articles = load_json("health_tips.json")
-    return articles[:limit]
+    return list_response(request, "health_tips", limit, after, fields, filters)
 
 @app.get("/api/stocks", response_model=List[Article])
-async def get_stock_articles(limit: int = 10):
+async def get_stock_articles(request: Request, limit: int = 10, after: Optional[str] = None,
+                             fields: Optional[str] = None,
+                             filters: ContentFilters = Depends(content_filters("stock_news"))):
     """Get stock market news articles"""
-    articles = load_json("stock_news.json")
-    return articles[:limit]
+    return list_response(request, "stock_news", limit, after, fields, filters)
 
 @app.get("/api/horoscopes", response_model=List[Horoscope])
-async def get_all_horoscopes():
+async def get_all_horoscopes(request: Request, limit: Optional[int] = None, after: Optional[str] = None,
+                             fields: Optional[str] = None,
+                             filters: ContentFilters = Depends(content_filters("horoscopes"))):
     """Get daily horoscopes for all signs"""
-    horoscopes = load_json("horoscopes.json")
-    return horoscopes
+    return list_response(request, "horoscopes", limit, after, fields, filters)
 
 @app.get("/api/horoscopes/{sign}", response_model=Horoscope)
-async def get_horoscope_by_sign(sign: str):
+async def get_horoscope_by_sign(request: Request, sign: str):
     """Get horoscope for a specific sign"""
-    horoscopes = load_json("horoscopes.json")
-    for horoscope in horoscopes:
-        if horoscope["sign"].lower() == sign.lower():
-            return horoscope
-    raise HTTPException(status_code=404, detail=f"Horoscope for sign '{sign}' not found")
+    snapshot = store.current()
+    position = snapshot.index().locate_sign(sign)
+    if position is None:
+        raise HTTPException(status_code=404, detail=f"Horoscope for sign '{sign}' not found")
+    return respond_content(request, snapshot, snapshot.item_payload("horoscopes", position), ("horoscopes",))
 
 @app.get("/api/quotes", response_model=List[Quote])
-async def get_quotes(limit: int = 10):
+async def get_quotes(request: Request, limit: int = 10, after: Optional[str] = None,
+                     fields: Optional[str] = None,
+                     filters: ContentFilters = Depends(content_filters("quotes"))):
     """Get motivational quotes"""
-    quotes = load_json("quotes.json")
-    return quotes[:limit]
+    return list_response(request, "quotes", limit, after, fields, filters)
 
 @app.get("/api/jokes", response_model=List[Joke])
-async def get_jokes(limit: int = 10):
+async def get_jokes(request: Request, limit: int = 10, after: Optional[str] = None,
+                    fields: Optional[str] = None,
+                    filters: ContentFilters = Depends(content_filters("jokes"))):
     """Get daily jokes"""
-    jokes = load_json("jokes.json")
-    return jokes[:limit]
+    return list_response(request, "jokes", limit, after, fields, filters)
 
 @app.get("/api/brainteasers", response_model=List[BrainTeaser])
-async def get_brain_teasers(limit: int = 10):
+async def get_brain_teasers(request: Request, limit: int = 10, after: Optional[str] = None,
+                            fields: Optional[str] = None,
+                            filters: ContentFilters = Depends(content_filters("brain_teasers"))):
     """Get brain teasers and puzzles"""
-    teasers = load_json("brain_teasers.json")
-    return teasers[:limit]
+    return list_response(request, "brain_teasers", limit, after, fields, filters)
 
 @app.get("/api/videos", response_model=List[YouTubeVideo])
-async def get_youtube_videos(limit: int = 10):
+async def get_youtube_videos(request: Request, limit: int = 10, after: Optional[str] = None,
+                             fields: Optional[str] = None,
+                             filters: ContentFilters = Depends(content_filters("youtube_trending"))):
     """Get trending YouTube videos"""
-    videos = load_json("youtube_trending.json")
-    return videos[:limit]
+    return list_response(request, "youtube_trending", limit, after, fields, filters)
 
 @app.get("/api/article/{article_id}", response_model=Article)
-async def get_article_by_id(article_id: str):
+async def get_article_by_id(request: Request, article_id: str):
     """Get a specific article by ID"""
-    # Try to find in each article category
-    for category in ["tech_news.json", "health_tips.json", "stock_news.json"]:
-        articles = load_json(category)
-        for article in articles:
-            if article["id"] == article_id:
-                return article
+    snapshot = store.current()
+    location = snapshot.index().locate(article_id)
+    if location is None or location[0] not in ARTICLE_TYPES:
+        raise HTTPException(status_code=404, detail=f"Article with ID '{article_id}' not found")
+    return respond_content(request, snapshot, snapshot.item_payload(*location), (location[0],))
+
+@app.get("/api/article/{article_id}/related", response_model=List[Article])
+async def get_related_articles(request: Request, article_id: str, limit: int = 4):
+    """Get the articles most similar to an article"""
+    snapshot = store.current()
+    index = snapshot.index()
+    location = index.locate(article_id)
+    if location is None or location[0] not in ARTICLE_TYPES:
+        raise HTTPException(status_code=404, detail=f"Article with ID '{article_id}' not found")
+    # The table keeps TOP_K neighbours, so larger limits are all the same page
+    limit = max(0, min(limit, TOP_K))
+    
+    def build() -> Payload:
+        body = []
+        for other, _ in snapshot.related().related(article_id, limit):
+            other_location = index.locate(other)
+            if other_location is not None:
+                body.append(snapshot.encoded(other_location[0])[other_location[1]])
+        return Payload(join_json_array(body))
+    
+    return respond_content(request, snapshot, snapshot.cached(("related", article_id, limit), build), ARTICLE_TYPES)
+
+@app.get("/api/item/{item_id}", response_model=ContentItem)
+async def get_item_by_id(request: Request, item_id: str):
+    """Get any content item by ID, along with its content type"""
+    snapshot = store.current()
+    location = snapshot.index().locate(item_id)
+    if location is None:
+        raise HTTPException(status_code=404, detail=f"Item with ID '{item_id}' not found")
+    
+    name, position = location
+    return respond_content(request, snapshot, snapshot.cached(
+        ("typed_item", name, position), lambda: Payload(typed_item(snapshot, name, position))
+    ), (name,))
+
+@app.get("/api/items:batch", response_model=ItemBatch)
+async def get_items_batch(request: Request, ids: str):
+    """Get many content items by ID in one request, with the IDs that were not found"""
+    requested = tuple(dict.fromkeys(item_id for item_id in ids.split(",") if item_id))
+    if len(requested) > MAX_BATCH_IDS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_IDS} ids per request")
+    snapshot = store.current()
     
-    raise HTTPException(status_code=404, detail=f"Article with ID '{article_id}' not found")
+    # Any set of ids can be asked for, so the body is joined from the cached
+    # item encodings on every request rather than cached itself
+    index = snapshot.index()
+    body = []
+    missing = []
+    for item_id in requested:
+        location = index.locate(item_id)
+        if location is None:
+            missing.append(item_id)
+        else:
+            body.append(typed_item(snapshot, *location))
+    payload = Payload(b'{"items":' + join_json_array(body) + b',"missing":' + encode_json(missing) + b"}",
+                      cacheable=False)
+    return respond_content(request, snapshot, payload, SOURCES)
+
+@app.get("/api/export")
+async def export_content(request: Request, types: Optional[str] = None, after: Optional[str] = None):
+    """Stream every item of every section, or of a comma-separated list of them, as NDJSON.
+
+    Each line is ``{"type": ..., "item": ...}``. To resume an interrupted
+    export, pass the type and id of the last line received as
+    ``after=<type>:<id>``. The response is gzipped when the client accepts it.
+    """
+    names = list(CONTENT_MODELS)
+    if types:
+        names = []
+        for section in types.split(","):
+            name = ROUTE_TYPES.get(section, section)
+            if name not in CONTENT_MODELS:
+                raise HTTPException(status_code=400, detail=f"Unknown section '{section}'")
+            names.append(name)
+
+    # The export reads one snapshot throughout, even if a new one is published meanwhile
+    snapshot = store.current()
+    start = (0, 0)
+    if after is not None:
+        name, _, item_id = after.partition(":")
+        location = snapshot.index().locate(item_id)
+        if name not in names or location is None or location[0] != name:
+            raise HTTPException(status_code=400, detail=f"Unknown cursor '{after}'")
+        start = (names.index(name), location[1] + 1)
+
+    def lines():
+        chunk = []
+        size = 0
+        for number in range(start[0], len(names)):
+            name = names[number]
+            prefix = TYPED_PREFIXES[name]
+            encoded = snapshot.encoded(name)
+            for position in range(start[1] if number == start[0] else 0, len(encoded)):
+                line = prefix + encoded[position] + b"}\n"
+                chunk.append(line)
+                size += len(line)
+                if size >= EXPORT_CHUNK_SIZE:
+                    yield b"".join(chunk)
+                    chunk, size = [], 0
+        if chunk:
+            yield b"".join(chunk)
+
+    headers = {"X-Generation": str(snapshot.generation), "Vary": "Accept-Encoding",
+               **cache_headers(snapshot, names)}
+    last_modified = published_at(snapshot)
+    if last_modified is not None:
+        headers["Last-Modified"] = http_date(last_modified)
+        if not_modified(request, last_modified=last_modified):
+            return Response(status_code=304, headers=headers)
+    if accepts_encoding(request, "gzip"):
+        headers["Content-Encoding"] = "gzip"
+        return StreamingResponse(gzip_chunks(lines()), media_type="application/x-ndjson", headers=headers)
+    return StreamingResponse(lines(), media_type="application/x-ndjson", headers=headers)
+
+def facets_route(name: str):
+    """Build the facet counts route of a content type, taking just its filters"""
+    async def get_facets(request: Request, filters: ContentFilters = Depends(content_filters(name))):
+        """Count the items of a section for each filter value, with the given filters applied"""
+        snapshot = store.current()
+        
+        def build() -> Payload:
+            facets = snapshot.index().facets[name]
+            bitmap = filters.match(snapshot, name)
+            return Payload(encode_json({"total": FacetIndex.count(bitmap), "facets": facets.counts(bitmap)}))
+        
+        return respond_content(request, snapshot, snapshot.cached(("facets", name, filters.key()), build), (name,))
+    return get_facets
+
+for section, name in ROUTE_TYPES.items():
+    app.get(f"/api/facets/{section}", response_model=FacetCounts, name=f"get_facets_{section}")(facets_route(name))
+
+@app.get("/api/search", response_model=List[SearchResult])
+async def search_content(request: Request, q: str, limit: int = 10, type: Optional[str] = None):
+    """Search articles, quotes, jokes and brain teasers, best matches first"""
+    types = None
+    if type:
+        types = []
+        for section in filter(None, (part.strip() for part in type.split(","))):
+            name = ROUTE_TYPES.get(section, section)
+            if name not in CONTENT_MODELS:
+                raise HTTPException(status_code=400, detail=f"Unknown section '{section}'")
+            types.append(name)
+    snapshot = store.current()
+    results = snapshot.search_index().search(q, max(0, min(limit, 100)), types)
+    
+    index = snapshot.index()
+    body = []
+    for score, name, item_id in results:
+        location = index.locate(item_id)
+        if location is None or location[0] != name:
+            continue
+        body.append(b'{"type":' + encode_json(name) + b',"score":' + encode_json(score)
+                    + b',"item":' + snapshot.encoded(name)[location[1]] + b"}")
+    return respond_content(request, snapshot, Payload(join_json_array(body), cacheable=False), types or SOURCES)
+
+@app.get("/api/archive")
+async def get_archive(category: Optional[str] = None,
+                      date_from: Optional[str] = Query(None, alias="from"),
+                      date_to: Optional[str] = Query(None, alias="to")):
+    """Stream archived items as NDJSON, for one section or all, between two dates or times.
+
+    Defaults to everything archived today. Records are read from disk as
+    the response is sent, so a year costs no more memory than a day.
+    """
+    if category is None:
+        categories = list(CONTENT_MODELS)
+    else:
+        name = ROUTE_TYPES.get(category, category)
+        if name not in CONTENT_MODELS:
+            raise HTTPException(status_code=400, detail=f"Unknown category '{category}'")
+        categories = [name]
+    try:
+        start = parse_bound(date_from) if date_from else datetime.datetime.combine(datetime.date.today(), datetime.time())
+        end = parse_bound(date_to, end=True) if date_to else datetime.datetime.now()
+    except ValueError:
+        raise HTTPException(status_code=400, detail="'from' and 'to' must be ISO dates or datetimes")
+    if start > end:
+        raise HTTPException(status_code=400, detail="'from' must not be after 'to'")
+    # No Last-Modified: records are archived just after their generation is published
+    return StreamingResponse(archive.query(categories, start, end), media_type="application/x-ndjson",
+                             headers=freshness.headers(categories))
+
+@app.get("/api/history", response_model=List[Dict[str, Any]])
+async def get_history(category: Optional[str] = None, tag: Optional[str] = None,
+                      date_from: Optional[str] = Query(None, alias="from"),
+                      date_to: Optional[str] = Query(None, alias="to"), limit: int = 100):
+    """Find items in every stored generation, newest version of each, latest dated first.
+
+    Only available with CONTENT_BACKEND=sqlite. The query runs on one of the
+    database's pooled read-only connections, off the event loop.
+    """
+    if db is None:
+        raise HTTPException(status_code=404, detail="History requires CONTENT_BACKEND=sqlite")
+    name = None
+    if category is not None:
+        name = ROUTE_TYPES.get(category, category)
+        if name not in CONTENT_MODELS:
+            raise HTTPException(status_code=400, detail=f"Unknown category '{category}'")
+    items = await asyncio.to_thread(db.query, name, tag, date_from, date_to,
+                                    max(0, min(limit, MAX_HISTORY_ITEMS)))
+    return Response(encode_json(items), media_type="application/json",
+                    headers=freshness.headers([name] if name else CONTENT_MODELS))
+
+@app.get("/api/events")
+async def stream_events(last_event_id: Optional[str] = Header(None)):
+    """Stream an event for every content update, as Server-Sent Events.
+
+    Each ``generation`` event carries the generation published and the ids
+    added, changed and removed in each section. Reconnecting with the
+    Last-Event-ID header replays the events missed in between.
+    """
+    try:
+        resume = int(last_event_id) if last_event_id else None
+    except ValueError:
+        resume = None
+    return StreamingResponse(broadcaster.stream(resume), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    """Expose this process's metrics in the Prometheus text format"""
+    return Response(metrics.REGISTRY.render(), media_type="text/plain; version=0.0.4; charset=utf-8",
+                    headers=NO_STORE)
+
+@app.get("/api/stats")
+async def get_stats(response: Response):
+    """Get content store cache counters"""
+    response.headers.update(NO_STORE)
+    return dict(store.stats(), leader=election.is_leader)
 
 @app.get("/api/update")
-async def trigger_update():
-    """Manually trigger content update"""
-    update_content()
-    return {"message": "Content update triggered", "timestamp": datetime.datetime.now().isoformat()}
+async def trigger_update(response: Response, sources: Optional[str] = None):
+    """Manually trigger content update, of every source or a comma-separated list of them"""
+    response.headers.update(NO_STORE)
+    try:
+        job_id, status = request_refresh(sources.split(",") if sources else None)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e), headers=NO_STORE)
+    return {
+        "message": "Content update triggered",
+        "jobId": job_id,
+        "status": status,
+        "timestamp": datetime.datetime.now().isoformat()
+    }
+
+@app.get("/api/jobs")
+async def get_update_jobs(response: Response, limit: int = 20):
+    """Get the most recent content updates run by this process, newest first"""
+    response.headers.update(NO_STORE)
+    return [job.to_dict() for job in refresher.jobs(limit)]
+
+@app.get("/api/update/{job_id}")
+async def get_update_status(response: Response, job_id: str):
+    """Get the progress of a content update"""
+    response.headers.update(NO_STORE)
+    job = refresher.get(job_id)
+    if job is not None:
+        return job.to_dict()
+    # Jobs started on the leader, for requests taken by any process
+    status = spool.status(job_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail=f"Update job '{job_id}' not found")
+    return status
 
 # Run the server
 if __name__ == "__main__":
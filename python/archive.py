@@ -0,0 +1,187 @@
+import json
+import os
+from bisect import bisect_left
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# Directory of the archive inside the scraper's output directory
+ARCHIVE_DIR = "archive"
+
+# A sparse index entry is written for every INDEX_INTERVAL records of a segment
+INDEX_INTERVAL = 64
+
+
+def parse_bound(value: str, end: bool = False) -> datetime:
+    """Parse a from/to query bound given as a date or an ISO datetime.
+
+    A bare date as the upper bound covers the whole of that day. Archive
+    times are naive local time, so a bound with an offset is converted to
+    local time before its tzinfo is dropped.
+    """
+    parsed = datetime.fromisoformat(value)
+    if end and len(value) == 10:
+        parsed += timedelta(days=1) - timedelta(microseconds=1)
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone()
+    return parsed.replace(tzinfo=None)
+
+
+class ContentArchive:
+    """Append-only history of every item a scrape added or changed.
+
+    Records are appended as JSON lines to one segment per content type and
+    day, ``<category>/<YYYY-MM-DD>.jsonl``, so past segments are never
+    rewritten. Next to each segment a sparse ``.idx`` file holds the line
+    number, byte offset and archive time of every INDEX_INTERVAL-th record,
+    which lets a query seek straight to its start time instead of scanning
+    the day from the beginning. Queries are generators reading one line at
+    a time, so memory stays flat however many days they cover.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    def append(self, generation: int, content: Dict[str, List[Dict[str, Any]]],
+               changes: Dict[str, Dict[str, List[str]]]):
+        """Archive the items a generation added or changed"""
+        archived = datetime.now()
+        stamp = archived.isoformat(timespec="microseconds")
+        for category, diff in changes.items():
+            change_of = {item_id: "added" for item_id in diff.get("added", [])}
+            change_of.update({item_id: "changed" for item_id in diff.get("changed", [])})
+            lines = [
+                json.dumps({"archived": stamp, "generation": generation, "category": category,
+                            "change": change_of[item["id"]], "item": item},
+                           separators=(",", ":"), ensure_ascii=False).encode("utf-8") + b"\n"
+                for item in content.get(category, []) if item["id"] in change_of
+            ]
+            if lines:
+                self._append_segment(category, archived.date(), stamp, lines)
+
+    def _append_segment(self, category: str, day: date, stamp: str, lines: List[bytes]):
+        """Append lines to a day's segment and extend its sparse index"""
+        directory = os.path.join(self.directory, category)
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{day.isoformat()}.jsonl")
+        self._repair_tail(path)
+        index = self._read_index(path)
+        with open(path, 'ab') as f:
+            offset = f.tell()
+            line_number = self._count_lines(path, index, offset)
+            entries = []
+            for line in lines:
+                if line_number % INDEX_INTERVAL == 0:
+                    entries.append(f"{line_number} {offset} {stamp}\n")
+                f.write(line)
+                offset += len(line)
+                line_number += 1
+            f.flush()
+            os.fsync(f.fileno())
+        if entries:
+            with open(f"{path[:-len('.jsonl')]}.idx", 'a') as f:
+                f.writelines(entries)
+                f.flush()
+                os.fsync(f.fileno())
+
+    @staticmethod
+    def _repair_tail(path: str):
+        """Cut off a partial last line left by an append that was interrupted"""
+        try:
+            with open(path, 'rb+') as f:
+                size = f.seek(0, os.SEEK_END)
+                end = size
+                while end > 0:
+                    f.seek(max(0, end - 65536))
+                    chunk = f.read(end - max(0, end - 65536))
+                    newline = chunk.rfind(b"\n")
+                    if newline >= 0:
+                        end = max(0, end - 65536) + newline + 1
+                        break
+                    end = max(0, end - 65536)
+                if end < size:
+                    f.truncate(end)
+        except FileNotFoundError:
+            pass
+
+    @staticmethod
+    def _count_lines(path: str, index: List[Tuple[int, int, str]], size: int) -> int:
+        """Count a segment's lines, reading only what follows its last index entry"""
+        line_number, offset = (index[-1][0], index[-1][1]) if index else (0, 0)
+        if offset >= size:
+            return line_number
+        with open(path, 'rb') as f:
+            f.seek(offset)
+            return line_number + sum(chunk.count(b"\n") for chunk in iter(lambda: f.read(65536), b""))
+
+    @staticmethod
+    def _read_index(segment_path: str) -> List[Tuple[int, int, str]]:
+        """Load a segment's sparse index as (line, offset, archived) entries"""
+        try:
+            with open(f"{segment_path[:-len('.jsonl')]}.idx", 'r') as f:
+                entries = []
+                for line in f:
+                    line_number, offset, stamp = line.split()
+                    entries.append((int(line_number), int(offset), stamp))
+                return entries
+        except (OSError, ValueError):
+            return []
+
+    def categories(self) -> List[str]:
+        """List the content types with archived records"""
+        try:
+            return sorted(name for name in os.listdir(self.directory)
+                          if os.path.isdir(os.path.join(self.directory, name)))
+        except FileNotFoundError:
+            return []
+
+    def query(self, categories: List[str], start: datetime, end: datetime) -> Iterator[bytes]:
+        """Yield the raw JSON lines of records archived between start and end, oldest first per day"""
+        first_day, last_day = start.date().isoformat(), end.date().isoformat()
+        start_stamp = start.isoformat(timespec="microseconds")
+        end_stamp = end.isoformat(timespec="microseconds")
+        for day in self._days(categories, first_day, last_day):
+            for category in categories:
+                path = os.path.join(self.directory, category, f"{day}.jsonl")
+                if not os.path.exists(path):
+                    continue
+                whole_day = first_day < day < last_day
+                yield from self._scan(path, None if whole_day else start_stamp,
+                                      None if whole_day else end_stamp)
+
+    def _days(self, categories: List[str], first_day: str, last_day: str) -> List[str]:
+        """List the days with a segment in range for any of the categories"""
+        days = set()
+        for category in categories:
+            try:
+                names = os.listdir(os.path.join(self.directory, category))
+            except FileNotFoundError:
+                continue
+            for name in names:
+                if name.endswith(".jsonl") and first_day <= name[:-len(".jsonl")] <= last_day:
+                    days.add(name[:-len(".jsonl")])
+        return sorted(days)
+
+    def _scan(self, path: str, start_stamp: Optional[str], end_stamp: Optional[str]) -> Iterator[bytes]:
+        """Yield a segment's lines within the bounds, seeking to the start with the sparse index"""
+        offset = 0
+        if start_stamp is not None:
+            index = self._read_index(path)
+            # Records before the last entry archived before the start are all too old
+            position = bisect_left([stamp for _, _, stamp in index], start_stamp) - 1
+            if position >= 0:
+                offset = index[position][1]
+        with open(path, 'rb') as f:
+            f.seek(offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    # A record still being appended
+                    return
+                if start_stamp is None and end_stamp is None:
+                    yield line
+                    continue
+                stamp = json.loads(line)["archived"]
+                if start_stamp is not None and stamp < start_stamp:
+                    continue
+                if end_stamp is not None and stamp > end_stamp:
+                    return
+                yield line
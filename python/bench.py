@@ -0,0 +1,614 @@
+import argparse
+import asyncio
+import contextlib
+import http.client
+import io
+import json
+import os
+import platform
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import timeit
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from pydantic import TypeAdapter
+
+from models import Article
+import snapshots
+from fetcher import Fetcher
+from payloads import Payload, join_json_array
+from scraper import SOURCES, ContentScraper
+from store import ContentStore, Snapshot
+
+# Benchmarks for the API hot paths, the scraper and data-size scaling.
+# Run with: python bench.py --help
+
+# Routes timed by default, with the request path used for each. Paths refer
+# to ids the mock scrapers always produce.
+ROUTES = {
+    "root": "/",
+    "featured": "/api/featured",
+    "tech": "/api/tech?limit=10",
+    "tech_fields": "/api/tech?limit=10&fields=title,date",
+    "horoscopes": "/api/horoscopes",
+    "horoscope": "/api/horoscopes/Aries",
+    "quotes": "/api/quotes?limit=10",
+    "videos": "/api/videos?limit=10",
+    "article": "/api/article/1000",
+    "related": "/api/article/1000/related",
+    "item": "/api/item/200",
+    "batch": "/api/items:batch?ids=1000,2000,3000,200,300,400,500",
+    "facets": "/api/facets/tech",
+    "search": "/api/search?q=market",
+    "export": "/api/export",
+    "archive": "/api/archive?category=jokes",
+    "stats": "/api/stats",
+    "metrics": "/metrics",
+}
+
+# Routes timed at each data size, where {middle} is the id of the middle
+# item of the scaled section
+SCALING_ROUTES = {
+    "featured": "/api/featured",
+    "quotes": "/api/quotes?limit=10",
+    "quotes_page": "/api/quotes?limit=100&after={middle}",
+    "item": "/api/item/{middle}",
+    "batch": "/api/items:batch?ids={middle},1000,200",
+    "search": "/api/search?q=success&type=quotes",
+    "export": "/api/export?types=quotes",
+}
+
+# Data sizes, in items of the scaled section, measured by the scaling suite
+SCALE_SIZES = (10, 100, 1000, 10_000, 100_000, 1_000_000)
+
+# Section grown by the scaling suite. Quotes have no related-articles table,
+# whose full rebuild is quadratic in the number of articles, so publishing
+# stays linear and the suite measures serving rather than that rebuild.
+SCALE_SECTION = "quotes"
+
+# Ids of scaled items start here, clear of the ids the mock scrapers use
+SCALE_BASE_ID = 10_000_000
+
+# A route only counts as slower when its latency also grew by this many
+# milliseconds, so noise on sub-millisecond routes doesn't fail a run
+REGRESSION_FLOOR_MS = 0.2
+
+# Fraction a route's latency may grow by over the baseline before the run
+# fails. Medians over DEFAULT_REPEATS sweeps of the same tree still differ by
+# up to about 15% between back-to-back runs, so this sits above that.
+REGRESSION_THRESHOLD = 0.25
+
+# Sweeps over the routes per run; route timings are the median sweep's
+DEFAULT_REPEATS = 5
+
+# Headers sent with every request, like a browser would
+DEFAULT_HEADERS = (("accept-encoding", "gzip"),)
+
+
+def _per_call_us(func, number: int) -> float:
+    """Get the best per-call time of a function in microseconds"""
+    return min(timeit.repeat(func, number=number, repeat=5)) / number * 1e6
+
+
+def bench_validation(limits: Tuple[int, ...] = (10, 1000)) -> List[Dict[str, Any]]:
+    """Compare per-request CPU of validating a list response against serving cached bytes.
+
+    ``validated`` does what FastAPI does for a ``response_model`` route:
+    validate every item, dump it to JSON-compatible data and encode it.
+    ``prebuilt`` joins items that were validated and encoded once per snapshot,
+    which is what a cache miss costs; ``cached`` is the steady state, a lookup
+    of the finished payload.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        scraper = ContentScraper(output_dir=directory, fetcher=Fetcher(), archive=False)
+        items = scraper._generate_mock_articles("tech", max(limits))
+    adapter = TypeAdapter(List[Article])
+    snapshot = Snapshot(1, {"tech_news": items})
+    encoded = snapshot.encoded("tech_news")
+
+    results = []
+    for limit in limits:
+        number = max(10, 20000 // limit)
+
+        def validated():
+            data = adapter.dump_python(adapter.validate_python(items[:limit]), mode="json")
+            return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+        def prebuilt():
+            return Payload(join_json_array(encoded[:limit]))
+
+        def cached():
+            return snapshot.cached(("tech_news", limit), prebuilt)
+
+        assert json.loads(validated()) == json.loads(prebuilt().body)
+        row = {
+            "limit": limit,
+            "validated_us": round(_per_call_us(validated, number), 1),
+            "prebuilt_us": round(_per_call_us(prebuilt, number), 1),
+            "cached_us": round(_per_call_us(cached, number * 10), 2),
+        }
+        row["saved_us"] = round(row["validated_us"] - row["cached_us"], 1)
+        results.append(row)
+    return results
+
+
+def percentile(sorted_values: Sequence[float], fraction: float) -> float:
+    """Get the nearest-rank percentile of already sorted values"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, min(len(sorted_values), round(fraction * len(sorted_values) + 0.5)))
+    return sorted_values[rank - 1]
+
+
+def summarize(latencies: List[float], wall: float, errors: int) -> Dict[str, Any]:
+    """Turn per-request latencies in seconds into latency percentiles and throughput"""
+    ordered = sorted(latencies)
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "throughput_rps": round(len(latencies) / wall, 1) if wall > 0 else 0.0,
+        "mean_ms": round(statistics.fmean(ordered) * 1000, 3) if ordered else 0.0,
+        "p50_ms": round(percentile(ordered, 0.50) * 1000, 3),
+        "p95_ms": round(percentile(ordered, 0.95) * 1000, 3),
+        "p99_ms": round(percentile(ordered, 0.99) * 1000, 3),
+        "max_ms": round(ordered[-1] * 1000, 3) if ordered else 0.0,
+    }
+
+
+@contextlib.contextmanager
+def quiet():
+    """Silence the progress the scraper prints while it is being timed"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
+
+
+def scaled_items(scraper: ContentScraper, count: int) -> List[Dict[str, Any]]:
+    """Build ``count`` mock items of SCALE_SECTION with ids clear of the mock scrapers'"""
+    today = datetime.now()
+    return [scraper.mock_item(SCALE_SECTION, str(SCALE_BASE_ID + i), i, today) for i in range(count)]
+
+
+def seed_data(data_dir: str) -> ContentScraper:
+    """Publish one run of every source into a data directory.
+
+    Every source is then marked as just fetched, so an app started on the
+    directory serves this generation instead of refreshing right away.
+    Near-duplicate filtering is off so the ids in ROUTES always exist.
+    """
+    scraper = ContentScraper(output_dir=data_dir, deduplicate=False)
+    with quiet():
+        scraper.save_all_content()
+    return scraper
+
+
+class ASGIDriver:
+    """Sends requests straight to the ASGI app, with no server or sockets in between"""
+
+    def __init__(self, app, headers: Sequence[Tuple[str, str]] = DEFAULT_HEADERS):
+        self.app = app
+        self.headers = [(name.encode("latin-1"), value.encode("latin-1")) for name, value in headers]
+
+    async def get(self, target: str) -> int:
+        """Send a GET and drain its response; returns the status"""
+        path, _, query = target.partition("?")
+        scope = {
+            "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+            "method": "GET", "scheme": "http", "path": path, "raw_path": path.encode(),
+            "root_path": "", "query_string": query.encode(),
+            "headers": [(b"host", b"bench")] + self.headers,
+            "client": ("127.0.0.1", 0), "server": ("bench", 80),
+        }
+        status = 0
+        requested = False
+        finished = asyncio.Event()
+
+        async def receive():
+            nonlocal requested
+            if not requested:
+                requested = True
+                return {"type": "http.request", "body": b"", "more_body": False}
+            # Streaming responses listen for a disconnect until they finish
+            await finished.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body" and not message.get("more_body", False):
+                finished.set()
+
+        await self.app(scope, receive, send)
+        finished.set()
+        return status
+
+    def run(self, target: str, requests: int, concurrency: int) -> Dict[str, Any]:
+        """Send ``requests`` GETs from ``concurrency`` concurrent clients and summarize them"""
+        return asyncio.run(self._run(target, requests, concurrency))
+
+    async def _run(self, target: str, requests: int, concurrency: int) -> Dict[str, Any]:
+        latencies: List[float] = []
+        errors = 0
+        remaining = requests
+
+        async def client():
+            nonlocal remaining, errors
+            while remaining > 0:
+                remaining -= 1
+                start = time.perf_counter()
+                status = await self.get(target)
+                latencies.append(time.perf_counter() - start)
+                if status >= 400:
+                    errors += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(client() for _ in range(concurrency)))
+        return summarize(latencies, time.perf_counter() - start, errors)
+
+
+class HTTPDriver:
+    """Sends requests to a running server over keep-alive connections, one thread per client"""
+
+    def __init__(self, host: str, port: int, headers: Sequence[Tuple[str, str]] = DEFAULT_HEADERS):
+        self.host = host
+        self.port = port
+        self.headers = dict(headers)
+
+    def get(self, connection: http.client.HTTPConnection, target: str) -> int:
+        """Send a GET on a connection and read its whole body; returns the status"""
+        connection.request("GET", target, headers=self.headers)
+        response = connection.getresponse()
+        response.read()
+        return response.status
+
+    def run(self, target: str, requests: int, concurrency: int) -> Dict[str, Any]:
+        """Send ``requests`` GETs from ``concurrency`` concurrent clients and summarize them"""
+        latencies: List[float] = []
+        errors = 0
+        remaining = requests
+        lock = threading.Lock()
+
+        def client():
+            nonlocal remaining, errors
+            connection = http.client.HTTPConnection(self.host, self.port, timeout=60)
+            try:
+                while True:
+                    with lock:
+                        if remaining <= 0:
+                            return
+                        remaining -= 1
+                    start = time.perf_counter()
+                    try:
+                        status = self.get(connection, target)
+                    except (OSError, http.client.HTTPException):
+                        connection.close()
+                        status = 599
+                    elapsed = time.perf_counter() - start
+                    with lock:
+                        latencies.append(elapsed)
+                        if status >= 400:
+                            errors += 1
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=client, daemon=True) for _ in range(concurrency)]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return summarize(latencies, time.perf_counter() - start, errors)
+
+
+@contextlib.contextmanager
+def uvicorn_server(workdir: str, workers: int = 1):
+    """Run the app under uvicorn on a free local port, serving ``workdir``/data"""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    env = dict(os.environ, PYTHONPATH=os.path.dirname(os.path.abspath(__file__)))
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app:app", "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(workers), "--log-level", "warning", "--no-access-log"],
+        cwd=workdir, env=env, stdout=subprocess.DEVNULL)
+    try:
+        deadline = time.monotonic() + 30
+        while True:
+            if process.poll() is not None:
+                raise RuntimeError(f"uvicorn exited with status {process.returncode}")
+            try:
+                connection = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+                connection.request("GET", "/")
+                if connection.getresponse().status == 200:
+                    connection.close()
+                    break
+            except OSError:
+                if time.monotonic() > deadline:
+                    raise RuntimeError("uvicorn did not start within 30s")
+                time.sleep(0.1)
+        yield HTTPDriver("127.0.0.1", port)
+    finally:
+        process.terminate()
+        try:
+            process.wait(10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def load_app(workdir: str):
+    """Import the app serving ``workdir``/data in this process.
+
+    app.py resolves its data directory against the working directory, so
+    this changes into ``workdir`` for the rest of the run.
+    """
+    os.chdir(workdir)
+    import app
+    return app
+
+
+def median_summary(runs: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Combine the summaries of repeated runs: counts are added up and every timing is the median run's"""
+    combined = {}
+    for key in runs[0]:
+        values = [run[key] for run in runs]
+        combined[key] = sum(values) if key in ("requests", "errors") else round(statistics.median(values), 3)
+    return combined
+
+
+def bench_routes(driver, routes: Dict[str, str], concurrency: Sequence[int],
+                 requests: int, warmup: int = 20, repeats: int = 1) -> List[Dict[str, Any]]:
+    """Time every route at every concurrency level.
+
+    Each route is warmed up first so that per-snapshot caches and
+    compressed variants are built before timing starts. The whole sweep
+    runs ``repeats`` times and each figure reported is the median over the
+    sweeps, so one slow sweep (a GC pause, a busy neighbour) doesn't move it.
+    """
+    for target in routes.values():
+        driver.run(target, warmup, 1)
+    runs: Dict[Tuple[str, int], List[Dict[str, Any]]] = {}
+    for _ in range(repeats):
+        for name, target in routes.items():
+            for level in concurrency:
+                runs.setdefault((name, level), []).append(driver.run(target, requests, level))
+    results = []
+    for (name, level), timings in runs.items():
+        row = {"route": name, "path": routes[name], "concurrency": level, "repeats": len(timings)}
+        row.update(median_summary(timings))
+        results.append(row)
+    return results
+
+
+def bench_sources(runs: int = 3) -> Dict[str, Any]:
+    """Time save_all_content() and each source it runs, in a scratch data directory.
+
+    The scraper runs with its default settings, so the totals include
+    near-duplicate filtering, the search index, related articles and the
+    archive. Times are medians over ``runs`` runs.
+    """
+    per_source: Dict[str, List[float]] = {name: [] for name in SOURCES}
+    totals: List[float] = []
+    directory = tempfile.mkdtemp(prefix="dailybytes-bench-")
+    try:
+        scraper = ContentScraper(output_dir=directory)
+        for _ in range(runs):
+            start = time.perf_counter()
+            with quiet():
+                scraper.save_all_content(
+                    on_source_done=lambda name, result: per_source[name].append(result["seconds"]))
+            totals.append(time.perf_counter() - start)
+        scraper.fetcher.close()
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+    return {
+        "runs": runs,
+        "total_seconds": round(statistics.median(totals), 4),
+        "sources": {name: round(statistics.median(times), 4) for name, times in per_source.items() if times},
+    }
+
+
+def bench_scaling(app_module, sizes: Sequence[int], requests: int,
+                  concurrency: int = 1) -> List[Dict[str, Any]]:
+    """Publish SCALE_SECTION at each size and time generating, publishing, loading and serving it"""
+    data_dir = app_module.DATA_DIR
+    scraper = ContentScraper(output_dir=data_dir, deduplicate=False, archive=False)
+    driver = ASGIDriver(app_module.app)
+    results = []
+    for size in sizes:
+        row: Dict[str, Any] = {"items": size}
+        start = time.perf_counter()
+        items = scaled_items(scraper, size)
+        row["generate_seconds"] = round(time.perf_counter() - start, 3)
+
+        start = time.perf_counter()
+        with quiet():
+            generation = scraper.publish({**scraper._load_published(), SCALE_SECTION: items})
+        row["publish_seconds"] = round(time.perf_counter() - start, 3)
+        del items
+
+        start = time.perf_counter()
+        snapshot = ContentStore(data_dir).load()
+        row["load_seconds"] = round(time.perf_counter() - start, 3)
+        row["file_bytes"] = os.path.getsize(os.path.join(
+            snapshots.generation_dir(data_dir, generation), snapshot.manifest["files"][SCALE_SECTION]["file"]))
+        del snapshot
+
+        app_module.store.load()
+        middle = str(SCALE_BASE_ID + size // 2)
+        routes = {name: target.format(middle=middle) for name, target in SCALING_ROUTES.items()}
+        row["routes"] = {entry["route"]: {key: entry[key] for key in ("p50_ms", "p95_ms", "p99_ms", "throughput_rps")}
+                         for entry in bench_routes(driver, routes, (concurrency,), requests, warmup=2)}
+        results.append(row)
+    return results
+
+
+def route_timings(results: Dict[str, Any]) -> Dict[Tuple[str, str, int], Dict[str, Any]]:
+    """Key the route rows of a run by mode, route and concurrency"""
+    return {(mode, row["route"], row["concurrency"]): row
+            for mode, rows in results.get("routes", {}).items() for row in rows}
+
+
+def find_regressions(baseline: Dict[str, Any], current: Dict[str, Any], threshold: float,
+                     metric: str = "p95_ms") -> List[str]:
+    """Compare route timings with a baseline run and describe every route that got slower.
+
+    A route regresses when ``metric`` grew by more than ``threshold`` (a
+    fraction) and by more than REGRESSION_FLOOR_MS.
+    """
+    previous = route_timings(baseline)
+    regressions = []
+    for key, row in sorted(route_timings(current).items()):
+        before = previous.get(key)
+        if before is None or metric not in before:
+            continue
+        old, new = before[metric], row[metric]
+        if new > old * (1 + threshold) and new - old > REGRESSION_FLOOR_MS:
+            mode, route, level = key
+            regressions.append(f"{mode} {route} (concurrency {level}): {metric} {old}ms -> {new}ms "
+                               f"(+{(new / old - 1) * 100 if old else float('inf'):.0f}%)")
+    return regressions
+
+
+def print_routes(mode: str, rows: List[Dict[str, Any]]):
+    print(f"\n{mode}")
+    print(f"{'route':<14} {'conc':>5} {'p50':>9} {'p95':>9} {'p99':>9} {'req/s':>10} {'errors':>7}")
+    for row in rows:
+        print(f"{row['route']:<14} {row['concurrency']:>5} {row['p50_ms']:>7}ms {row['p95_ms']:>7}ms "
+              f"{row['p99_ms']:>7}ms {row['throughput_rps']:>10} {row['errors']:>7}")
+
+
+def print_validation(rows: List[Dict[str, Any]]):
+    print(f"\n{'limit':>6} {'validated':>12} {'prebuilt':>12} {'cached':>10} {'saved':>12}")
+    for row in rows:
+        print(f"{row['limit']:>6} {row['validated_us']:>10}us {row['prebuilt_us']:>10}us "
+              f"{row['cached_us']:>8}us {row['saved_us']:>10}us")
+
+
+def print_sources(result: Dict[str, Any]):
+    print(f"\nsave_all_content: {result['total_seconds']}s (median of {result['runs']})")
+    for name, seconds in result["sources"].items():
+        print(f"  {name:<18} {seconds}s")
+
+
+def print_scaling(rows: List[Dict[str, Any]]):
+    print(f"\n{'items':>9} {'generate':>9} {'publish':>9} {'load':>8} {'bytes':>12}  p50 per route")
+    for row in rows:
+        routes = " ".join(f"{name}={timing['p50_ms']}ms" for name, timing in row["routes"].items())
+        print(f"{row['items']:>9} {row['generate_seconds']:>8}s {row['publish_seconds']:>8}s "
+              f"{row['load_seconds']:>7}s {row['file_bytes']:>12}  {routes}")
+
+
+def parse_list(value: str, cast=str) -> List[Any]:
+    return [cast(part.strip()) for part in value.split(",") if part.strip()]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the DailyBytes API and scraper")
+    parser.add_argument("--suites", default="validation,routes,sources",
+                        help="comma-separated suites to run: validation, routes, sources, scaling")
+    parser.add_argument("--modes", default="inprocess",
+                        help="how routes are driven: inprocess (ASGI calls), uvicorn (local server), or both")
+    parser.add_argument("--routes", help=f"comma-separated routes to time (default all: {', '.join(ROUTES)})")
+    parser.add_argument("--concurrency", default="1,16", help="comma-separated concurrent clients per route")
+    parser.add_argument("--requests", type=int, default=1000, help="requests per route and concurrency level")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--sizes", default=",".join(str(size) for size in SCALE_SIZES),
+                        help="comma-separated item counts for the scaling suite")
+    parser.add_argument("--scale-requests", type=int, default=20, help="requests per route at each data size")
+    parser.add_argument("--source-runs", type=int, default=3, help="save_all_content() runs to time")
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    parser.add_argument("--baseline", help="JSON results of an earlier run to check route timings against")
+    parser.add_argument("--repeats", type=int, default=DEFAULT_REPEATS,
+                        help=f"times to sweep the routes; timings are medians over the sweeps (default {DEFAULT_REPEATS})")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD,
+                        help=f"fraction a route may slow down by before the run fails (default {REGRESSION_THRESHOLD})")
+    parser.add_argument("--metric", default="p95_ms", choices=("p50_ms", "p95_ms", "p99_ms", "mean_ms"),
+                        help="latency compared against the baseline")
+    args = parser.parse_args(argv)
+
+    suites = set(parse_list(args.suites))
+    modes = ["inprocess", "uvicorn"] if args.modes == "both" else parse_list(args.modes)
+    routes = ROUTES if not args.routes else {name: ROUTES[name] for name in parse_list(args.routes)}
+    concurrency = parse_list(args.concurrency, int)
+    if args.repeats < 1:
+        parser.error("--repeats must be at least 1")
+    if args.baseline and "routes" not in suites:
+        parser.error("--baseline checks route timings, so the routes suite has to run")
+
+    # Read before anything runs, so --output can safely name the same file
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, 'r') as f:
+            baseline = json.load(f)
+
+    results: Dict[str, Any] = {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "settings": vars(args),
+    }
+
+    if "validation" in suites:
+        results["validation"] = bench_validation()
+        print_validation(results["validation"])
+
+    if "sources" in suites:
+        results["sources"] = bench_sources(args.source_runs)
+        print_sources(results["sources"])
+
+    if "routes" in suites or "scaling" in suites:
+        cwd = os.getcwd()
+        workdir = tempfile.mkdtemp(prefix="dailybytes-bench-")
+        try:
+            seed_data(os.path.join(workdir, "data")).fetcher.close()
+            app_module = load_app(workdir) if "inprocess" in modes or "scaling" in suites else None
+            if "routes" in suites:
+                results["routes"] = {}
+                for mode in modes:
+                    if mode == "inprocess":
+                        rows = bench_routes(ASGIDriver(app_module.app), routes, concurrency, args.requests,
+                                            repeats=args.repeats)
+                    elif mode == "uvicorn":
+                        with uvicorn_server(workdir, args.workers) as driver:
+                            rows = bench_routes(driver, routes, concurrency, args.requests, repeats=args.repeats)
+                    else:
+                        parser.error(f"unknown mode '{mode}'")
+                    results["routes"][mode] = rows
+                    print_routes(mode, rows)
+            if "scaling" in suites:
+                results["scaling"] = bench_scaling(app_module, parse_list(args.sizes, int), args.scale_requests)
+                print_scaling(results["scaling"])
+        finally:
+            os.chdir(cwd)
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+    if args.baseline:
+        if not route_timings(baseline).keys() & route_timings(results).keys():
+            print(f"\nNo route timings in common with {args.baseline}; check --modes, --routes and --concurrency")
+            return 1
+        regressions = find_regressions(baseline, results, args.threshold, args.metric)
+        if regressions:
+            print(f"\n{len(regressions)} route(s) slower than {args.baseline} by more than "
+                  f"{args.threshold * 100:.0f}%:")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+        print(f"\nNo route slower than {args.baseline} by more than {args.threshold * 100:.0f}%")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,168 @@
+import hashlib
+import json
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import mockdata
+from scraper import SOURCES
+
+# Synthetic corpora for capacity testing: millions of mock items of every
+# content type, reproducible from a seed. Run with: python corpus.py --help
+
+# Items per shard file; each worker process generates and writes one shard at a time
+SHARD_SIZE = 250_000
+
+# Items encoded and written to a shard together
+WRITE_BATCH = 2_000
+
+# Manifest describing a corpus, in its directory
+MANIFEST_FILE = "manifest.json"
+
+# Short id prefix of each content type
+ID_PREFIXES = {
+    "tech_news": "tn",
+    "health_tips": "ht",
+    "stock_news": "sn",
+    "horoscopes": "hs",
+    "quotes": "qt",
+    "jokes": "jk",
+    "brain_teasers": "bt",
+    "youtube_trending": "yt",
+}
+
+
+def item_id(content_type: str, seed: int, number: int) -> str:
+    """Get the id of a corpus item, unique to its content type, seed and number"""
+    return f"{ID_PREFIXES[content_type]}-{seed:x}-{number}"
+
+
+def iter_items(content_type: str, start: int, count: int, seed: int,
+               today: datetime) -> Iterator[Dict[str, Any]]:
+    """Yield items ``start`` to ``start + count`` of a content type in a seeded corpus.
+
+    Each run of items gets its own random generator, seeded from the corpus
+    seed, content type and start, so a shard is the same whichever process
+    builds it and however many processes there are.
+    """
+    run_seed = int.from_bytes(hashlib.sha256(f"{seed}:{content_type}:{start}".encode()).digest()[:8], "big")
+    rng = random.Random(run_seed)
+    for number in range(start, start + count):
+        yield mockdata.mock_item(rng, content_type, item_id(content_type, seed, number), number, today)
+
+
+def write_shard(directory: str, content_type: str, shard: int, start: int, count: int,
+                seed: int, today: datetime) -> Dict[str, Any]:
+    """Generate one shard of a corpus to a JSON lines file, WRITE_BATCH items at a time"""
+    filename = os.path.join(content_type, f"{shard:05d}.jsonl")
+    path = os.path.join(directory, filename)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    size = 0
+    with open(tmp_path, 'wb') as f:
+        batch: List[bytes] = []
+        for item in iter_items(content_type, start, count, seed, today):
+            batch.append(json.dumps(item, separators=(",", ":"), ensure_ascii=False).encode("utf-8"))
+            if len(batch) >= WRITE_BATCH:
+                size += f.write(b"\n".join(batch) + b"\n")
+                batch = []
+        if batch:
+            size += f.write(b"\n".join(batch) + b"\n")
+    os.replace(tmp_path, path)
+    return {"type": content_type, "file": filename, "count": count, "bytes": size,
+            "first_id": item_id(content_type, seed, start),
+            "last_id": item_id(content_type, seed, start + count - 1)}
+
+
+def plan_shards(counts: Dict[str, int], shard_size: int) -> List[Tuple[str, int, int, int]]:
+    """Split each content type's count into (content type, shard, start, count) tasks"""
+    tasks = []
+    for content_type, total in counts.items():
+        for shard, start in enumerate(range(0, total, shard_size)):
+            tasks.append((content_type, shard, start, min(shard_size, total - start)))
+    return tasks
+
+
+def generate_corpus(directory: str, counts: Dict[str, int], seed: Optional[int] = None,
+                    processes: Optional[int] = None, shard_size: int = SHARD_SIZE,
+                    today: Optional[datetime] = None) -> Dict[str, Any]:
+    """Generate a corpus of ``counts[content_type]`` items per type into ``directory``.
+
+    Items are streamed to ``<type>/<shard>.jsonl`` files by a pool of
+    ``processes`` worker processes, so memory stays flat however large the
+    corpus. Without a seed a random one is picked; it is recorded in the
+    manifest together with the date, and the same seed, date and counts
+    reproduce the corpus byte for byte. Ids embed the seed, so corpora with
+    different seeds can be loaded side by side. Returns the manifest.
+    """
+    unknown = set(counts) - set(SOURCES)
+    if unknown:
+        raise ValueError(f"unknown content types: {', '.join(sorted(unknown))}")
+    if seed is None:
+        seed = random.SystemRandom().getrandbits(48)
+    today = today or datetime.now()
+    for content_type in counts:
+        os.makedirs(os.path.join(directory, content_type), exist_ok=True)
+
+    tasks = plan_shards(counts, shard_size)
+    started = time.monotonic()
+    shards = []
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        futures = [executor.submit(write_shard, directory, content_type, shard, start, count, seed, today)
+                   for content_type, shard, start, count in tasks]
+        done = 0
+        for future in as_completed(futures):
+            shards.append(future.result())
+            done += shards[-1]["count"]
+            print(f"Generated {done}/{sum(counts.values())} items ({time.monotonic() - started:.1f}s)")
+
+    shards.sort(key=lambda shard: (list(SOURCES).index(shard["type"]), shard["file"]))
+    manifest = {
+        "seed": seed,
+        "date": today.strftime("%Y-%m-%d"),
+        "created": datetime.now().isoformat(),
+        "seconds": round(time.monotonic() - started, 3),
+        "counts": {content_type: counts[content_type] for content_type in SOURCES if content_type in counts},
+        "shards": shards,
+    }
+    with open(os.path.join(directory, MANIFEST_FILE), 'w') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def read_corpus(directory: str, content_type: str) -> Iterator[Dict[str, Any]]:
+    """Yield a corpus's items of one content type, one line at a time"""
+    with open(os.path.join(directory, MANIFEST_FILE), 'r') as f:
+        manifest = json.load(f)
+    for shard in manifest["shards"]:
+        if shard["type"] == content_type:
+            with open(os.path.join(directory, shard["file"]), 'rb') as f:
+                for line in f:
+                    yield json.loads(line)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Generate a synthetic DailyBytes corpus")
+    parser.add_argument("directory", help="directory to write the corpus to")
+    parser.add_argument("--items", type=int, default=1_000_000,
+                        help="total items, split evenly across the content types")
+    parser.add_argument("--types", default=",".join(SOURCES),
+                        help="comma-separated content types to generate")
+    parser.add_argument("--seed", type=int, help="seed to reproduce a corpus; random by default")
+    parser.add_argument("--date", help="YYYY-MM-DD the items are dated from; today by default")
+    parser.add_argument("--processes", type=int, help="worker processes; one per CPU by default")
+    parser.add_argument("--shard-size", type=int, default=SHARD_SIZE, help="items per shard file")
+    args = parser.parse_args()
+
+    types = [name.strip() for name in args.types.split(",") if name.strip()]
+    counts = {name: args.items // len(types) + (1 if i < args.items % len(types) else 0)
+              for i, name in enumerate(types)}
+    manifest = generate_corpus(args.directory, counts, seed=args.seed, processes=args.processes,
+                               shard_size=args.shard_size,
+                               today=datetime.strptime(args.date, "%Y-%m-%d") if args.date else None)
+    print(f"Wrote {sum(manifest['counts'].values())} items in {manifest['seconds']}s "
+          f"to {args.directory} (seed {manifest['seed']})")
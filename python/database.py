@@ -0,0 +1,179 @@
+import json
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS generations (
+    generation INTEGER PRIMARY KEY,
+    created TEXT NOT NULL,
+    manifest TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS items (
+    category TEXT NOT NULL,
+    hash TEXT NOT NULL,
+    id TEXT NOT NULL,
+    generation INTEGER NOT NULL,
+    superseded INTEGER,
+    date TEXT,
+    data TEXT NOT NULL,
+    PRIMARY KEY (category, hash)
+);
+CREATE INDEX IF NOT EXISTS idx_items_newest ON items (category, id, generation);
+CREATE INDEX IF NOT EXISTS idx_items_published ON items (category, superseded);
+CREATE INDEX IF NOT EXISTS idx_items_category_date ON items (category, date);
+CREATE INDEX IF NOT EXISTS idx_items_date ON items (date);
+CREATE TABLE IF NOT EXISTS item_tags (
+    category TEXT NOT NULL,
+    hash TEXT NOT NULL,
+    tag TEXT NOT NULL,
+    PRIMARY KEY (category, hash, tag)
+);
+CREATE INDEX IF NOT EXISTS idx_item_tags_tag ON item_tags (tag);
+"""
+
+
+class ContentDatabase:
+    """Optional SQLite backend keeping every published generation.
+
+    The scraper appends each run in a single WAL-mode transaction, and
+    readers share a small pool of read-only connections, so the API can load
+    the published generation and /api/history can run filtered queries over
+    months of history without reading whole files.
+
+    Items are stored once per version, keyed by the content hash the
+    manifest records for them. A run only inserts the versions it added or
+    changed and marks the ones it replaced or removed as superseded; a
+    generation is put back together from its manifest's id -> hash lists.
+    """
+
+    def __init__(self, path: str, pool_size: int = 4, history_days: int = 90):
+        self.path = path
+        self.history_days = history_days
+        self._write_lock = threading.Lock()
+        with self._writer() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+        self._pool: "queue.Queue[sqlite3.Connection]" = queue.Queue()
+        for _ in range(pool_size):
+            conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+            conn.execute("PRAGMA query_only=ON")
+            self._pool.put(conn)
+
+    @contextmanager
+    def _writer(self) -> Iterator[sqlite3.Connection]:
+        """Open a read-write connection for one transaction"""
+        with self._write_lock:
+            conn = sqlite3.connect(self.path)
+            try:
+                conn.execute("PRAGMA synchronous=NORMAL")
+                with conn:
+                    yield conn
+            finally:
+                conn.close()
+
+    @contextmanager
+    def _reader(self) -> Iterator[sqlite3.Connection]:
+        """Borrow a read-only connection from the pool"""
+        conn = self._pool.get()
+        try:
+            yield conn
+        finally:
+            self._pool.put(conn)
+
+    def write_generation(self, generation: int, manifest: Dict[str, Any],
+                         content: Dict[str, List[Dict[str, Any]]]):
+        """Store a generation's new item versions in one transaction and prune old history"""
+        cutoff = (datetime.now() - timedelta(days=self.history_days)).isoformat()
+        with self._writer() as conn:
+            conn.execute("INSERT OR REPLACE INTO generations VALUES (?, ?, ?)",
+                         (generation, manifest["created"], json.dumps(manifest)))
+            categories = set(content)
+            categories.update(category for category, in conn.execute(
+                "SELECT DISTINCT category FROM items WHERE superseded IS NULL"))
+            for category in categories:
+                hashes = manifest["files"][category]["items"] if category in content else {}
+                published = {digest for digest, in conn.execute(
+                    "SELECT hash FROM items WHERE category = ? AND superseded IS NULL", (category,))}
+                listed = set(hashes.values())
+                conn.executemany("UPDATE items SET superseded = ? WHERE category = ? AND hash = ?",
+                                 [(generation, category, digest) for digest in published - listed])
+                items = []
+                tags = []
+                for item in content.get(category, []):
+                    digest = hashes[item["id"]]
+                    if digest in published:
+                        continue
+                    items.append((category, digest, item["id"], generation, item.get("date"),
+                                  json.dumps(item, separators=(",", ":"))))
+                    for tag in item.get("tags") or []:
+                        tags.append((category, digest, tag))
+                # A version that comes back, e.g. after a rollback, is published again
+                conn.executemany("INSERT INTO items VALUES (?, ?, ?, ?, NULL, ?, ?) "
+                                 "ON CONFLICT (category, hash) DO UPDATE "
+                                 "SET generation = excluded.generation, superseded = NULL", items)
+                conn.executemany("INSERT OR IGNORE INTO item_tags VALUES (?, ?, ?)", tags)
+
+            conn.execute("DELETE FROM generations WHERE created < ? AND generation < ?", (cutoff, generation))
+            # Versions superseded by the oldest kept generation are in none of the kept ones
+            oldest, = conn.execute("SELECT MIN(generation) FROM generations").fetchone()
+            conn.execute("DELETE FROM item_tags WHERE (category, hash) IN "
+                         "(SELECT category, hash FROM items WHERE superseded <= ?)", (oldest,))
+            conn.execute("DELETE FROM items WHERE superseded <= ?", (oldest,))
+
+    def load_generation(self, generation: int) -> Tuple[Dict[str, Any], Dict[str, List[Dict[str, Any]]]]:
+        """Load a generation's manifest and content"""
+        with self._reader() as conn:
+            row = conn.execute("SELECT manifest FROM generations WHERE generation = ?",
+                               (generation,)).fetchone()
+            if row is None:
+                raise KeyError(f"generation {generation} not found")
+            manifest = json.loads(row[0])
+            content: Dict[str, List[Dict[str, Any]]] = {}
+            for category, entry in manifest["files"].items():
+                hashes = list(entry["items"].values())
+                rows = dict(conn.execute("SELECT hash, data FROM items WHERE category = ? AND hash IN "
+                                         "(SELECT value FROM json_each(?))", (category, json.dumps(hashes))))
+                if len(rows) < len(set(hashes)):
+                    raise KeyError(f"generation {generation} is missing {category} items")
+                content[category] = [json.loads(rows[digest]) for digest in hashes]
+        return manifest, content
+
+    def query(self, category: Optional[str] = None, tag: Optional[str] = None,
+              since: Optional[str] = None, until: Optional[str] = None,
+              limit: int = 100) -> List[Dict[str, Any]]:
+        """Find the newest version of each item across all stored generations that matches, latest date first.
+
+        Filters apply to that newest version only, so an item whose older
+        versions matched but whose newest one doesn't is left out.
+        """
+        sql = "SELECT items.data FROM items"
+        where = ["items.generation = (SELECT MAX(newer.generation) FROM items AS newer"
+                 " WHERE newer.category = items.category AND newer.id = items.id)"]
+        params: List[Any] = []
+        if tag is not None:
+            sql += " JOIN item_tags ON item_tags.category = items.category AND item_tags.hash = items.hash"
+            where.append("item_tags.tag = ?")
+            params.append(tag)
+        if category is not None:
+            where.append("items.category = ?")
+            params.append(category)
+        if since is not None:
+            where.append("items.date >= ?")
+            params.append(since)
+        if until is not None:
+            where.append("items.date <= ?")
+            params.append(until)
+        sql += " WHERE " + " AND ".join(where) + " ORDER BY items.date DESC LIMIT ?"
+        params.append(limit)
+
+        with self._reader() as conn:
+            return [json.loads(data) for data, in conn.execute(sql, params)]
+
+    def close(self):
+        """Close every pooled connection"""
+        while not self._pool.empty():
+            self._pool.get_nowait().close()
@@ -0,0 +1,177 @@
+import json
+import os
+import re
+import zlib
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+from index import ARTICLE_TYPES
+
+# File the LSH index is kept in, in the scraper's output directory
+DEDUP_FILE = "dedup_state.json"
+
+# Content types checked for near-duplicates. Quotes, jokes and the like come
+# from small fixed pools where repeats are expected, so only articles are.
+DEDUP_TYPES = ARTICLE_TYPES
+
+WORD_RE = re.compile(r"\w+")
+
+# Mersenne prime used for the MinHash permutations
+PRIME = (1 << 61) - 1
+
+
+def shingles(text: str, size: int = 3) -> List[int]:
+    """Hash the overlapping word n-grams of a text"""
+    words = WORD_RE.findall(text.lower())
+    if len(words) < size:
+        words = words + [""] * (size - len(words))
+    grams = {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+    return [zlib.crc32(gram.encode("utf-8")) for gram in grams]
+
+
+def item_text(item: Dict[str, Any]) -> str:
+    """Get the text an item is fingerprinted on"""
+    return "\n".join([item.get("title") or "", item.get("summary") or "", item.get("content") or ""])
+
+
+def item_scope(name: str, item: Dict[str, Any]) -> str:
+    """Get the group an item is checked for duplicates within: its content type, source and date"""
+    return f"{name}|{item.get('source') or ''}|{item.get('date') or ''}"
+
+
+class NearDuplicateFilter:
+    """Drops items that nearly duplicate one seen in the last ``window_days``.
+
+    Each item is fingerprinted with a MinHash signature over word shingles,
+    and the signatures are bucketed with locality-sensitive hashing, so an
+    item is only compared against the few items sharing a bucket with it.
+    Checking a run therefore stays linear in the number of new items.
+
+    Buckets are kept per content type, source and date, so templated but
+    distinct stories from different outlets or days never match. Items a run
+    lists are distinct entries of their source, so an item is only checked
+    against earlier items the run no longer lists: a story republished
+    under a new id.
+    """
+
+    def __init__(self, state_dir: str, num_perm: int = 64, bands: int = 16,
+                 threshold: float = 0.8, window_days: int = 7, seed: int = 1):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.path = os.path.join(state_dir, DEDUP_FILE)
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.threshold = threshold
+        self.window_days = window_days
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, PRIME, size=num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, PRIME, size=num_perm, dtype=np.uint64)
+        # "category:id" -> {"signature": [...], "seen": ISO date}
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        # band bucket -> keys of entries that fall in it
+        self.buckets: Dict[str, List[str]] = {}
+        self._load()
+
+    def signature(self, text: str) -> np.ndarray:
+        """Compute the MinHash signature of a text"""
+        hashed = np.array(shingles(text), dtype=np.uint64)
+        # (a * x + b) mod p for every permutation and shingle, then the minimum
+        # per permutation. The product can wrap in uint64, which only changes
+        # which permutation of the shingles is used, not the estimate.
+        permuted = (np.outer(self._a, hashed) + self._b[:, None]) % np.uint64(PRIME)
+        return permuted.min(axis=1)
+
+    def _band_keys(self, scope: str, signature: np.ndarray) -> List[str]:
+        """Get the LSH bucket of each band of a signature within a scope"""
+        return [
+            f"{scope}:{band}:{zlib.crc32(signature[band * self.rows:(band + 1) * self.rows].tobytes()):08x}"
+            for band in range(self.bands)
+        ]
+
+    def filter(self, content: Dict[str, List[Dict[str, Any]]]
+               ) -> Tuple[Dict[str, List[Dict[str, Any]]], List[Dict[str, str]]]:
+        """Remove near-duplicates from a run's content.
+
+        An item matching an earlier one with a different id is dropped; an item
+        whose id was seen before just refreshes its fingerprint. Returns the
+        filtered content and a list of what was dropped in favour of what.
+        """
+        today = datetime.now().strftime("%Y-%m-%d")
+        self._prune(today)
+        dropped = []
+        result = dict(content)
+        for name in DEDUP_TYPES:
+            kept = []
+            listed = {f"{name}:{item['id']}" for item in content.get(name, [])}
+            for item in content.get(name, []):
+                key = f"{name}:{item['id']}"
+                signature = self.signature(item_text(item))
+                band_keys = self._band_keys(item_scope(name, item), signature)
+                original = self._find_duplicate(signature, band_keys, listed)
+                if original is not None:
+                    dropped.append({"id": item["id"], "category": name, "duplicate_of": original})
+                    continue
+                self._add(key, signature, band_keys, today)
+                kept.append(item)
+            if name in content:
+                result[name] = kept
+        return result, dropped
+
+    def _find_duplicate(self, signature: np.ndarray, band_keys: List[str], listed: Set[str]) -> Optional[str]:
+        """Find an earlier item, not ``listed`` in this run, whose estimated Jaccard similarity passes the threshold"""
+        checked = set()
+        for band_key in band_keys:
+            for other in self.buckets.get(band_key, []):
+                if other in listed or other in checked:
+                    continue
+                checked.add(other)
+                other_signature = np.array(self.entries[other]["signature"], dtype=np.uint64)
+                if np.mean(signature == other_signature) >= self.threshold:
+                    return other.split(":", 1)[1]
+        return None
+
+    def _add(self, key: str, signature: np.ndarray, band_keys: List[str], seen: str):
+        """Index an item's signature, replacing any earlier one for the same key"""
+        if key in self.entries:
+            self._remove(key)
+        self.entries[key] = {"signature": signature.tolist(), "seen": seen, "bands": band_keys}
+        for band_key in band_keys:
+            self.buckets.setdefault(band_key, []).append(key)
+
+    def _remove(self, key: str):
+        """Drop an item from the index"""
+        entry = self.entries.pop(key)
+        for band_key in entry["bands"]:
+            bucket = self.buckets.get(band_key, [])
+            if key in bucket:
+                bucket.remove(key)
+                if not bucket:
+                    del self.buckets[band_key]
+
+    def _prune(self, today: str):
+        """Forget items last seen before the window"""
+        cutoff = (datetime.strptime(today, "%Y-%m-%d") - timedelta(days=self.window_days)).strftime("%Y-%m-%d")
+        for key in [key for key, entry in self.entries.items() if entry["seen"] < cutoff]:
+            self._remove(key)
+
+    def _load(self):
+        """Load the index saved by an earlier run"""
+        try:
+            with open(self.path, 'r') as f:
+                self.entries = json.load(f)["entries"]
+        except (FileNotFoundError, ValueError, KeyError):
+            self.entries = {}
+        self.buckets = {}
+        for key, entry in self.entries.items():
+            for band_key in entry["bands"]:
+                self.buckets.setdefault(band_key, []).append(key)
+
+    def save(self):
+        """Persist the index atomically for the next run"""
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({"entries": self.entries}, f, separators=(",", ":"))
+        os.replace(tmp_path, self.path)
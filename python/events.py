@@ -0,0 +1,209 @@
+import asyncio
+import json
+import random
+from collections import deque
+from typing import Any, AsyncIterator, Deque, Dict, Optional, Tuple
+
+import snapshots
+
+# Events kept for clients resuming with Last-Event-ID
+EVENT_HISTORY = 256
+
+# How often the broadcaster checks for a newly published generation, in seconds
+POLL_INTERVAL = 1.0
+
+# Idle connections get a comment this often, in seconds, so proxies keep them open
+HEARTBEAT_INTERVAL = 15.0
+
+# Range of reconnection delays suggested to clients, in milliseconds, spread
+# out so that clients dropped together don't all come back at once
+RECONNECT_DELAY_MS = (2000, 10000)
+
+# Item ids listed per category and kind of change; larger changes are cut short
+MAX_EVENT_IDS = 100
+
+HEARTBEAT = b": ping\n\n"
+
+
+def format_event(event: str, data: Dict[str, Any], event_id: Optional[int] = None) -> bytes:
+    """Encode one Server-Sent Event"""
+    head = f"id: {event_id}\n" if event_id is not None else ""
+    body = json.dumps(data, separators=(",", ":"), ensure_ascii=False)
+    return f"{head}event: {event}\ndata: {body}\n\n".encode("utf-8")
+
+
+def generation_event(generation: int, manifest: Dict[str, Any]) -> bytes:
+    """Describe a published generation: when it was published and the ids it changed"""
+    changes = {}
+    for name, diff in manifest.get("changes", {}).items():
+        entry: Dict[str, Any] = {kind: ids[:MAX_EVENT_IDS] for kind, ids in diff.items()}
+        if any(len(ids) > MAX_EVENT_IDS for ids in diff.values()):
+            entry["truncated"] = True
+        changes[name] = entry
+    return format_event("generation", {
+        "generation": generation,
+        "published": manifest.get("created"),
+        "changes": changes,
+    }, event_id=generation)
+
+
+class EventBroadcaster:
+    """Pushes an event to every connected client when a generation is published.
+
+    One task watches the data directory's CURRENT pointer, so every worker
+    process sees the leader's generations, and appends an event per new
+    generation to a ring buffer of the last ``history`` events. Each event is
+    encoded once and the same bytes go to every client. Clients wait on a
+    single condition, which also wakes them for heartbeats, so an idle
+    connection costs no timer or task of its own. Event ids are generation
+    numbers, which lets a client reconnecting to any worker resume with
+    Last-Event-ID; a client too far behind gets a ``reset`` event instead.
+    """
+
+    def __init__(self, data_dir: str, history: int = EVENT_HISTORY,
+                 poll_interval: float = POLL_INTERVAL, heartbeat_interval: float = HEARTBEAT_INTERVAL):
+        self.data_dir = data_dir
+        self.poll_interval = poll_interval
+        self.heartbeat_interval = heartbeat_interval
+        self.subscribers = 0
+        # (sequence, generation or None, encoded event), oldest first
+        self._events: Deque[Tuple[int, Optional[int], bytes]] = deque(maxlen=history)
+        self._sequence = 0
+        self._beats = 0
+        self._current: Optional[int] = None
+        self._latest = 0
+        # Whether the events of generations published before start() are buffered
+        self._loaded = False
+        # Created on the event loop by start()
+        self._condition: Optional[asyncio.Condition] = None
+        self._ready: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        """Start watching for generations, if not already; must be called on the event loop"""
+        if self._task is None:
+            self._condition = asyncio.Condition()
+            self._ready = asyncio.Event()
+            self._task = asyncio.get_running_loop().create_task(self._watch())
+
+    async def stream(self, last_event_id: Optional[int] = None) -> AsyncIterator[bytes]:
+        """Yield the encoded events for one client, starting after ``last_event_id`` if given"""
+        self.start()
+        self.subscribers += 1
+        try:
+            yield f"retry: {random.randint(*RECONNECT_DELAY_MS)}\n\n".encode()
+            await self._ready.wait()
+            # Until recent generations are loaded there is nothing to resume from
+            position = self._resume_position(last_event_id) if self._loaded else None
+            if position is None:
+                position = self._sequence
+                yield format_event("reset", {"generation": self._current})
+            beat = self._beats
+            while True:
+                async with self._condition:
+                    await self._condition.wait_for(lambda: self._sequence > position or self._beats != beat)
+                # The position moves on before yielding: events published while
+                # a slow client takes the chunk are sent next time round
+                if self._sequence > position:
+                    if self._events[0][0] > position + 1:
+                        # Fell further behind than the buffer reaches
+                        chunk = format_event("reset", {"generation": self._current})
+                    else:
+                        chunk = b"".join(data for sequence, _, data in self._events if sequence > position)
+                    position, beat = self._sequence, self._beats
+                    yield chunk
+                elif self._beats != beat:
+                    beat = self._beats
+                    yield HEARTBEAT
+        finally:
+            self.subscribers -= 1
+
+    def _resume_position(self, last_event_id: Optional[int]) -> Optional[int]:
+        """Get the sequence a client resuming after ``last_event_id`` has seen, or None if it can't catch up"""
+        if last_event_id is None or last_event_id >= self._latest:
+            return self._sequence
+        position = None
+        first_generation = None
+        for sequence, generation, _ in self._events:
+            if generation is None:
+                continue
+            if first_generation is None:
+                first_generation = generation
+                position = sequence - 1
+            if generation <= last_event_id:
+                position = sequence
+        # Generations are numbered consecutively, so anything older than the
+        # one before the first buffered event may have been missed
+        if first_generation is None or last_event_id < first_generation - 1:
+            return None
+        return position
+
+    async def _watch(self):
+        """Load recent generations, then poll for new ones and send heartbeats"""
+        loop = asyncio.get_running_loop()
+        try:
+            await self._load_recent()
+        except Exception as e:
+            print(f"Event broadcaster could not load recent generations: {e}")
+        finally:
+            # Clients connected in the meantime get a reset event rather than waiting
+            self._ready.set()
+
+        next_beat = loop.time() + self.heartbeat_interval
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                await self._check()
+            except Exception as e:
+                print(f"Event broadcaster could not check for new content: {e}")
+            if loop.time() >= next_beat:
+                next_beat = loop.time() + self.heartbeat_interval
+                async with self._condition:
+                    self._beats += 1
+                    self._condition.notify_all()
+
+    async def _load_recent(self):
+        """Buffer the events of the generations published before the broadcaster started"""
+        current = snapshots.read_current(self.data_dir)
+        if current is not None:
+            generations = snapshots.list_generations(self.data_dir)
+            published = [generation for generation in generations if generation <= current]
+            for generation in published[-self._events.maxlen:]:
+                await self._publish_generation(generation)
+            # Newer generations than CURRENT were rolled back from, not missed
+            self._latest = max(generations + [current])
+        self._current = current
+        self._loaded = True
+
+    async def _check(self):
+        """Publish events for generations that appeared since the last check"""
+        if not self._loaded:
+            await self._load_recent()
+            return
+        current = snapshots.read_current(self.data_dir)
+        if current is None or current == self._current:
+            return
+        if current > self._latest:
+            for generation in snapshots.list_generations(self.data_dir):
+                if self._latest < generation <= current:
+                    await self._publish_generation(generation)
+            self._latest = current
+        else:
+            # An older generation was republished
+            await self._publish(None, format_event("rollback", {"generation": current}))
+        self._current = current
+
+    async def _publish_generation(self, generation: int):
+        """Publish the event of a generation, reading its manifest off the event loop"""
+        try:
+            manifest = await asyncio.to_thread(snapshots.read_manifest, self.data_dir, generation)
+        except (OSError, ValueError):
+            return
+        await self._publish(generation, generation_event(generation, manifest))
+
+    async def _publish(self, generation: Optional[int], data: bytes):
+        """Append an event to the buffer and wake every client"""
+        async with self._condition:
+            self._sequence += 1
+            self._events.append((self._sequence, generation, data))
+            self._condition.notify_all()
@@ -0,0 +1,379 @@
+import email.utils
+import gzip
+import hashlib
+import http.client
+import json
+import os
+import re
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import urljoin, urlsplit
+from xml.etree import ElementTree
+
+USER_AGENT = "DailyBytes/1.0"
+
+# Statuses followed to their Location, at most MAX_REDIRECTS times per fetch
+REDIRECTS = (301, 302, 303, 307, 308)
+MAX_REDIRECTS = 5
+
+# Errors meaning a kept-alive connection was closed by the server while idle,
+# after which the request is retried once on a fresh connection
+STALE_CONNECTION_ERRORS = (http.client.RemoteDisconnected, http.client.BadStatusLine,
+                           BrokenPipeError, ConnectionResetError)
+
+MAX_AGE_RE = re.compile(r"max-age=(\d+)")
+
+# Most body bytes a caller may leave unread that are still read to keep the
+# connection alive; with more left, the connection is closed instead
+MAX_DRAIN = 64 * 1024
+
+
+class FetchError(Exception):
+    """A source could not be fetched"""
+
+
+class Response:
+    """A fetched (or cached) HTTP response with its body read into memory"""
+
+    def __init__(self, url: str, status: int, headers: Dict[str, str], body: bytes,
+                 from_cache: bool = False):
+        self.url = url
+        self.status = status
+        # Header names are lowercased
+        self.headers = headers
+        self.body = body
+        self.from_cache = from_cache
+
+    @property
+    def not_modified(self) -> bool:
+        """Whether the server answered a conditional request with 304"""
+        return self.status == 304
+
+    def text(self) -> str:
+        """Decode the body using the charset of its Content-Type"""
+        match = re.search(r"charset=([\w-]+)", self.headers.get("content-type", ""))
+        return self.body.decode(match.group(1) if match else "utf-8", errors="replace")
+
+    def json(self) -> Any:
+        """Parse the body as JSON"""
+        return json.loads(self.body)
+
+
+class HostPool:
+    """Keep-alive connections and request pacing for one scheme, host and port"""
+
+    def __init__(self, scheme: str, netloc: str, max_connections: int, rate: float, timeout: float):
+        self.scheme = scheme
+        self.netloc = netloc
+        self.timeout = timeout
+        self.min_interval = 1.0 / rate if rate > 0 else 0.0
+        self._idle: List[http.client.HTTPConnection] = []
+        self._slots = threading.BoundedSemaphore(max_connections)
+        self._lock = threading.Lock()
+        self._next_request = 0.0
+
+    def pace(self):
+        """Wait until this host's rate limit allows another request"""
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_request)
+            self._next_request = start + self.min_interval
+        if start > now:
+            time.sleep(start - now)
+
+    @contextmanager
+    def connection(self) -> Iterator[Tuple[http.client.HTTPConnection, bool]]:
+        """Borrow a connection, reusing an idle one if there is one.
+
+        Yields the connection and whether it was reused. The caller closes
+        it if it can't be kept alive; open connections go back to the pool.
+        """
+        self._slots.acquire()
+        conn = None
+        try:
+            with self._lock:
+                conn = self._idle.pop() if self._idle else None
+            reused = conn is not None
+            if conn is None:
+                connection_class = (http.client.HTTPSConnection if self.scheme == "https"
+                                    else http.client.HTTPConnection)
+                conn = connection_class(self.netloc, timeout=self.timeout)
+            yield conn, reused
+        except BaseException:
+            if conn is not None:
+                conn.close()
+            conn = None
+            raise
+        finally:
+            if conn is not None and conn.sock is not None:
+                with self._lock:
+                    self._idle.append(conn)
+            self._slots.release()
+
+    def close(self):
+        """Close every idle connection"""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+
+
+class ResponseCache:
+    """On-disk store of response bodies and the headers needed to revalidate them"""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, url: str) -> str:
+        return os.path.join(self.directory, hashlib.sha256(url.encode("utf-8")).hexdigest())
+
+    def get(self, url: str) -> Optional[Dict[str, Any]]:
+        """Get the cached entry for a URL: its headers, body and expiry time"""
+        path = self._path(url)
+        try:
+            with open(f"{path}.json", 'r') as f:
+                entry = json.load(f)
+            with open(f"{path}.body", 'rb') as f:
+                entry["body"] = f.read()
+        except (OSError, ValueError):
+            return None
+        return entry
+
+    def put(self, url: str, headers: Dict[str, str], body: Optional[bytes], expires: float):
+        """Store a response; with no body, only refresh the headers and expiry of the entry"""
+        path = self._path(url)
+        suffix = f".{os.getpid()}.{threading.get_ident()}.tmp"
+        if body is not None:
+            with open(f"{path}.body{suffix}", 'wb') as f:
+                f.write(body)
+            os.replace(f"{path}.body{suffix}", f"{path}.body")
+        with open(f"{path}.json{suffix}", 'w') as f:
+            json.dump({"url": url, "headers": headers, "expires": expires}, f)
+        os.replace(f"{path}.json{suffix}", f"{path}.json")
+
+
+class Fetcher:
+    """Shared HTTP client for scrapers.
+
+    Connections are pooled and kept alive per host, with at most
+    ``max_connections`` open to a host at once and requests to it spaced to
+    ``rate`` per second (``rate_limits`` overrides that per host name).
+    With a ``cache_dir``, responses are cached on disk: fresh entries are
+    served without a request, stale ones are revalidated with If-None-Match
+    and If-Modified-Since, and a 304 serves the cached body. Callers that
+    send their own conditional headers get the 304 back instead.
+    """
+
+    def __init__(self, cache_dir: Optional[str] = None, max_connections: int = 4,
+                 rate: float = 2.0, rate_limits: Optional[Dict[str, float]] = None,
+                 timeout: float = 15.0, user_agent: str = USER_AGENT):
+        self.cache = ResponseCache(cache_dir) if cache_dir else None
+        self.max_connections = max_connections
+        self.rate = rate
+        self.rate_limits = rate_limits or {}
+        self.timeout = timeout
+        self.user_agent = user_agent
+        self.requests = 0
+        self.cache_hits = 0
+        self.not_modified = 0
+        self._pools: Dict[Tuple[str, str], HostPool] = {}
+        self._lock = threading.Lock()
+
+    def get(self, url: str, headers: Optional[Dict[str, str]] = None) -> Response:
+        """Fetch a URL, following redirects and using the cache"""
+        headers = dict(headers or {})
+        conditional = any(name.lower() in ("if-none-match", "if-modified-since") for name in headers)
+        entry = self.cache.get(url) if self.cache is not None and not conditional else None
+        if entry is not None:
+            if entry["expires"] > time.time():
+                self.cache_hits += 1
+                return Response(url, 200, entry["headers"], entry["body"], from_cache=True)
+            if entry["headers"].get("etag"):
+                headers["If-None-Match"] = entry["headers"]["etag"]
+            if entry["headers"].get("last-modified"):
+                headers["If-Modified-Since"] = entry["headers"]["last-modified"]
+
+        with self._request(url, headers) as (final_url, status, response_headers, stream):
+            body = self._decode(stream, response_headers).read() if status != 304 else b""
+        # The body is stored and returned decoded
+        response_headers = {name: value for name, value in response_headers.items()
+                            if name not in ("content-encoding", "content-length", "transfer-encoding")}
+
+        if status == 304:
+            self.not_modified += 1
+            if entry is not None:
+                merged = dict(entry["headers"], **{name: value for name, value in response_headers.items()
+                                                   if name in ("etag", "last-modified", "cache-control", "date")})
+                self.cache.put(url, merged, None, self._expires(merged))
+                return Response(final_url, 200, merged, entry["body"], from_cache=True)
+            return Response(final_url, 304, response_headers, b"")
+        if status >= 400:
+            raise FetchError(f"GET {final_url} returned {status}")
+        if self.cache is not None and "no-store" not in response_headers.get("cache-control", ""):
+            self.cache.put(url, response_headers, body, self._expires(response_headers))
+        return Response(final_url, status, response_headers, body)
+
+    @contextmanager
+    def stream(self, url: str, headers: Optional[Dict[str, str]] = None
+               ) -> Iterator[Tuple[int, Dict[str, str], BinaryIO]]:
+        """Open a URL for incremental reading, bypassing the cache.
+
+        Yields the status, headers and a file-like object over the decoded
+        body, so large documents can be parsed without holding them whole.
+        """
+        with self._request(url, dict(headers or {})) as (final_url, status, response_headers, stream):
+            if status >= 400:
+                raise FetchError(f"GET {final_url} returned {status}")
+            yield status, response_headers, self._decode(stream, response_headers)
+
+    def iter_xml(self, url: str, tag: str, headers: Optional[Dict[str, str]] = None
+                 ) -> Iterator[ElementTree.Element]:
+        """Stream the ``tag`` elements of an XML document such as an RSS feed's items.
+
+        Each element is cleared once the caller moves on, so memory stays
+        bounded by the size of one element.
+        """
+        with self.stream(url, headers) as (status, _, body):
+            if status == 304:
+                return
+            for _, element in ElementTree.iterparse(body, events=("end",)):
+                if element.tag == tag or element.tag.endswith("}" + tag):
+                    yield element
+                    element.clear()
+
+    def close(self):
+        """Close every pooled connection"""
+        with self._lock:
+            pools = list(self._pools.values())
+        for pool in pools:
+            pool.close()
+
+    def _pool(self, scheme: str, netloc: str) -> HostPool:
+        """Get the connection pool for a host, creating it on first use"""
+        key = (scheme, netloc)
+        with self._lock:
+            pool = self._pools.get(key)
+            if pool is None:
+                host = netloc.rsplit(":", 1)[0]
+                pool = self._pools[key] = HostPool(scheme, netloc, self.max_connections,
+                                                   self.rate_limits.get(host, self.rate), self.timeout)
+            return pool
+
+    @contextmanager
+    def _request(self, url: str, headers: Dict[str, str]
+                 ) -> Iterator[Tuple[str, int, Dict[str, str], http.client.HTTPResponse]]:
+        """Send a GET on a pooled connection and follow redirects.
+
+        Yields the final URL, status, lowercased headers and the raw response,
+        which must be read before the connection goes back to the pool.
+        """
+        headers.setdefault("User-Agent", self.user_agent)
+        headers.setdefault("Accept-Encoding", "gzip, deflate")
+        for _ in range(MAX_REDIRECTS + 1):
+            parts = urlsplit(url)
+            if parts.scheme not in ("http", "https"):
+                raise FetchError(f"unsupported URL scheme: {url}")
+            path = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+            pool = self._pool(parts.scheme, parts.netloc)
+            with pool.connection() as (conn, reused):
+                pool.pace()
+                response = self._send(conn, reused, path, headers)
+                response_headers = {name.lower(): value for name, value in response.getheaders()}
+                if response.status in REDIRECTS and "location" in response_headers:
+                    self._drain(response)
+                    self._release(conn, response)
+                    url = urljoin(url, response_headers["location"])
+                    continue
+                try:
+                    yield url, response.status, response_headers, response
+                    self._drain(response)
+                finally:
+                    self._release(conn, response)
+                return
+        raise FetchError(f"too many redirects fetching {url}")
+
+    def _send(self, conn: http.client.HTTPConnection, reused: bool, path: str,
+              headers: Dict[str, str]) -> http.client.HTTPResponse:
+        """Send a request, retrying once if a reused connection turns out to be closed"""
+        self.requests += 1
+        try:
+            conn.request("GET", path, headers=headers)
+            return conn.getresponse()
+        except STALE_CONNECTION_ERRORS:
+            if not reused:
+                raise
+            conn.close()
+            conn.request("GET", path, headers=headers)
+            return conn.getresponse()
+
+    @staticmethod
+    def _drain(response: http.client.HTTPResponse):
+        """Read a little of what the caller left unread, so the connection can be reused.
+
+        A caller that stopped early on a large body leaves it unread; the
+        connection is then closed by _release() rather than downloading the rest.
+        """
+        if response.isclosed() or (response.length is not None and response.length > MAX_DRAIN):
+            return
+        response.read(MAX_DRAIN)
+        if response.length is None and not response.isclosed():
+            # A chunked body may end with just the last chunk marker unread
+            response.read(1)
+
+    @staticmethod
+    def _release(conn: http.client.HTTPConnection, response: http.client.HTTPResponse):
+        """Close the connection unless the server will keep it open"""
+        if response.will_close or not response.isclosed():
+            conn.close()
+
+    @staticmethod
+    def _decode(stream: BinaryIO, headers: Dict[str, str]) -> BinaryIO:
+        """Undo the response's Content-Encoding"""
+        encoding = headers.get("content-encoding", "").lower()
+        if encoding == "gzip":
+            return gzip.GzipFile(fileobj=stream)
+        if encoding == "deflate":
+            return _DeflateReader(stream)
+        return stream
+
+    @staticmethod
+    def _expires(headers: Dict[str, str]) -> float:
+        """Work out until when a response may be served from the cache without revalidating"""
+        cache_control = headers.get("cache-control", "")
+        if "no-cache" in cache_control:
+            return 0.0
+        match = MAX_AGE_RE.search(cache_control)
+        if match:
+            return time.time() + int(match.group(1))
+        if headers.get("expires"):
+            try:
+                return email.utils.parsedate_to_datetime(headers["expires"]).timestamp()
+            except (TypeError, ValueError):
+                return 0.0
+        return 0.0
+
+
+class _DeflateReader:
+    """File-like wrapper inflating a deflate-encoded stream"""
+
+    def __init__(self, stream: BinaryIO):
+        self._stream = stream
+        self._inflater = zlib.decompressobj()
+        self._buffer = b""
+
+    def read(self, size: int = -1) -> bytes:
+        while size < 0 or len(self._buffer) < size:
+            chunk = self._stream.read(65536)
+            if not chunk:
+                self._buffer += self._inflater.flush()
+                break
+            self._buffer += self._inflater.decompress(chunk)
+        if size < 0:
+            data, self._buffer = self._buffer, b""
+        else:
+            data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
@@ -0,0 +1,172 @@
+from bisect import bisect_left, bisect_right
+from typing import Any, Dict, List, Optional, Tuple
+
+from snapshots import CONTENT_FILES
+
+# Content types served by /api/article/{id}
+ARTICLE_TYPES = ("tech_news", "health_tips", "stock_news")
+
+
+def normalize_sign(sign: str) -> str:
+    """Normalize a zodiac sign for lookups"""
+    return sign.strip().lower()
+
+
+class ContentIndex:
+    """Lookup tables over one snapshot, built once when it is loaded"""
+
+    def __init__(self, data: Dict[str, Any]):
+        # id -> (content type, position in that type's list). When an id
+        # repeats, the first occurrence in CONTENT_FILES order wins.
+        self.by_id: Dict[str, Tuple[str, int]] = {}
+        for name in CONTENT_FILES:
+            for position, item in enumerate(data.get(name, [])):
+                self.by_id.setdefault(item["id"], (name, position))
+
+        # normalized sign -> position in the horoscopes list
+        self.by_sign: Dict[str, int] = {}
+        for position, horoscope in enumerate(data.get("horoscopes", [])):
+            self.by_sign.setdefault(normalize_sign(horoscope["sign"]), position)
+
+        # content type -> filter bitmaps
+        self.facets: Dict[str, "FacetIndex"] = {
+            name: FacetIndex(data.get(name, []), fields) for name, fields in FACET_FIELDS.items()
+        }
+
+    def locate(self, item_id: str) -> Optional[Tuple[str, int]]:
+        """Get the content type and position of an item by id"""
+        return self.by_id.get(item_id)
+
+    def resume(self, name: str, cursor: str, count: int) -> Optional[int]:
+        """Get the position in a content type's list that a page after ``cursor`` starts from.
+
+        A cursor is ``<position>:<id>`` of the last item received. While that
+        item is listed, the page starts right after it wherever it has moved.
+        Once a newer generation drops it, the page starts at its old position
+        instead, clamped to the ``count`` items listed now, so a refresh
+        between pages may repeat or skip an item but never breaks paging. A
+        bare id is accepted as long as it is listed; None means it is not.
+        """
+        position, separator, item_id = cursor.partition(":")
+        positioned = bool(separator) and position.isdigit()
+        location = self.locate(item_id if positioned else cursor)
+        if location is not None and location[0] == name:
+            return location[1] + 1
+        if not positioned:
+            return None
+        return min(int(position), count)
+
+    def locate_sign(self, sign: str) -> Optional[int]:
+        """Get the position of a sign's horoscope"""
+        return self.by_sign.get(normalize_sign(sign))
+
+
+# Fields that list endpoints can filter on, per content type. readTime and
+# date are ordered and support range filters; the rest match exact values.
+FACET_FIELDS = {
+    "tech_news": ("tags", "source", "readTime", "date"),
+    "health_tips": ("tags", "source", "readTime", "date"),
+    "stock_news": ("tags", "source", "readTime", "date"),
+    "horoscopes": ("date",),
+    "quotes": ("category", "author", "date"),
+    "jokes": ("category", "date"),
+    "brain_teasers": ("category", "difficulty", "date"),
+    "youtube_trending": ("category", "channelName", "date"),
+}
+RANGE_FIELDS = ("readTime", "date")
+
+
+class FacetIndex:
+    """Bitmaps of item positions for each value of each filterable field.
+
+    Bit ``i`` of a bitmap is set when the item at position ``i`` has that
+    value, so filters are answered with a few integer ANDs instead of a scan
+    over the items. Ordered fields also keep cumulative bitmaps for ranges.
+    """
+
+    def __init__(self, items: List[Dict[str, Any]], fields: Tuple[str, ...]):
+        self.size = len(items)
+        self.everything = (1 << self.size) - 1
+        postings: Dict[str, Dict[Any, List[int]]] = {field: {} for field in fields}
+        for position, item in enumerate(items):
+            for field in fields:
+                value = item.get(field)
+                for v in value if isinstance(value, list) else [value]:
+                    if v is not None:
+                        postings[field].setdefault(v, []).append(position)
+        self.values: Dict[str, Dict[Any, int]] = {
+            field: {value: self.bitmap(positions) for value, positions in values.items()}
+            for field, values in postings.items()
+        }
+
+        # field -> (sorted values, OR of bitmaps up to each value, OR from each value on)
+        self.ranges: Dict[str, Tuple[List[Any], List[int], List[int]]] = {}
+        for field in fields:
+            if field not in RANGE_FIELDS:
+                continue
+            keys = sorted(self.values[field])
+            up_to, acc = [], 0
+            for key in keys:
+                acc |= self.values[field][key]
+                up_to.append(acc)
+            from_on, acc = [], 0
+            for key in reversed(keys):
+                acc |= self.values[field][key]
+                from_on.append(acc)
+            self.ranges[field] = (keys, up_to, from_on[::-1])
+
+    def match(self, equals: Dict[str, Any], at_most: Dict[str, Any],
+              at_least: Dict[str, Any]) -> int:
+        """Get the bitmap of items matching every condition"""
+        bitmap = self.everything
+        for field, value in equals.items():
+            bitmap &= self.values[field].get(value, 0)
+        for field, value in at_most.items():
+            keys, up_to, _ = self.ranges[field]
+            i = bisect_right(keys, value)
+            bitmap &= up_to[i - 1] if i else 0
+        for field, value in at_least.items():
+            keys, _, from_on = self.ranges[field]
+            i = bisect_left(keys, value)
+            bitmap &= from_on[i] if i < len(keys) else 0
+        return bitmap
+
+    def counts(self, bitmap: int) -> Dict[str, Dict[str, int]]:
+        """Count the items in a bitmap for each value of each field"""
+        counts = {}
+        for field, values in self.values.items():
+            field_counts = {}
+            for value, value_bitmap in values.items():
+                count = self.count(bitmap & value_bitmap)
+                if count:
+                    field_counts[str(value)] = count
+            counts[field] = field_counts
+        return counts
+
+    @staticmethod
+    def count(bitmap: int) -> int:
+        """Count the items in a bitmap"""
+        return bin(bitmap).count("1")
+
+    @staticmethod
+    def bitmap(positions: List[int]) -> int:
+        """Build a bitmap with the given positions set"""
+        if not positions:
+            return 0
+        data = bytearray(max(positions) // 8 + 1)
+        for position in positions:
+            data[position >> 3] |= 1 << (position & 7)
+        return int.from_bytes(data, "little")
+
+    @staticmethod
+    def positions(bitmap: int) -> List[int]:
+        """List the positions set in a bitmap, in order"""
+        positions = []
+        data = bitmap.to_bytes((bitmap.bit_length() + 7) // 8, "little")
+        for byte_index, byte in enumerate(data):
+            if byte:
+                base = byte_index * 8
+                for bit in range(8):
+                    if byte >> bit & 1:
+                        positions.append(base + bit)
+        return positions
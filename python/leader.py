@@ -0,0 +1,158 @@
+import json
+import os
+import socket
+import threading
+import time
+import uuid
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process locking, every process leads
+    fcntl = None
+
+# Lock file in the data directory held by the process running refreshes
+LOCK_FILE = "leader.lock"
+
+# Where other processes leave refresh requests for the leader, and where the
+# leader reports on them
+SPOOL_DIR = "refresh_spool"
+
+
+class LeaderElection:
+    """Elects one process per data directory to run scheduled and manual refreshes.
+
+    Every process sharing the data directory tries to take an exclusive
+    POSIX lock on ``leader.lock`` every ``retry_interval`` seconds. The one
+    that gets it calls ``on_elected`` and keeps the lock until it exits,
+    when the kernel (or the NFS lock manager, for hosts sharing the data
+    directory) releases it and the next process to try takes over.
+    """
+
+    def __init__(self, data_dir: str, on_elected: Callable[[], None], retry_interval: float = 5.0):
+        self.path = os.path.join(data_dir, LOCK_FILE)
+        self.on_elected = on_elected
+        self.retry_interval = retry_interval
+        self.is_leader = False
+        self._fd: Optional[int] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        """Try to become leader now, and keep trying in the background until elected"""
+        if self._try_acquire():
+            return
+        self._thread = threading.Thread(target=self._campaign, name="leader-election", daemon=True)
+        self._thread.start()
+
+    def _campaign(self):
+        """Retry the lock until this process is elected"""
+        while not self._try_acquire():
+            time.sleep(self.retry_interval)
+
+    def _try_acquire(self) -> bool:
+        """Take the leader lock if it is free"""
+        if fcntl is None:
+            self._elected()
+            return True
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.lockf(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return False
+        # POSIX locks are dropped when any descriptor of the file is closed by
+        # this process, so this one stays open for the life of the process and
+        # nothing else may open the file. The holder is recorded for operators.
+        self._fd = fd
+        os.ftruncate(fd, 0)
+        os.write(fd, json.dumps({
+            "host": socket.gethostname(),
+            "pid": os.getpid(),
+            "since": datetime.now().isoformat(),
+        }).encode("utf-8"))
+        os.fsync(fd)
+        self._elected()
+        return True
+
+    def _elected(self):
+        """Take on the leader's duties"""
+        self.is_leader = True
+        print(f"Process {os.getpid()} elected to run content refreshes")
+        self.on_elected()
+
+
+class RefreshSpool:
+    """Hands refresh requests from any process to the leader through the data directory.
+
+    A request is a small JSON file named by its id. The leader drains new
+    requests, runs them and writes each one's job status next to it, so
+    whichever process took the request can report on it.
+    """
+
+    def __init__(self, data_dir: str):
+        self.requests_dir = os.path.join(data_dir, SPOOL_DIR, "requests")
+        self.status_dir = os.path.join(data_dir, SPOOL_DIR, "status")
+        os.makedirs(self.requests_dir, exist_ok=True)
+        os.makedirs(self.status_dir, exist_ok=True)
+
+    def submit(self, sources: Optional[List[str]] = None) -> str:
+        """Queue a refresh request for the leader and return its id"""
+        request_id = uuid.uuid4().hex
+        self._write(os.path.join(self.requests_dir, f"{request_id}.json"), {
+            "sources": sources,
+            "submitted": datetime.now().isoformat(),
+        })
+        return request_id
+
+    def drain(self) -> List[Tuple[str, Optional[List[str]]]]:
+        """Take every waiting request, oldest first"""
+        requests = []
+        for filename in os.listdir(self.requests_dir):
+            if not filename.endswith(".json"):
+                continue
+            path = os.path.join(self.requests_dir, filename)
+            try:
+                with open(path, 'r') as f:
+                    request = json.load(f)
+                os.remove(path)
+            except (OSError, ValueError):
+                continue
+            requests.append((request.get("submitted", ""), filename[:-len(".json")], request.get("sources")))
+        return [(request_id, sources) for _, request_id, sources in sorted(requests)]
+
+    def record(self, request_id: str, status: Dict[str, Any]):
+        """Publish the status of the job serving a request"""
+        self._write(os.path.join(self.status_dir, f"{request_id}.json"), status)
+
+    def status(self, request_id: str) -> Optional[Dict[str, Any]]:
+        """Get the last recorded status of a request, or None if it is unknown"""
+        if not all(c in "0123456789abcdef" for c in request_id):
+            return None
+        try:
+            with open(os.path.join(self.status_dir, f"{request_id}.json"), 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            pass
+        if os.path.exists(os.path.join(self.requests_dir, f"{request_id}.json")):
+            return {"requestId": request_id, "status": "queued"}
+        return None
+
+    def prune(self, max_age: float = 24 * 60 * 60):
+        """Delete status files older than ``max_age`` seconds"""
+        cutoff = time.time() - max_age
+        for filename in os.listdir(self.status_dir):
+            path = os.path.join(self.status_dir, filename)
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+            except OSError:
+                pass
+
+    @staticmethod
+    def _write(path: str, data: Dict[str, Any]):
+        """Write a JSON file atomically"""
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
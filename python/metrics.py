@@ -0,0 +1,256 @@
+import asyncio
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+# Default latency buckets, in seconds
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+# How often the event loop lag probe wakes up, in seconds
+LAG_PROBE_INTERVAL = 0.5
+
+
+def _escape(value: str) -> str:
+    """Escape a label value for the text exposition format"""
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    """Render a label set, with an optional pre-rendered extra label"""
+    parts = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Registry:
+    """Collection of metrics rendered together by /metrics"""
+
+    def __init__(self):
+        self._metrics: List["Metric"] = []
+
+    def register(self, metric: "Metric"):
+        self._metrics.append(metric)
+
+    def render(self) -> bytes:
+        """Render every metric in the Prometheus text exposition format"""
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            lines.extend(metric.samples())
+        return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+REGISTRY = Registry()
+
+
+class Metric:
+    """Base of a metric family; children are bound to label values once and reused"""
+
+    type = "untyped"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (),
+                 registry: Optional[Registry] = REGISTRY):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        if registry is not None:
+            registry.register(self)
+
+    def labels(self, *values: str):
+        """Get the child for a set of label values, creating it on first use.
+
+        Look children up once and keep them; calling this per event costs a
+        tuple and a dict lookup.
+        """
+        try:
+            return self._children[values]
+        except KeyError:
+            child = self._children[values] = self._new_child()
+            return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class _Value:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0):
+        self.value += amount
+
+    def set(self, value: float):
+        self.value = value
+
+
+class Counter(Metric):
+    """A monotonically increasing count"""
+
+    type = "counter"
+
+    def _new_child(self) -> _Value:
+        return _Value()
+
+    def inc(self, amount: float = 1.0):
+        """Increment the unlabelled counter"""
+        self.labels().inc(amount)
+
+    def samples(self) -> List[str]:
+        return [f"{self.name}{_format_labels(self.labelnames, values)} {_format_value(child.value)}"
+                for values, child in list(self._children.items())]
+
+
+class Gauge(Counter):
+    """A value that can go up and down"""
+
+    type = "gauge"
+
+    def set(self, value: float):
+        """Set the unlabelled gauge"""
+        self.labels().set(value)
+
+
+class FunctionMetric(Metric):
+    """A counter or gauge whose value is read from a callback when rendered"""
+
+    def __init__(self, name: str, help: str, function: Callable[[], float],
+                 type: str = "gauge", registry: Optional[Registry] = REGISTRY):
+        super().__init__(name, help, (), registry)
+        self.type = type
+        self.function = function
+
+    def samples(self) -> List[str]:
+        try:
+            value = self.function()
+        except Exception:
+            return []
+        return [] if value is None else [f"{self.name} {_format_value(value)}"]
+
+
+class _Buckets:
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Histogram(Metric):
+    """Distribution of observed values over fixed buckets"""
+
+    type = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS, registry: Optional[Registry] = REGISTRY):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, help, labelnames, registry)
+
+    def _new_child(self) -> _Buckets:
+        return _Buckets(self.buckets)
+
+    def observe(self, value: float):
+        """Record a value in the unlabelled histogram"""
+        self.labels().observe(value)
+
+    def samples(self) -> List[str]:
+        lines = []
+        for values, child in list(self._children.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), list(child.counts)):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, values, le)} {cumulative}")
+            labels = _format_labels(self.labelnames, values)
+            lines.append(f"{self.name}_sum{labels} {_format_value(child.sum)}")
+            lines.append(f"{self.name}_count{labels} {child.count}")
+        return lines
+
+
+REQUEST_SECONDS = Histogram("dailybytes_http_request_duration_seconds",
+                            "Time to serve a request, by route", ("method", "route"))
+REQUESTS = Counter("dailybytes_http_requests_total", "Requests served, by route and status", ("method", "route", "status"))
+LOOP_LAG = Gauge("dailybytes_event_loop_lag_seconds", "How late the last event loop lag probe woke up")
+LOOP_LAG_SECONDS = Histogram("dailybytes_event_loop_lag_distribution_seconds",
+                             "How late event loop lag probes wake up")
+
+
+class MetricsMiddleware:
+    """ASGI middleware timing every request by route template.
+
+    Children are cached per (method, route, status), so a request costs two
+    clock reads, a dict lookup and two increments. The first request also
+    starts a task measuring how late the event loop runs its callbacks.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._timers: Dict[Tuple[str, str], _Buckets] = {}
+        self._counters: Dict[Tuple[str, str, int], _Value] = {}
+        self._lag_task: Optional[asyncio.Task] = None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        if self._lag_task is None:
+            self._lag_task = asyncio.get_running_loop().create_task(probe_loop_lag())
+
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - start
+            route = scope.get("route")
+            # The route template, not the raw path, so ids don't explode the label set
+            path = getattr(route, "path", None) or "unmatched"
+            method = scope["method"]
+            timer = self._timers.get((method, path))
+            if timer is None:
+                timer = self._timers[(method, path)] = REQUEST_SECONDS.labels(method, path)
+            timer.observe(elapsed)
+            counter = self._counters.get((method, path, status))
+            if counter is None:
+                counter = self._counters[(method, path, status)] = REQUESTS.labels(method, path, str(status))
+            counter.inc()
+
+
+async def probe_loop_lag():
+    """Sleep repeatedly and record how much later than asked the loop woke up"""
+    loop = asyncio.get_running_loop()
+    gauge = LOOP_LAG.labels()
+    histogram = LOOP_LAG_SECONDS.labels()
+    while True:
+        start = loop.time()
+        await asyncio.sleep(LAG_PROBE_INTERVAL)
+        lag = max(0.0, loop.time() - start - LAG_PROBE_INTERVAL)
+        gauge.set(lag)
+        histogram.observe(lag)
@@ -0,0 +1,387 @@
+import random
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Tuple
+
+# Mock content for every content type, standing in for real sources until
+# they are scraped. Every random choice comes from the generator passed in,
+# so a seeded generator reproduces the same items.
+
+# Article content types and the category their mock articles are generated for
+ARTICLE_CATEGORIES = {
+    "tech_news": "tech",
+    "health_tips": "health",
+    "stock_news": "stocks",
+}
+
+# Zodiac signs, in the order their horoscopes are listed
+SIGNS = ["Aries", "Taurus", "Gemini", "Cancer", "Leo", "Virgo",
+         "Libra", "Scorpio", "Sagittarius", "Capricorn", "Aquarius", "Pisces"]
+
+# Videos the mock trending list cycles through
+VIDEO_IDS = ["5KWELtJZvRU", "UEEsdXn8oG8", "Xn7KWR9EOGQ", "LL8Fa5pQEXY", "dQw4w9WgXcQ",
+             "QH2-TGUlwu4", "9bZkp7q19f0", "kJQP7kiw5Fk", "RgKAFK5djSk", "JGwWNGJdvx8"]
+
+
+def mock_item(rng: random.Random, content_type: str, item_id: str, position: int, today: datetime) -> Dict[str, Any]:
+    """Build one mock item of a content type.
+
+    ``position`` is the item's place in its list, which picks its sign,
+    image or video the way the mock producers always have, and ``today``
+    is the day it is dated from. Random choices come from ``rng``.
+    """
+    day = today.strftime("%Y-%m-%d")
+    if content_type in ARTICLE_CATEGORIES:
+        category = ARTICLE_CATEGORIES[content_type]
+        return {
+            "id": item_id,
+            "title": _article_title(rng, category, today),
+            "summary": _article_summary(rng, category),
+            "content": _article_content(rng, category),
+            "category": category,
+            "tags": _article_tags(rng, category),
+            "readTime": rng.randint(3, 12),
+            # A date within the last week
+            "date": (today - timedelta(days=rng.randint(0, 6))).strftime("%Y-%m-%d"),
+            "imageUrl": _image_url(rng),
+            "source": _article_source(rng, category)
+        }
+
+    if content_type == "horoscopes":
+        sign = SIGNS[position % len(SIGNS)]
+        image = 3800516 + position % len(SIGNS)
+        return {
+            "id": item_id,
+            "title": f"{sign} Daily Horoscope",
+            "summary": f"Your daily horoscope for {sign}.",
+            "date": day,
+            "sign": sign,
+            "prediction": _horoscope(rng, sign),
+            "imageUrl": f"https://images.pexels.com/photos/{image}/pexels-photo-{image}.jpeg"
+        }
+
+    if content_type == "quotes":
+        image = 4709285 + position % 10
+        return {
+            "id": item_id,
+            "title": "Daily Inspiration",
+            "summary": "A motivational quote to inspire your day.",
+            "date": day,
+            "author": _author(rng),
+            "text": _quote(rng),
+            "category": rng.choice(["Motivation", "Success", "Happiness", "Growth", "Leadership"]),
+            "imageUrl": f"https://images.pexels.com/photos/{image}/pexels-photo-{image}.jpeg"
+        }
+
+    if content_type == "jokes":
+        image = 7875418 + position % 10
+        return {
+            "id": item_id,
+            "title": "Daily Laugh",
+            "summary": "A joke to brighten your day.",
+            "date": day,
+            "text": _joke(rng),
+            "category": rng.choice(["Dad Jokes", "Puns", "Tech Humor", "Wordplay"]),
+            "imageUrl": f"https://images.pexels.com/photos/{image}/pexels-photo-{image}.jpeg"
+        }
+
+    if content_type == "brain_teasers":
+        image = 7567774 + position % 10
+        category = rng.choice(["Logic Puzzle", "Math Problem", "Riddle", "Word Puzzle"])
+        difficulty = rng.choice(["easy", "medium", "hard"])
+        question, answer = _brain_teaser(rng)
+        return {
+            "id": item_id,
+            "title": f"Daily Brain Teaser #{position + 1}",
+            "summary": "Challenge your mind with this brain teaser.",
+            "date": day,
+            "question": question,
+            "answer": answer,
+            "difficulty": difficulty,
+            "category": category,
+            "imageUrl": f"https://images.pexels.com/photos/{image}/pexels-photo-{image}.jpeg"
+        }
+
+    if content_type == "youtube_trending":
+        category = rng.choice(["Technology", "Health", "Finance", "Entertainment"])
+        video_id = VIDEO_IDS[position % len(VIDEO_IDS)]
+        return {
+            "id": item_id,
+            "title": f"Trending Video #{position + 1}",
+            "summary": f"A trending {category.lower()} video on YouTube.",
+            "date": day,
+            "videoId": video_id,
+            "channelName": f"Channel {position + 1}",
+            "category": category,
+            "viewCount": rng.randint(10000, 1000000),
+            "imageUrl": f"https://img.youtube.com/vi/{video_id}/maxresdefault.jpg"
+        }
+
+    raise ValueError(f"unknown content type: {content_type}")
+
+
+def _article_title(rng: random.Random, category: str, today: datetime) -> str:
+    """Generate a mock title based on category"""
+    if category == "tech":
+        templates = [
+            "The Future of {tech} Technology",
+            "{tech} Trends to Watch in {year}",
+            "How {tech} is Revolutionizing {industry}",
+            "{number} Ways {tech} is Changing {industry}"
+        ]
+        techs = ["AI", "Blockchain", "Cloud", "IoT", "5G", "Quantum Computing"]
+        industries = ["Healthcare", "Finance", "Education", "Manufacturing", "Retail"]
+        template = rng.choice(templates)
+        return template.format(
+            tech=rng.choice(techs),
+            industry=rng.choice(industries),
+            year=today.year + rng.randint(0, 1),
+            number=rng.randint(5, 10)
+        )
+
+    elif category == "health":
+        templates = [
+            "The Benefits of {activity} for {benefit}",
+            "{number} {food} That Boost {health_aspect}",
+            "How to Improve Your {health_aspect} in {time} Minutes a Day",
+            "The Science Behind {health_trend}"
+        ]
+        activities = ["Meditation", "Yoga", "Intermittent Fasting", "HIIT Workouts", "Walking"]
+        benefits = ["Mental Health", "Immunity", "Longevity", "Brain Function", "Sleep Quality"]
+        foods = ["Superfoods", "Herbs", "Vegetables", "Nutrients", "Supplements"]
+        health_aspects = ["Sleep", "Focus", "Energy", "Gut Health", "Stress Management"]
+        health_trends = ["Mindfulness", "Plant-Based Diet", "Cold Therapy", "Breathwork", "Chronobiology"]
+
+        template = rng.choice(templates)
+        return template.format(
+            activity=rng.choice(activities),
+            benefit=rng.choice(benefits),
+            number=rng.randint(3, 7),
+            food=rng.choice(foods),
+            health_aspect=rng.choice(health_aspects),
+            time=rng.choice([5, 10, 15, 20, 30]),
+            health_trend=rng.choice(health_trends)
+        )
+
+    elif category == "stocks":
+        templates = [
+            "{market} Market: {direction} Ahead?",
+            "Investing in {sector} Stocks: {assessment}",
+            "{company} Stock Analysis: Buy, Hold or Sell?",
+            "The Impact of {event} on {market} Markets"
+        ]
+        markets = ["US", "Global", "European", "Asian", "Emerging"]
+        directions = ["Rally", "Correction", "Volatility", "Stability", "Growth"]
+        sectors = ["Tech", "Healthcare", "Energy", "Finance", "Consumer"]
+        assessments = ["Opportunities and Risks", "A Long-term Perspective", "Expert Insights", "Strategic Analysis"]
+        companies = ["Apple", "Amazon", "Google", "Microsoft", "Tesla"]
+        events = ["Inflation", "Interest Rate Changes", "Geopolitical Tensions", "Regulatory Changes", "Earnings Season"]
+
+        template = rng.choice(templates)
+        return template.format(
+            market=rng.choice(markets),
+            direction=rng.choice(directions),
+            sector=rng.choice(sectors),
+            assessment=rng.choice(assessments),
+            company=rng.choice(companies),
+            event=rng.choice(events)
+        )
+
+    return f"Article about {category.title()}"
+
+
+def _article_summary(rng: random.Random, category: str) -> str:
+    """Generate a mock article summary"""
+    templates = [
+        "An in-depth look at the latest developments in {topic}.",
+        "Exploring the implications of recent changes in {topic}.",
+        "Expert analysis of trends shaping the future of {topic}.",
+        "What you need to know about {topic} in today's rapidly changing landscape."
+    ]
+
+    topics = {
+        "tech": ["artificial intelligence", "blockchain technology", "cloud computing", "cybersecurity", "digital transformation"],
+        "health": ["nutrition research", "fitness science", "mental wellness", "preventive healthcare", "sleep optimization"],
+        "stocks": ["market volatility", "investment strategies", "economic indicators", "sector rotation", "dividend investing"]
+    }
+
+    template = rng.choice(templates)
+    return template.format(topic=rng.choice(topics.get(category, ["this field"])))
+
+
+def _article_content(rng: random.Random, category: str) -> str:
+    """Generate mock article content with multiple paragraphs"""
+    paragraphs = []
+    for _ in range(rng.randint(4, 8)):
+        words = rng.randint(40, 100)
+        paragraph = " ".join(["Lorem ipsum"] * (words // 2))
+        paragraphs.append(paragraph)
+
+    return "\n\n".join(paragraphs)
+
+
+def _article_tags(rng: random.Random, category: str) -> List[str]:
+    """Generate mock tags based on category"""
+    tag_pools = {
+        "tech": ["AI", "Machine Learning", "Blockchain", "Cloud", "Cybersecurity", "IoT", "Data Science", "Programming", "DevOps", "Web3"],
+        "health": ["Nutrition", "Fitness", "Mental Health", "Sleep", "Wellness", "Diet", "Exercise", "Mindfulness", "Supplements", "Immunity"],
+        "stocks": ["Investing", "Market Analysis", "ETFs", "Dividends", "Growth Stocks", "Value Investing", "Retirement", "Trading", "Financial Planning", "Economy"]
+    }
+
+    pool = tag_pools.get(category, ["General"])
+    return rng.sample(pool, k=rng.randint(2, 4))
+
+
+def _article_source(rng: random.Random, category: str) -> str:
+    """Get a random source based on category"""
+    sources = {
+        "tech": ["medium.com", "dev.to", "techcrunch.com", "wired.com", "theverge.com"],
+        "health": ["healthline.com", "webmd.com", "medicalnewstoday.com", "health.harvard.edu", "mayoclinic.org"],
+        "stocks": ["finance.yahoo.com", "moneycontrol.com", "bloomberg.com", "cnbc.com", "marketwatch.com"]
+    }
+
+    return rng.choice(sources.get(category, ["example.com"]))
+
+
+def _image_url(rng: random.Random) -> str:
+    """Get a random placeholder image URL"""
+    image_ids = [
+        "2977565", "3861969", "4050315", "5483077", "5483064", 
+        "5483071", "5473950", "5473947", "5473945", "5473954"
+    ]
+    image_id = rng.choice(image_ids)
+    return f"https://images.pexels.com/photos/{image_id}/pexels-photo-{image_id}.jpeg"
+
+
+def _horoscope(rng: random.Random, sign: str) -> str:
+    """Generate a mock horoscope prediction"""
+    templates = [
+        "Today brings a focus on {area}. You may find yourself {action}, which could lead to {outcome}. Take time to {advice}.",
+        "The alignment of {planet} suggests {area} will be significant today. Consider {advice} to make the most of opportunities.",
+        "{area} takes center stage today. Your natural tendency to {trait} serves you well, but remember to {advice}.",
+        "A {aspect} aspect between {planet} and your sign brings attention to {area}. This is an excellent day to {action}."
+    ]
+
+    areas = ["relationships", "career matters", "personal growth", "financial decisions", "creative pursuits", "home and family"]
+    actions = ["reflecting on past decisions", "making bold moves", "connecting with old friends", "reassessing your goals", "exploring new opportunities"]
+    outcomes = ["unexpected insights", "positive developments", "meaningful connections", "a clearer perspective", "renewed enthusiasm"]
+    advice = ["trust your intuition", "maintain balance", "communicate openly", "focus on priorities", "be patient with yourself and others"]
+    planets = ["Mercury", "Venus", "Mars", "Jupiter", "Saturn", "the Moon", "the Sun"]
+    traits = ["be analytical", "show compassion", "take initiative", "seek harmony", "stay grounded", "adapt to change"]
+    aspects = ["favorable", "challenging", "transformative", "enlightening", "balancing"]
+
+    template = rng.choice(templates)
+    return template.format(
+        area=rng.choice(areas),
+        action=rng.choice(actions),
+        outcome=rng.choice(outcomes),
+        advice=rng.choice(advice),
+        planet=rng.choice(planets),
+        trait=rng.choice(traits),
+        aspect=rng.choice(aspects)
+    )
+
+
+def _author(rng: random.Random) -> str:
+    """Get a random author name for quotes"""
+    first_names = ["Albert", "Maya", "Marcus", "Marie", "Nelson", "Eleanor", "Mahatma", "Oprah", "Martin", "Jane"]
+    last_names = ["Einstein", "Angelou", "Aurelius", "Curie", "Mandela", "Roosevelt", "Gandhi", "Winfrey", "Luther King", "Austen"]
+
+    i = rng.randint(0, len(first_names) - 1)
+    return f"{first_names[i]} {last_names[i]}"
+
+
+def _quote(rng: random.Random) -> str:
+    """Generate a mock motivational quote"""
+    templates = [
+        "The only way to do great work is to {action}.",
+        "{concept} is not the absence of {challenge}, but the ability to {action} despite it.",
+        "The future belongs to those who {action}.",
+        "Life is 10% what happens to you and 90% how you {action}.",
+        "Success is not final, failure is not fatal; it's the {concept} that counts."
+    ]
+
+    actions = [
+        "love what you do", 
+        "believe in yourself", 
+        "persist in the face of obstacles", 
+        "learn from yesterday", 
+        "build their dreams today",
+        "respond to it",
+        "embrace change"
+    ]
+
+    concepts = ["Courage", "Happiness", "Success", "Wisdom", "Strength", "Resilience"]
+    challenges = ["fear", "difficulty", "uncertainty", "failure", "doubt"]
+
+    template = rng.choice(templates)
+    return template.format(
+        action=rng.choice(actions),
+        concept=rng.choice(concepts),
+        challenge=rng.choice(challenges)
+    )
+
+
+def _joke(rng: random.Random) -> str:
+    """Generate a mock joke"""
+    jokes = [
+        "Why don't scientists trust atoms? Because they make up everything!",
+        "I told my wife she was drawing her eyebrows too high. She looked surprised.",
+        "Parallel lines have so much in common. It's a shame they'll never meet.",
+        "Why do we tell actors to 'break a leg?' Because every play has a cast.",
+        "I'm reading a book about anti-gravity. It's impossible to put down!",
+        "Did you hear about the mathematician who's afraid of negative numbers? He'll stop at nothing to avoid them.",
+        "Why was six afraid of seven? Because seven eight nine!",
+        "What's the best thing about Switzerland? I don't know, but the flag is a big plus.",
+        "I would tell you a construction joke, but I'm still working on it.",
+        "How does a penguin build its house? Igloos it together!"
+    ]
+
+    return rng.choice(jokes)
+
+
+def _brain_teaser(rng: random.Random) -> Tuple[str, str]:
+    """Generate a mock brain teaser with question and answer"""
+    teasers = [
+        (
+            "I speak without a mouth and hear without ears. I have no body, but I come alive with wind. What am I?",
+            "An echo"
+        ),
+        (
+            "The more you take, the more you leave behind. What am I?",
+            "Footsteps"
+        ),
+        (
+            "What has keys but no locks, space but no room, and you can enter but not go in?",
+            "A keyboard"
+        ),
+        (
+            "What gets wetter as it dries?",
+            "A towel"
+        ),
+        (
+            "Forward I'm heavy, but backward I'm not. What am I?",
+            "The word 'ton'"
+        ),
+        (
+            "I have cities but no houses, forests but no trees, and rivers but no water. What am I?",
+            "A map"
+        ),
+        (
+            "What can travel around the world while staying in a corner?",
+            "A stamp"
+        ),
+        (
+            "The person who makes it doesn't want it. The person who buys it doesn't use it. The person who uses it doesn't know it. What is it?",
+            "A coffin"
+        ),
+        (
+            "What has a head and a tail, but no body?",
+            "A coin"
+        ),
+        (
+            "If you have me, you want to share me. If you share me, you don't have me. What am I?",
+            "A secret"
+        )
+    ]
+
+    return rng.choice(teasers)
@@ -0,0 +1,103 @@
+from typing import Dict, List, Optional, Union
+
+from pydantic import BaseModel
+
+class Article(BaseModel):
+    id: str
+    title: str
+    summary: str
+    content: str
+    category: str
+    tags: List[str]
+    readTime: int
+    date: str
+    imageUrl: Optional[str] = None
+    source: Optional[str] = None
+
+class Horoscope(BaseModel):
+    id: str
+    title: str
+    summary: str
+    date: str
+    sign: str
+    prediction: str
+    imageUrl: Optional[str] = None
+
+class Quote(BaseModel):
+    id: str
+    title: str
+    summary: str
+    date: str
+    author: str
+    text: str
+    category: str
+    imageUrl: Optional[str] = None
+
+class Joke(BaseModel):
+    id: str
+    title: str
+    summary: str
+    date: str
+    text: str
+    category: str
+    imageUrl: Optional[str] = None
+
+class BrainTeaser(BaseModel):
+    id: str
+    title: str
+    summary: str
+    date: str
+    question: str
+    answer: str
+    difficulty: str
+    category: str
+    imageUrl: Optional[str] = None
+
+class YouTubeVideo(BaseModel):
+    id: str
+    title: str
+    summary: str
+    date: str
+    videoId: str
+    channelName: str
+    category: str
+    viewCount: int
+    imageUrl: Optional[str] = None
+
+class FeaturedContent(BaseModel):
+    featuredArticle: Article
+    techArticles: List[Article]
+    healthArticles: List[Article]
+    stockArticles: List[Article]
+    horoscopes: List[Horoscope]
+    quotes: List[Quote]
+    jokes: List[Joke]
+    brainTeasers: List[BrainTeaser]
+    youtubeVideos: List[YouTubeVideo]
+
+class ContentItem(BaseModel):
+    type: str
+    item: Union[Article, Horoscope, Quote, Joke, BrainTeaser, YouTubeVideo]
+
+class ItemBatch(BaseModel):
+    items: List[ContentItem]
+    missing: List[str]
+
+class SearchResult(ContentItem):
+    score: float
+
+class FacetCounts(BaseModel):
+    total: int
+    facets: Dict[str, Dict[str, int]]
+
+# Model for each content type, used to validate items once per snapshot
+CONTENT_MODELS = {
+    "tech_news": Article,
+    "health_tips": Article,
+    "stock_news": Article,
+    "horoscopes": Horoscope,
+    "quotes": Quote,
+    "jokes": Joke,
+    "brain_teasers": BrainTeaser,
+    "youtube_trending": YouTubeVideo,
+}
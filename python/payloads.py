@@ -0,0 +1,225 @@
+import gzip
+import hashlib
+import json
+import zlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from functools import lru_cache
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from fastapi import Request, Response
+from starlette.datastructures import Headers
+from starlette.middleware.gzip import GZipMiddleware, GZipResponder
+from starlette.types import Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:  # optional: only gzip is offered without it
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # optional: only gzip is offered without it
+    zstandard = None
+
+# Bodies smaller than this are sent uncompressed; the framing overhead eats
+# most of the saving
+MIN_COMPRESS_SIZE = 500
+
+# Content codings offered, in order of preference when the client accepts
+# several equally
+ENCODINGS: Tuple[str, ...] = tuple(
+    encoding for encoding, available in (("br", brotli), ("zstd", zstandard), ("gzip", gzip))
+    if available is not None
+)
+
+
+def compress(body: bytes, encoding: str, cacheable: bool = True) -> bytes:
+    """Compress a body with a content coding.
+
+    Cacheable bodies are compressed once and served many times, so they get
+    slow, dense settings; one-off bodies get fast ones.
+    """
+    if encoding == "gzip":
+        return gzip.compress(body, compresslevel=9 if cacheable else 5, mtime=0)
+    if encoding == "br":
+        return brotli.compress(body, quality=9 if cacheable else 4)
+    if encoding == "zstd":
+        return zstandard.ZstdCompressor(level=15 if cacheable else 3).compress(body)
+    raise ValueError(f"unsupported content coding: {encoding}")
+
+
+class Payload:
+    """A response body serialized once, with a strong ETag derived from it.
+
+    Compressed variants are built the first time a client asks for each
+    coding and kept with the payload, so a payload cached on a snapshot is
+    compressed at most once per coding per generation.
+    """
+
+    __slots__ = ("body", "etag", "cacheable", "_variants")
+
+    def __init__(self, body: bytes, cacheable: bool = True):
+        self.body = body
+        self.etag = '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+        self.cacheable = cacheable
+        self._variants: Dict[str, bytes] = {}
+
+    def variant(self, encoding: str) -> bytes:
+        """Get the body compressed with a content coding"""
+        try:
+            return self._variants[encoding]
+        except KeyError:
+            pass
+        data = compress(self.body, encoding, self.cacheable)
+        if self.cacheable:
+            self._variants[encoding] = data
+        return data
+
+    def variant_etag(self, encoding: str) -> str:
+        """Get the ETag of a compressed variant, distinct from the identity one"""
+        return self.etag[:-1] + "-" + encoding + '"'
+
+
+def encode_json(data: Any) -> bytes:
+    """Serialize data to compact UTF-8 JSON, matching FastAPI's own encoding"""
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def join_json_array(encoded_items: List[bytes]) -> bytes:
+    """Build a JSON array from items that are already encoded"""
+    return b"[" + b",".join(encoded_items) + b"]"
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Check an If-None-Match header against an ETag using weak comparison"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == opaque:
+            return True
+    return False
+
+
+@lru_cache(maxsize=256)
+def http_date(moment: datetime) -> str:
+    """Format a time as an HTTP date; naive times are taken as local time"""
+    return format_datetime(moment.astimezone(timezone.utc), usegmt=True)
+
+
+def modified_since(if_modified_since: Optional[str], last_modified: datetime) -> bool:
+    """Check whether content last modified at ``last_modified`` changed after an If-Modified-Since date"""
+    if not if_modified_since:
+        return True
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return True
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    # HTTP dates have whole seconds
+    return last_modified.astimezone(timezone.utc).replace(microsecond=0) > since
+
+
+def not_modified(request: Request, etag: Optional[str] = None,
+                 last_modified: Optional[datetime] = None) -> bool:
+    """Check a request's validators; If-Modified-Since only counts without If-None-Match"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return etag is not None and etag_matches(if_none_match, etag)
+    return last_modified is not None and not modified_since(request.headers.get("if-modified-since"),
+                                                              last_modified)
+
+
+def negotiate_encoding(accept_encoding: Optional[str], offered: Iterable[str] = ENCODINGS) -> Optional[str]:
+    """Pick the content coding to send for an Accept-Encoding header, or None for identity"""
+    if not accept_encoding:
+        return None
+    weights: Dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        weight = 1.0
+        params = params.strip().replace(" ", "")
+        if params.startswith("q="):
+            try:
+                weight = float(params[2:])
+            except ValueError:
+                weight = 0.0
+        weights[name.strip().lower()] = weight
+    best = None
+    best_weight = 0.0
+    for encoding in offered:
+        weight = weights.get(encoding, weights.get("*", 0.0))
+        if weight > best_weight:
+            best, best_weight = encoding, weight
+    return best
+
+
+def accepts_encoding(request: Request, encoding: str) -> bool:
+    """Check whether the client's Accept-Encoding allows a content coding"""
+    return negotiate_encoding(request.headers.get("accept-encoding"), (encoding,)) == encoding
+
+
+def respond(request: Request, payload: Payload, headers: Optional[Dict[str, str]] = None,
+            last_modified: Optional[datetime] = None) -> Response:
+    """Send a cached payload in the best coding the client accepts, or a 304 if it already has it"""
+    encoding = None
+    if len(payload.body) >= MIN_COMPRESS_SIZE:
+        encoding = negotiate_encoding(request.headers.get("accept-encoding"))
+    etag = payload.variant_etag(encoding) if encoding else payload.etag
+    headers = {**(headers or {}), "ETag": etag, "Vary": "Accept-Encoding"}
+    if last_modified is not None:
+        headers["Last-Modified"] = http_date(last_modified)
+    if not_modified(request, etag, last_modified):
+        return Response(status_code=304, headers=headers)
+    if encoding is None:
+        return Response(payload.body, media_type="application/json", headers=headers)
+    headers["Content-Encoding"] = encoding
+    return Response(payload.variant(encoding), media_type="application/json", headers=headers)
+
+
+def gzip_chunks(chunks: Iterable[bytes], level: int = 6) -> Iterator[bytes]:
+    """Gzip a stream of chunks, flushing after each so the client can decode as they arrive"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+class _StreamAwareGZipResponder(GZipResponder):
+    """Gzip responder that passes event streams through, since compressing them would hold events back"""
+
+    async def send_with_gzip(self, message):
+        await super().send_with_gzip(message)
+        if message["type"] == "http.response.start":
+            content_type = Headers(raw=message["headers"]).get("content-type", "")
+            if content_type.startswith("text/event-stream"):
+                self.content_encoding_set = True
+
+
+class DynamicGZipMiddleware(GZipMiddleware):
+    """Gzips responses that aren't already encoded, as a fallback for dynamic routes.
+
+    Payloads served through respond() carry their own precompressed
+    Content-Encoding and pass through untouched, as do Server-Sent Events.
+    Unlike Starlette's middleware this honours ``gzip;q=0``.
+    """
+
+    def __init__(self, app, minimum_size: int = MIN_COMPRESS_SIZE, compresslevel: int = 5):
+        super().__init__(app, minimum_size=minimum_size, compresslevel=compresslevel)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "http" and negotiate_encoding(
+                Headers(scope=scope).get("accept-encoding"), ("gzip",)) == "gzip":
+            responder = _StreamAwareGZipResponder(self.app, self.minimum_size, compresslevel=self.compresslevel)
+            await responder(scope, receive, send)
+            return
+        await self.app(scope, receive, send)
@@ -0,0 +1,335 @@
+import datetime
+import json
+import os
+import random
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+import metrics
+from payloads import http_date
+from scraper import SOURCE_STATE_FILE, SOURCES, ContentScraper
+
+SCRAPE_SECONDS = metrics.Histogram("dailybytes_scrape_duration_seconds", "Time each source took to scrape",
+                                   ("source",), buckets=(0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120))
+SCRAPES = metrics.Counter("dailybytes_scrapes_total", "Source scrapes, by outcome", ("source", "status"))
+SCRAPE_ITEMS = metrics.Gauge("dailybytes_scrape_items", "Items the last scrape of each source produced", ("source",))
+
+# How often each source is scraped, in seconds, roughly matching how often it
+# actually changes
+REFRESH_INTERVALS = {
+    "tech_news": 60 * 60,
+    "health_tips": 6 * 60 * 60,
+    "stock_news": 15 * 60,
+    "horoscopes": 24 * 60 * 60,
+    "quotes": 24 * 60 * 60,
+    "jokes": 24 * 60 * 60,
+    "brain_teasers": 24 * 60 * 60,
+    "youtube_trending": 60 * 60,
+}
+
+# Shortest max-age sent, in seconds, even when a refresh is due any moment
+MIN_MAX_AGE = 5
+
+# How often Freshness checks whether the per-source fetch state changed, in seconds
+FRESHNESS_CHECK_INTERVAL = 1.0
+
+
+class Freshness:
+    """Works out how long responses stay fresh from when their sources are next refreshed.
+
+    A source is next refreshed one interval after it was last fetched, as
+    recorded in the scraper's source state, so a response built from some
+    sources can be cached until the earliest of their refreshes. Once that
+    passes, caches may keep serving it for one more interval of the most
+    frequently refreshed source while they revalidate. The state file is
+    reread only when it changes, so every worker sees the leader's fetches.
+    """
+
+    def __init__(self, data_dir: str, intervals: Optional[Dict[str, float]] = None):
+        self.path = os.path.join(data_dir, SOURCE_STATE_FILE)
+        self.intervals = intervals or REFRESH_INTERVALS
+        self._next_refresh: Dict[str, float] = {}
+        self._mtime: Optional[float] = None
+        self._checked_at = 0.0
+        # Set of sources -> (second worked out, headers)
+        self._headers: Dict[FrozenSet[str], Tuple[int, Dict[str, str]]] = {}
+
+    def next_refresh(self, name: str) -> Optional[float]:
+        """Get when a source is next due to be refreshed, as a Unix time"""
+        now = time.monotonic()
+        if now - self._checked_at >= FRESHNESS_CHECK_INTERVAL:
+            self._checked_at = now
+            self._reload()
+        return self._next_refresh.get(name)
+
+    def _reload(self):
+        """Reread the source state if it was written since it was last read"""
+        try:
+            mtime = os.stat(self.path).st_mtime
+            if mtime == self._mtime:
+                return
+            with open(self.path, 'r') as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return
+        next_refresh = {}
+        for name, interval in self.intervals.items():
+            last_fetch = state.get(name, {}).get("last_fetch")
+            if last_fetch:
+                next_refresh[name] = datetime.datetime.fromisoformat(last_fetch).timestamp() + interval
+        self._next_refresh = next_refresh
+        self._mtime = mtime
+
+    def headers(self, sources: Iterable[str]) -> Dict[str, str]:
+        """Get Cache-Control and Expires for a response built from ``sources``.
+
+        Headers are worked out once a second per set of sources and shared,
+        so callers must not modify them.
+        """
+        now = int(time.time())
+        names = frozenset(name for name in sources if name in self.intervals)
+        cached = self._headers.get(names)
+        if cached is not None and cached[0] == now:
+            return cached[1]
+        max_age = MIN_MAX_AGE
+        cache_control = f"public, max-age={max_age}"
+        if names:
+            # A source that was never fetched is due right away
+            due = min(self.next_refresh(name) or now for name in names)
+            max_age = max(MIN_MAX_AGE, int(due - now))
+            stale = int(min(self.intervals[name] for name in names))
+            cache_control = f"public, max-age={max_age}, stale-while-revalidate={stale}"
+        headers = {"Cache-Control": cache_control,
+                   "Expires": http_date(datetime.datetime.fromtimestamp(now + max_age))}
+        self._headers[names] = (now, headers)
+        return headers
+
+
+class RefreshJob:
+    """A content refresh of some or all sources, and its progress"""
+
+    def __init__(self, targets: List[str]):
+        self.id = uuid.uuid4().hex
+        self.targets = targets
+        self.status = "queued"
+        self.created_at = datetime.datetime.now()
+        self.started_at: Optional[datetime.datetime] = None
+        self.finished_at: Optional[datetime.datetime] = None
+        self.next_attempt_at: Optional[datetime.datetime] = None
+        self.attempts = 0
+        self.generation: Optional[int] = None
+        self.error: Optional[str] = None
+        self.sources: Dict[str, Dict[str, Any]] = {}
+        # Resolved with the first generation the job publishes, or its error
+        # if it never publishes one, so both threads and the event loop can
+        # wait on it without sitting through retries
+        self.future: Future = Future()
+
+    def source_done(self, name: str, result: Dict[str, Any]):
+        """Record that one source has finished"""
+        self.sources[name] = result
+        SCRAPE_SECONDS.labels(name).observe(result.get("seconds", 0.0))
+        SCRAPES.labels(name, result["status"]).inc()
+        if "items" in result:
+            SCRAPE_ITEMS.labels(name).set(result["items"])
+
+    def wait(self, timeout: Optional[float] = None) -> int:
+        """Block until the job publishes and return the published generation"""
+        return self.future.result(timeout)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Get a JSON-serializable view of the job"""
+        return {
+            "jobId": self.id,
+            "status": self.status,
+            "targets": list(self.targets),
+            "attempts": self.attempts,
+            "createdAt": self.created_at.isoformat(),
+            "startedAt": self.started_at.isoformat() if self.started_at else None,
+            "finishedAt": self.finished_at.isoformat() if self.finished_at else None,
+            "nextAttemptAt": self.next_attempt_at.isoformat() if self.next_attempt_at else None,
+            "generation": self.generation,
+            "error": self.error,
+            "progress": {"done": len(self.sources), "total": len(self.targets)},
+            "sources": dict(self.sources),
+        }
+
+
+class RefreshManager:
+    """Queue of content refreshes, run on background threads.
+
+    A trigger joins a running job, or one waiting to retry, that already
+    covers its sources, or is merged into a job still waiting in the queue,
+    so simultaneous callers share a scrape. At most ``max_concurrent`` jobs run at once and jobs for
+    overlapping sources never run together. Sources that fail or time out
+    are retried with exponential backoff and jitter, up to ``max_attempts``
+    attempts, and the last ``history`` jobs are kept for inspection.
+    """
+
+    def __init__(self, scraper: ContentScraper,
+                 on_published: Optional[Callable[[int], None]] = None,
+                 history: int = 100, max_concurrent: int = 2, max_attempts: int = 4,
+                 retry_base: float = 30.0, retry_max: float = 900.0):
+        self.scraper = scraper
+        self.on_published = on_published
+        self.history = history
+        self.max_concurrent = max_concurrent
+        self.max_attempts = max_attempts
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+        self._lock = threading.Lock()
+        self._queued: List[RefreshJob] = []
+        self._active: List[RefreshJob] = []
+        # Jobs waiting out their backoff before the next attempt
+        self._retrying: List[RefreshJob] = []
+        self._jobs: "OrderedDict[str, RefreshJob]" = OrderedDict()
+
+    def trigger(self, sources: Optional[Iterable[str]] = None) -> RefreshJob:
+        """Queue a refresh of ``sources``, or of every source, unless one already covers it"""
+        if sources is None:
+            targets = list(SOURCES)
+        else:
+            sources = set(sources)
+            unknown = sources - set(SOURCES)
+            if unknown:
+                raise ValueError(f"unknown sources: {', '.join(sorted(unknown))}")
+            targets = [name for name in SOURCES if name in sources]
+
+        with self._lock:
+            for job in self._active + self._retrying:
+                if set(targets) <= set(job.targets):
+                    return job
+            for job in self._queued:
+                if job.attempts == 0:
+                    job.targets = [name for name in SOURCES if name in job.targets or name in targets]
+                    return job
+            job = RefreshJob(targets)
+            self._jobs[job.id] = job
+            while len(self._jobs) > self.history:
+                self._jobs.popitem(last=False)
+            self._queued.append(job)
+            self._dispatch()
+        return job
+
+    def schedule(self, scheduler, intervals: Optional[Dict[str, float]] = None):
+        """Add an interval job per source to an APScheduler scheduler.
+
+        Each source is first due ``interval`` seconds after it was last
+        fetched, so restarting the server doesn't reset its schedule.
+        Sources already due are refreshed together in one job right away,
+        so a cold start publishes one complete generation.
+        """
+        now = datetime.datetime.now()
+        overdue = []
+        for name, interval in (intervals or REFRESH_INTERVALS).items():
+            last_fetch = self.scraper.source_state.get(name, {}).get("last_fetch")
+            first_run = now
+            if last_fetch:
+                first_run = datetime.datetime.fromisoformat(last_fetch) + datetime.timedelta(seconds=interval)
+            if first_run <= now:
+                overdue.append(name)
+                first_run = now + datetime.timedelta(seconds=interval)
+            scheduler.add_job(self.trigger, 'interval', args=[[name]], seconds=interval,
+                              next_run_time=first_run, id=f"refresh-{name}",
+                              coalesce=True, max_instances=1, replace_existing=True)
+        if overdue:
+            self.trigger(overdue)
+
+    def get(self, job_id: str) -> Optional[RefreshJob]:
+        """Look up a recent job by id"""
+        return self._jobs.get(job_id)
+
+    def jobs(self, limit: Optional[int] = None) -> List[RefreshJob]:
+        """Get recent jobs, newest first"""
+        jobs = list(reversed(self._jobs.values()))
+        return jobs[:limit] if limit is not None else jobs
+
+    @property
+    def running(self) -> Optional[RefreshJob]:
+        """A job currently in progress, if any"""
+        active = self._active
+        return active[0] if active else None
+
+    def retry_delay(self, attempt: int) -> float:
+        """Get the backoff before retrying after ``attempt`` failed attempts"""
+        delay = min(self.retry_max, self.retry_base * 2 ** (attempt - 1))
+        return random.uniform(delay / 2, delay)
+
+    def _dispatch(self):
+        """Start queued jobs while there is capacity; the lock must be held"""
+        for job in list(self._queued):
+            if len(self._active) >= self.max_concurrent:
+                break
+            busy = {name for active in self._active for name in active.targets}
+            if busy.intersection(job.targets):
+                continue
+            self._queued.remove(job)
+            self._active.append(job)
+            job.status = "running"
+            threading.Thread(target=self._run, args=(job,), name=f"refresh-{job.id[:8]}",
+                             daemon=True).start()
+
+    def _requeue(self, job: RefreshJob):
+        """Put a job waiting on its backoff back in the queue"""
+        with self._lock:
+            self._retrying.remove(job)
+            job.next_attempt_at = None
+            job.status = "queued"
+            self._queued.append(job)
+            self._dispatch()
+
+    def _run(self, job: RefreshJob):
+        """Scrape and publish the job's sources, then retry or resolve it"""
+        job.attempts += 1
+        job.started_at = datetime.datetime.now()
+        job.sources = {}
+        print(f"[{job.started_at}] Updating {', '.join(job.targets)} "
+              f"(job {job.id}, attempt {job.attempts})...")
+        error: Optional[Exception] = None
+        try:
+            generation = self.scraper.save_all_content(on_source_done=job.source_done,
+                                                       sources=job.targets)
+            job.generation = generation
+            if self.on_published is not None:
+                self.on_published(generation)
+            failed = [name for name in job.targets
+                      if job.sources.get(name, {}).get("status") in ("failed", "timeout")]
+            if failed:
+                job.error = "; ".join(f"{name}: {job.sources[name].get('error')}" for name in failed)
+        except Exception as e:
+            error = e
+            failed = list(job.targets)
+            job.error = str(e)
+
+        if error is None and not job.future.done():
+            job.future.set_result(job.generation)
+
+        with self._lock:
+            self._active.remove(job)
+            if failed and job.attempts < self.max_attempts:
+                delay = self.retry_delay(job.attempts)
+                job.targets = failed
+                job.status = "retrying"
+                job.next_attempt_at = datetime.datetime.now() + datetime.timedelta(seconds=delay)
+                self._retrying.append(job)
+                print(f"[{datetime.datetime.now()}] Retrying {', '.join(failed)} in {delay:.0f}s "
+                      f"(job {job.id}): {job.error}")
+                timer = threading.Timer(delay, self._requeue, args=(job,))
+                timer.daemon = True
+                timer.start()
+            else:
+                job.status = "failed" if failed else "succeeded"
+                if not failed:
+                    job.error = None
+                job.finished_at = datetime.datetime.now()
+                if failed:
+                    print(f"[{job.finished_at}] Content update failed after {job.attempts} attempts: {job.error}")
+                else:
+                    print(f"[{job.finished_at}] Content updated successfully (generation {job.generation})")
+                if not job.future.done():
+                    job.future.set_exception(error or RuntimeError(job.error))
+            self._dispatch()
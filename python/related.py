@@ -0,0 +1,276 @@
+import hashlib
+import json
+from collections import Counter
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from index import ARTICLE_TYPES
+from search import tokenize
+
+# File the neighbour table is persisted to inside each generation directory
+RELATED_FILE = "related.json"
+
+# Neighbours kept per article
+TOP_K = 8
+
+# Similarity scores computed per batch of rows, which bounds the memory of a
+# batch to this many floats whatever the number of articles
+BATCH_SCORES = 4_000_000
+
+# Above this share of new or changed articles, recomputing everything is
+# cheaper than patching the table
+FULL_REBUILD_RATIO = 0.5
+
+
+def article_text(item: Dict[str, Any]) -> str:
+    """Get the text articles are compared on"""
+    return " ".join([item.get("title") or "", item.get("summary") or "", " ".join(item.get("tags") or [])])
+
+
+def _ranges(starts: np.ndarray, lengths: np.ndarray) -> np.ndarray:
+    """Concatenate ``arange(start, start + length)`` for every pair"""
+    total = int(lengths.sum())
+    offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+    return offsets + np.arange(total)
+
+
+class _SparseVectors:
+    """L2-normalized TF-IDF row vectors.
+
+    The most common terms, which most of the products are for, are kept as a
+    dense matrix of at most BATCH_SCORES values and multiplied in one go; the
+    rest are kept in compressed sparse row form, with a column-wise copy to
+    look up the rows that share a term.
+    """
+
+    def __init__(self, vectors: List[Tuple[np.ndarray, np.ndarray]], columns: int):
+        self.rows = len(vectors)
+        lengths = np.fromiter((len(terms) for terms, _ in vectors), np.int64, self.rows)
+        indices = np.concatenate([terms for terms, _ in vectors]) if self.rows else np.zeros(0, np.int64)
+        counts = np.concatenate([tf for _, tf in vectors]) if self.rows else np.zeros(0, np.float32)
+
+        df = np.bincount(indices, minlength=columns)
+        idf = np.log((1 + self.rows) / (1 + df)) + 1.0
+        row_of = np.repeat(np.arange(self.rows), lengths)
+        data = counts * idf[indices].astype(np.float32)
+        norms = np.sqrt(np.bincount(row_of, weights=data ** 2, minlength=self.rows))
+        norms[norms == 0] = 1.0
+        data /= norms[row_of].astype(np.float32)
+
+        common = np.argsort(-df, kind="stable")[:BATCH_SCORES // max(self.rows, 1)]
+        common = common[df[common] > 1]
+        dense_column = np.full(columns, -1, dtype=np.int64)
+        dense_column[common] = np.arange(len(common))
+        in_dense = dense_column[indices] >= 0
+        self.dense = np.zeros((self.rows, len(common)), dtype=np.float32)
+        self.dense[row_of[in_dense], dense_column[indices[in_dense]]] = data[in_dense]
+
+        rare = ~in_dense
+        self.indices, self.data, self.row_of = indices[rare], data[rare], row_of[rare]
+        self.indptr = np.zeros(self.rows + 1, dtype=np.int64)
+        np.cumsum(np.bincount(self.row_of, minlength=self.rows), out=self.indptr[1:])
+        self.df = np.bincount(self.indices, minlength=columns)
+        order = np.argsort(self.indices, kind="stable")
+        self.col_ptr = np.zeros(columns + 1, dtype=np.int64)
+        np.cumsum(self.df, out=self.col_ptr[1:])
+        self.col_rows = self.row_of[order]
+        self.col_data = self.data[order]
+
+    def work(self) -> np.ndarray:
+        """Get the number of sparse products computing each row's similarities takes"""
+        return np.bincount(self.row_of, weights=self.df[self.indices], minlength=self.rows)
+
+    def scores(self, rows: np.ndarray) -> np.ndarray:
+        """Get the cosine similarity of each of ``rows`` with every row"""
+        starts = self.indptr[rows]
+        lengths = self.indptr[rows + 1] - starts
+        positions = _ranges(starts, lengths)
+        local = np.repeat(np.arange(len(rows)), lengths)
+        terms = self.indices[positions]
+
+        postings = self.col_ptr[terms + 1] - self.col_ptr[terms]
+        matches = _ranges(self.col_ptr[terms], postings)
+        keys = np.repeat(local, postings) * self.rows + self.col_rows[matches]
+        products = np.repeat(self.data[positions], postings) * self.col_data[matches]
+        scores = self.dense[rows] @ self.dense.T
+        scores += np.bincount(keys, weights=products, minlength=len(rows) * self.rows).reshape(scores.shape)
+        return scores
+
+
+class RelatedTable:
+    """Top-k most similar articles for every article, by TF-IDF cosine similarity.
+
+    The table is computed when a snapshot is published. Vectors are mostly
+    sparse, so memory grows with the number of terms used rather than with
+    articles times vocabulary, and each article's term counts are kept with the
+    table, so only new or changed articles are tokenized again. Updating it
+    only computes similarity rows for new or changed articles, and for
+    articles whose neighbours went away, instead of the full all-pairs
+    matrix.
+    """
+
+    def __init__(self):
+        # id -> text hash
+        self.hashes: Dict[str, str] = {}
+        # id -> [[neighbour id, score], ...], best first
+        self.neighbours: Dict[str, List[List[Any]]] = {}
+        # id -> {term: count}
+        self.terms: Dict[str, Dict[str, int]] = {}
+        # term -> column, and id -> (columns, counts), built as needed
+        self._vocabulary: Dict[str, int] = {}
+        self._vectors: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+
+    def related(self, item_id: str, limit: int = TOP_K) -> List[Tuple[str, float]]:
+        """Get the ids and scores of an article's most similar articles"""
+        return [(other, score) for other, score in self.neighbours.get(item_id, [])[:limit]]
+
+    def update(self, content: Dict[str, List[Dict[str, Any]]]) -> Dict[str, int]:
+        """Bring the table in line with a snapshot's articles"""
+        ids: List[str] = []
+        texts: List[str] = []
+        seen = set()
+        for name in ARTICLE_TYPES:
+            for item in content.get(name, []):
+                if item["id"] not in seen:
+                    seen.add(item["id"])
+                    ids.append(item["id"])
+                    texts.append(article_text(item))
+
+        hashes = {item_id: hashlib.sha1(text.encode("utf-8")).hexdigest() for item_id, text in zip(ids, texts)}
+        changed = {item_id for item_id in ids if self.hashes.get(item_id) != hashes[item_id]}
+        removed = set(self.hashes) - seen
+        stale = changed | removed
+
+        if not ids:
+            self.hashes, self.neighbours, self.terms = {}, {}, {}
+            self._vocabulary, self._vectors = {}, {}
+            return {"recomputed": 0, "patched": 0}
+
+        for item_id, text in zip(ids, texts):
+            if item_id in changed or item_id not in self.terms:
+                self.terms[item_id] = dict(Counter(tokenize(text)))
+                self._vectors.pop(item_id, None)
+        self.terms = {item_id: self.terms[item_id] for item_id in ids}
+        vectors = self._vectorize(ids)
+        position = {item_id: i for i, item_id in enumerate(ids)}
+
+        if not self.neighbours or len(changed) > FULL_REBUILD_RATIO * len(ids):
+            recompute = list(range(len(ids)))
+            patch: List[int] = []
+        else:
+            # Articles that pointed at a stale neighbour lose that entry, so
+            # their rows are recomputed too; the rest are patched with the
+            # similarities of the changed articles
+            recompute = [position[item_id] for item_id in ids if item_id in changed or any(
+                other in stale for other, _ in self.neighbours.get(item_id, []))]
+            recomputed = set(recompute)
+            patch = [i for i in range(len(ids)) if i not in recomputed]
+
+        # Best scores and positions of changed articles for each patched
+        # article, merged batch by batch
+        changed_rows = {position[item_id] for item_id in changed}
+        patch_columns = np.array(patch, dtype=np.int64)
+        best_scores = np.zeros((len(patch), 0), dtype=np.float64)
+        best_rows = np.zeros((len(patch), 0), dtype=np.int64)
+
+        neighbours = {item_id: self.neighbours.get(item_id, []) for item_id in ids}
+        for rows in self._batches(vectors, recompute):
+            scores = vectors.scores(rows)
+            scores[np.arange(len(rows)), rows] = -1.0
+            for row, i in zip(scores, rows):
+                neighbours[ids[i]] = self._top(row, ids)
+
+            from_changed = [k for k, i in enumerate(rows) if i in changed_rows]
+            if len(patch) and from_changed:
+                # Column c scores each changed article of the batch against patched article c
+                block = scores[from_changed][:, patch_columns]
+                block_rows = rows[from_changed]
+                if len(from_changed) > TOP_K:
+                    keep = np.argpartition(-block, TOP_K - 1, axis=0)[:TOP_K]
+                    block = np.take_along_axis(block, keep, axis=0)
+                    block_rows = block_rows[keep]
+                else:
+                    block_rows = np.broadcast_to(block_rows[:, None], block.shape)
+                best_scores = np.concatenate([best_scores, block.T], axis=1)
+                best_rows = np.concatenate([best_rows, block_rows.T], axis=1)
+                if best_scores.shape[1] > TOP_K:
+                    keep = np.argpartition(-best_scores, TOP_K - 1, axis=1)[:, :TOP_K]
+                    best_scores = np.take_along_axis(best_scores, keep, axis=1)
+                    best_rows = np.take_along_axis(best_rows, keep, axis=1)
+
+        if best_scores.shape[1]:
+            for column, i in enumerate(patch):
+                candidates = {other: score for other, score in neighbours[ids[i]]}
+                for score, j in zip(best_scores[column], best_rows[column]):
+                    if score > 0:
+                        candidates[ids[j]] = round(float(score), 4)
+                best = sorted(candidates.items(), key=lambda pair: pair[1], reverse=True)[:TOP_K]
+                neighbours[ids[i]] = [[other, score] for other, score in best]
+
+        self.hashes = hashes
+        self.neighbours = neighbours
+        return {"recomputed": len(recompute), "patched": len(patch) if changed_rows else 0}
+
+    def _vectorize(self, ids: List[str]) -> _SparseVectors:
+        """Build the sparse TF-IDF vectors of ``ids``, reusing their term columns from earlier updates"""
+        if len(self._vocabulary) > 2 * len({term for terms in self.terms.values() for term in terms}):
+            # Mostly terms of articles long gone; number the live ones again
+            self._vocabulary, self._vectors = {}, {}
+        vocabulary = self._vocabulary
+        vectors = []
+        for item_id in ids:
+            vector = self._vectors.get(item_id)
+            if vector is None:
+                terms = self.terms[item_id]
+                vector = self._vectors[item_id] = (
+                    np.fromiter((vocabulary.setdefault(term, len(vocabulary)) for term in terms), np.int64, len(terms)),
+                    np.fromiter(terms.values(), np.float32, len(terms)),
+                )
+            vectors.append(vector)
+        for item_id in set(self._vectors) - set(self.terms):
+            del self._vectors[item_id]
+        return _SparseVectors(vectors, max(len(vocabulary), 1))
+
+    @staticmethod
+    def _batches(vectors: _SparseVectors, rows: List[int]) -> Iterator[np.ndarray]:
+        """Split rows into batches whose scores and products each fit in BATCH_SCORES"""
+        work = vectors.work()
+        limit = max(1, BATCH_SCORES // max(vectors.rows, 1))
+        batch: List[int] = []
+        products = 0.0
+        for i in rows:
+            if batch and (len(batch) >= limit or products + work[i] > BATCH_SCORES):
+                yield np.array(batch, dtype=np.int64)
+                batch, products = [], 0.0
+            batch.append(i)
+            products += work[i]
+        if batch:
+            yield np.array(batch, dtype=np.int64)
+
+    @staticmethod
+    def _top(row: np.ndarray, ids: List[str]) -> List[List[Any]]:
+        """Pick the TOP_K best-scoring positive entries of a similarity row"""
+        k = min(TOP_K, len(row))
+        candidates = np.argpartition(-row, k - 1)[:k] if k < len(row) else np.arange(len(row))
+        candidates = candidates[np.argsort(-row[candidates])]
+        return [[ids[j], round(float(row[j]), 4)] for j in candidates if row[j] > 0]
+
+    def to_json(self) -> bytes:
+        """Serialize the table for storage next to its generation"""
+        return json.dumps({"hashes": self.hashes, "neighbours": self.neighbours, "terms": self.terms},
+                          separators=(",", ":")).encode("utf-8")
+
+    @classmethod
+    def load(cls, path: str) -> Optional["RelatedTable"]:
+        """Load a table from a file, or None if it is missing or unreadable"""
+        try:
+            with open(path, 'rb') as f:
+                data = json.loads(f.read())
+        except (OSError, ValueError):
+            return None
+        table = cls()
+        table.hashes = data.get("hashes", {})
+        table.neighbours = data.get("neighbours", {})
+        table.terms = data.get("terms", {})
+        return table
@@ -1,18 +1,85 @@
 import os
 import json
 import random
+import threading
 import time
-from datetime import datetime, timedelta
-from typing import Dict, List, Any, Optional
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Any, Optional, Tuple
+
+import mockdata
+import related
+import search
+import snapshots
+from database import ContentDatabase
+from archive import ARCHIVE_DIR, ContentArchive
+from dedup import NearDuplicateFilter
+from fetcher import Fetcher, Response
+from mockdata import ARTICLE_CATEGORIES, SIGNS
+from snapshots import CONTENT_FILES
 
 # This is a simple mock scraper for demonstration purposes
 # In a real implementation, we would use libraries like requests, 
-# BeautifulSoup, Selenium, or Scrapy to fetch actual content
+# BeautifulSoup, Selenium, or Scrapy to fetch actual content. Real producers
+# should fetch through self.fetch_source(), which shares pooled connections,
+# the HTTP cache and per-host rate limits across sources.
+
+# Per-source fetch state kept between runs in the output directory
+SOURCE_STATE_FILE = "source_state.json"
+
+# HTTP response cache of the shared fetcher, in the output directory
+HTTP_CACHE_DIR = "http_cache"
+
+# Producer method for each content type, in the order they are published
+SOURCES = {
+    "tech_news": "scrape_tech_news",
+    "health_tips": "scrape_health_tips",
+    "stock_news": "scrape_stock_news",
+    "horoscopes": "scrape_horoscopes",
+    "quotes": "generate_quotes",
+    "jokes": "generate_jokes",
+    "brain_teasers": "generate_brain_teasers",
+    "youtube_trending": "fetch_youtube_trending",
+}
+
+def item_hash(item: Dict[str, Any]) -> str:
+    """Hash an item's content independently of key order"""
+    return snapshots.sha256_bytes(json.dumps(item, sort_keys=True).encode("utf-8"))[:16]
+
+def diff_items(old: Dict[str, str], new: Dict[str, str]) -> Dict[str, List[str]]:
+    """Compare two id -> hash maps"""
+    return {
+        "added": [item_id for item_id in new if item_id not in old],
+        "changed": [item_id for item_id in new if item_id in old and old[item_id] != new[item_id]],
+        "removed": [item_id for item_id in old if item_id not in new]
+    }
 
 class ContentScraper:
-    def __init__(self, output_dir: str = "./data"):
+    def __init__(self, output_dir: str = "./data", keep_generations: int = 5,
+                 max_workers: int = 4, source_timeout: float = 60.0,
+                 db: Optional[ContentDatabase] = None, deduplicate: bool = True,
+                 fetcher: Optional[Fetcher] = None, archive: bool = True,
+                 seed: Optional[int] = None):
         self.output_dir = output_dir
+        # With a seed, every source generates the same mock content on every
+        # run, whatever order the sources run in
+        self.seed = seed
+        self._rng = random.Random(seed)
+        self.db = db
+        self.deduplicate = deduplicate
+        self.keep_generations = keep_generations
+        self.max_workers = max_workers
+        self.source_timeout = source_timeout
+        self.last_report: Dict[str, Dict[str, Any]] = {}
+        self.last_changes: Dict[str, Dict[str, List[str]]] = {}
+        self._local = threading.local()
+        self._publish_lock = threading.Lock()
+        self._state_lock = threading.Lock()
         os.makedirs(output_dir, exist_ok=True)
+        self.source_state = self.load_source_state()
+        # Shared by every source so they reuse connections and respect per-host limits
+        self.fetcher = fetcher or Fetcher(os.path.join(output_dir, HTTP_CACHE_DIR))
+        self.archive = ContentArchive(os.path.join(output_dir, ARCHIVE_DIR)) if archive else None
     
     def scrape_tech_news(self) -> List[Dict[str, Any]]:
         """Mock scraper for tech news from Medium and Dev.to"""
@@ -33,438 +100,406 @@ class ContentScraper:
     def scrape_horoscopes(self) -> List[Dict[str, Any]]:
         """Mock scraper for daily horoscopes"""
         print("Scraping horoscopes...")
-        
-        signs = ["Aries", "Taurus", "Gemini", "Cancer", "Leo", "Virgo", 
-                "Libra", "Scorpio", "Sagittarius", "Capricorn", "Aquarius", "Pisces"]
-        
-        horoscopes = []
-        today = datetime.now().strftime("%Y-%m-%d")
-        
-        for i, sign in enumerate(signs):
-            horoscopes.append({
-                "id": str(i + 100),
-                "title": f"{sign} Daily Horoscope",
-                "summary": f"Your daily horoscope for {sign}.",
-                "date": today,
-                "sign": sign,
-                "prediction": self._generate_mock_horoscope(sign),
-                "imageUrl": f"https://images.pexels.com/photos/{3800516 + i}/pexels-photo-{3800516 + i}.jpeg"
-            })
-        
-        return horoscopes
+        today = datetime.now()
+        return [self.mock_item("horoscopes", str(i + 100), i, today) for i in range(len(SIGNS))]
     
     def generate_quotes(self) -> List[Dict[str, Any]]:
         """Generate motivational quotes using AI (simulated)"""
         print("Generating motivational quotes...")
-        
-        categories = ["Motivation", "Success", "Happiness", "Growth", "Leadership"]
-        quotes = []
-        today = datetime.now().strftime("%Y-%m-%d")
-        
-        for i in range(10):
-            category = random.choice(categories)
-            quotes.append({
-                "id": str(i + 200),
-                "title": f"Daily Inspiration",
-                "summary": "A motivational quote to inspire your day.",
-                "date": today,
-                "author": self._get_random_author(),
-                "text": self._generate_mock_quote(),
-                "category": category,
-                "imageUrl": f"https://images.pexels.com/photos/{4709285 + i}/pexels-photo-{4709285 + i}.jpeg"
-            })
-        
-        return quotes
+        today = datetime.now()
+        return [self.mock_item("quotes", str(i + 200), i, today) for i in range(10)]
     
     def generate_jokes(self) -> List[Dict[str, Any]]:
         """Generate daily jokes using AI (simulated)"""
         print("Generating jokes...")
-        
-        categories = ["Dad Jokes", "Puns", "Tech Humor", "Wordplay"]
-        jokes = []
-        today = datetime.now().strftime("%Y-%m-%d")
-        
-        for i in range(10):
-            category = random.choice(categories)
-            jokes.append({
-                "id": str(i + 300),
-                "title": f"Daily Laugh",
-                "summary": "A joke to brighten your day.",
-                "date": today,
-                "text": self._generate_mock_joke(),
-                "category": category,
-                "imageUrl": f"https://images.pexels.com/photos/{7875418 + i}/pexels-photo-{7875418 + i}.jpeg"
-            })
-        
-        return jokes
+        today = datetime.now()
+        return [self.mock_item("jokes", str(i + 300), i, today) for i in range(10)]
     
     def generate_brain_teasers(self) -> List[Dict[str, Any]]:
         """Generate brain teasers using AI (simulated)"""
         print("Generating brain teasers...")
-        
-        categories = ["Logic Puzzle", "Math Problem", "Riddle", "Word Puzzle"]
-        difficulties = ["easy", "medium", "hard"]
-        teasers = []
-        today = datetime.now().strftime("%Y-%m-%d")
-        
-        for i in range(10):
-            category = random.choice(categories)
-            difficulty = random.choice(difficulties)
-            question, answer = self._generate_mock_brain_teaser()
-            
-            teasers.append({
-                "id": str(i + 400),
-                "title": f"Daily Brain Teaser #{i+1}",
-                "summary": "Challenge your mind with this brain teaser.",
-                "date": today,
-                "question": question,
-                "answer": answer,
-                "difficulty": difficulty,
-                "category": category,
-                "imageUrl": f"https://images.pexels.com/photos/{7567774 + i}/pexels-photo-{7567774 + i}.jpeg"
-            })
-        
-        return teasers
+        today = datetime.now()
+        return [self.mock_item("brain_teasers", str(i + 400), i, today) for i in range(10)]
     
     def fetch_youtube_trending(self) -> List[Dict[str, Any]]:
         """Mock fetcher for YouTube trending videos"""
         print("Fetching YouTube trending videos...")
-        
-        categories = ["Technology", "Health", "Finance", "Entertainment"]
-        videos = []
-        today = datetime.now().strftime("%Y-%m-%d")
-        
-        video_ids = [
-            "5KWELtJZvRU", "UEEsdXn8oG8", "Xn7KWR9EOGQ", "LL8Fa5pQEXY",
-            "dQw4w9WgXcQ", "QH2-TGUlwu4", "9bZkp7q19f0", "kJQP7kiw5Fk",
-            "RgKAFK5djSk", "JGwWNGJdvx8"
-        ]
-        
-        for i in range(10):
-            category = random.choice(categories)
-            video_id = video_ids[i % len(video_ids)]
-            
-            videos.append({
-                "id": str(i + 500),
-                "title": f"Trending Video #{i+1}",
-                "summary": f"A trending {category.lower()} video on YouTube.",
-                "date": today,
-                "videoId": video_id,
-                "channelName": f"Channel {i+1}",
-                "category": category,
-                "viewCount": random.randint(10000, 1000000),
-                "imageUrl": f"https://img.youtube.com/vi/{video_id}/maxresdefault.jpg"
-            })
-        
-        return videos
+        today = datetime.now()
+        return [self.mock_item("youtube_trending", str(i + 500), i, today) for i in range(10)]
     
-    def save_all_content(self):
-        """Save all scraped and generated content to JSON files"""
-        content = {
-            "tech_news": self.scrape_tech_news(),
-            "health_tips": self.scrape_health_tips(),
-            "stock_news": self.scrape_stock_news(),
-            "horoscopes": self.scrape_horoscopes(),
-            "quotes": self.generate_quotes(),
-            "jokes": self.generate_jokes(),
-            "brain_teasers": self.generate_brain_teasers(),
-            "youtube_trending": self.fetch_youtube_trending()
-        }
-        
-        # Save each content type to a separate file
-        for content_type, data in content.items():
-            filename = os.path.join(self.output_dir, f"{content_type}.json")
-            with open(filename, 'w') as f:
-                json.dump(data, f, indent=2)
-            print(f"Saved {len(data)} items to {filename}")
-        
-        # Save a timestamp file to track the last update
-        with open(os.path.join(self.output_dir, "last_update.txt"), 'w') as f:
-            f.write(datetime.now().isoformat())
+    @property
+    def rng(self) -> random.Random:
+        """Random generator for mock content: the running source's own, or the instance's"""
+        rng = getattr(self._local, "rng", None)
+        return rng if rng is not None else self._rng
     
-    def _generate_mock_articles(self, category: str, count: int) -> List[Dict[str, Any]]:
-        """Generate mock articles for the given category"""
-        articles = []
-        base_id = {"tech": 1000, "health": 2000, "stocks": 3000}[category]
-        
-        for i in range(count):
-            # Generate a date within the last week
-            date = (datetime.now() - timedelta(days=random.randint(0, 6))).strftime("%Y-%m-%d")
-            
-            articles.append({
-                "id": str(base_id + i),
-                "title": self._generate_mock_title(category),
-                "summary": self._generate_mock_summary(category),
-                "content": self._generate_mock_content(category),
-                "category": category,
-                "tags": self._generate_mock_tags(category),
-                "readTime": random.randint(3, 12),
-                "date": date,
-                "imageUrl": self._get_random_image_url(),
-                "source": self._get_random_source(category)
-            })
-        
-        return articles
+    def mock_item(self, content_type: str, item_id: str, position: int, today: datetime) -> Dict[str, Any]:
+        """Build one mock item of a content type from the running source's random generator"""
+        return mockdata.mock_item(self.rng, content_type, item_id, position, today)
     
-    def _generate_mock_title(self, category: str) -> str:
-        """Generate a mock title based on category"""
-        if category == "tech":
-            templates = [
-                "The Future of {tech} Technology",
-                "{tech} Trends to Watch in {year}",
-                "How {tech} is Revolutionizing {industry}",
-                "{number} Ways {tech} is Changing {industry}"
-            ]
-            techs = ["AI", "Blockchain", "Cloud", "IoT", "5G", "Quantum Computing"]
-            industries = ["Healthcare", "Finance", "Education", "Manufacturing", "Retail"]
-            template = random.choice(templates)
-            return template.format(
-                tech=random.choice(techs),
-                industry=random.choice(industries),
-                year=datetime.now().year + random.randint(0, 1),
-                number=random.randint(5, 10)
-            )
-        
-        elif category == "health":
-            templates = [
-                "The Benefits of {activity} for {benefit}",
-                "{number} {food} That Boost {health_aspect}",
-                "How to Improve Your {health_aspect} in {time} Minutes a Day",
-                "The Science Behind {health_trend}"
-            ]
-            activities = ["Meditation", "Yoga", "Intermittent Fasting", "HIIT Workouts", "Walking"]
-            benefits = ["Mental Health", "Immunity", "Longevity", "Brain Function", "Sleep Quality"]
-            foods = ["Superfoods", "Herbs", "Vegetables", "Nutrients", "Supplements"]
-            health_aspects = ["Sleep", "Focus", "Energy", "Gut Health", "Stress Management"]
-            health_trends = ["Mindfulness", "Plant-Based Diet", "Cold Therapy", "Breathwork", "Chronobiology"]
-            
-            template = random.choice(templates)
-            return template.format(
-                activity=random.choice(activities),
-                benefit=random.choice(benefits),
-                number=random.randint(3, 7),
-                food=random.choice(foods),
-                health_aspect=random.choice(health_aspects),
-                time=random.choice([5, 10, 15, 20, 30]),
-                health_trend=random.choice(health_trends)
-            )
-        
-        elif category == "stocks":
-            templates = [
-                "{market} Market: {direction} Ahead?",
-                "Investing in {sector} Stocks: {assessment}",
-                "{company} Stock Analysis: Buy, Hold or Sell?",
-                "The Impact of {event} on {market} Markets"
-            ]
-            markets = ["US", "Global", "European", "Asian", "Emerging"]
-            directions = ["Rally", "Correction", "Volatility", "Stability", "Growth"]
-            sectors = ["Tech", "Healthcare", "Energy", "Finance", "Consumer"]
-            assessments = ["Opportunities and Risks", "A Long-term Perspective", "Expert Insights", "Strategic Analysis"]
-            companies = ["Apple", "Amazon", "Google", "Microsoft", "Tesla"]
-            events = ["Inflation", "Interest Rate Changes", "Geopolitical Tensions", "Regulatory Changes", "Earnings Season"]
-            
-            template = random.choice(templates)
-            return template.format(
-                market=random.choice(markets),
-                direction=random.choice(directions),
-                sector=random.choice(sectors),
-                assessment=random.choice(assessments),
-                company=random.choice(companies),
-                event=random.choice(events)
-            )
-        
-        return f"Article about {category.title()}"
+
+    def save_all_content(self, on_source_done: Optional[Callable[[str, Dict[str, Any]], None]] = None,
+                         sources: Optional[Iterable[str]] = None) -> int:
+        """Scrape content and publish it as a new snapshot generation.
+        
+        With ``sources``, only those sources are scraped and every other
+        content type keeps its published items. Runs for different sources
+        may scrape concurrently; publishing is serialized so that no run
+        overwrites what another one just published.
+        """
+        content, report, fetch_state = self.scrape_all(on_source_done, sources)
+        with self._publish_lock:
+            content = self._fill_from_published(content, report)
+            dedup = None
+            if self.deduplicate:
+                dedup = NearDuplicateFilter(self.output_dir)
+                content, dropped = dedup.filter(content)
+                for entry in dropped:
+                    print(f"Dropped {entry['category']} item {entry['id']} as a near-duplicate of {entry['duplicate_of']}")
+                for name in {entry["category"] for entry in dropped}:
+                    report[name]["duplicates"] = [entry["id"] for entry in dropped if entry["category"] == name]
+                    report[name]["items"] = len(content[name])
+            previous = snapshots.read_current(self.output_dir)
+            generation = self.publish(content, report)
+            # Fingerprints only count as seen once their items are published
+            if dedup is not None and generation != previous:
+                dedup.save()
+        # Only now that the content is published may the next run skip it on a 304
+        self.update_source_state(fetch_state)
+        return generation
     
-    def _generate_mock_summary(self, category: str) -> str:
-        """Generate a mock article summary"""
-        templates = [
-            "An in-depth look at the latest developments in {topic}.",
-            "Exploring the implications of recent changes in {topic}.",
-            "Expert analysis of trends shaping the future of {topic}.",
-            "What you need to know about {topic} in today's rapidly changing landscape."
-        ]
-        
-        topics = {
-            "tech": ["artificial intelligence", "blockchain technology", "cloud computing", "cybersecurity", "digital transformation"],
-            "health": ["nutrition research", "fitness science", "mental wellness", "preventive healthcare", "sleep optimization"],
-            "stocks": ["market volatility", "investment strategies", "economic indicators", "sector rotation", "dividend investing"]
-        }
-        
-        template = random.choice(templates)
-        return template.format(topic=random.choice(topics.get(category, ["this field"])))
+    def scrape_all(self, on_source_done: Optional[Callable[[str, Dict[str, Any]], None]] = None,
+                   sources: Optional[Iterable[str]] = None
+                   ) -> Tuple[Dict[str, List[Dict[str, Any]]], Dict[str, Dict[str, Any]], Dict[str, Dict[str, Any]]]:
+        """Run every source, or just ``sources``, concurrently and collect their results.
+        
+        Sources run on a pool of ``max_workers`` threads and each one gets
+        ``source_timeout`` seconds from the moment it starts.
+        ``on_source_done`` is called with each source's report entry as it
+        finishes. Returns the content of the sources that produced new items,
+        a per-source report of status and timings, and the fetch state of the
+        sources that succeeded, to pass to update_source_state() once their
+        content is published.
+        """
+        names = [name for name in SOURCES if sources is None or name in sources]
+        started: Dict[str, float] = {}
+        report: Dict[str, Dict[str, Any]] = {}
+        content: Dict[str, List[Dict[str, Any]]] = {}
+        validators: Dict[str, Dict[str, Any]] = {}
+        
+        def run(name: str) -> Tuple[Optional[List[Dict[str, Any]]], Dict[str, Any]]:
+            started[name] = time.monotonic()
+            self._local.source = name
+            self._local.validators = {}
+            if self.seed is not None:
+                self._local.rng = random.Random(f"{self.seed}:{name}")
+            try:
+                return getattr(self, SOURCES[name])(), self._local.validators
+            finally:
+                self._local.source = None
+                self._local.rng = None
+                self._local.validators = None
+        
+        executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="scraper")
+        try:
+            pending = {executor.submit(run, name): name for name in names}
+            while pending:
+                now = time.monotonic()
+                deadlines = [started[name] + self.source_timeout
+                             for name in pending.values() if name in started]
+                wait_for = max(0.0, min(deadlines) - now) if deadlines else self.source_timeout
+                done, _ = wait(pending, timeout=wait_for, return_when=FIRST_COMPLETED)
+                
+                for future in done:
+                    name = pending.pop(future)
+                    elapsed = time.monotonic() - started[name]
+                    try:
+                        result, validators[name] = future.result()
+                        if result is None:
+                            report[name] = {"status": "unchanged", "seconds": round(elapsed, 3)}
+                        else:
+                            content[name] = result
+                            report[name] = {"status": "ok", "seconds": round(elapsed, 3),
+                                            "items": len(result)}
+                    except Exception as e:
+                        report[name] = {"status": "failed", "seconds": round(elapsed, 3),
+                                        "error": str(e)}
+                    if on_source_done is not None:
+                        on_source_done(name, report[name])
+                
+                now = time.monotonic()
+                for future, name in list(pending.items()):
+                    if name in started and now - started[name] >= self.source_timeout:
+                        future.cancel()
+                        del pending[future]
+                        report[name] = {"status": "timeout", "seconds": round(now - started[name], 3),
+                                        "error": f"no result after {self.source_timeout}s"}
+                        if on_source_done is not None:
+                            on_source_done(name, report[name])
+        finally:
+            # Don't wait for sources that timed out; their results are discarded
+            executor.shutdown(wait=False, cancel_futures=True)
+        
+        fetched_at = datetime.now().isoformat()
+        fetch_state = {}
+        for name in names:
+            if report[name]["status"] in ("ok", "unchanged"):
+                fetch_state[name] = dict(validators.get(name) or {}, last_fetch=fetched_at)
+            print(f"Source {name}: {report[name]['status']} in {report[name]['seconds']}s")
+        
+        self.last_report = report
+        return content, report, fetch_state
     
-    def _generate_mock_content(self, category: str) -> str:
-        """Generate mock article content with multiple paragraphs"""
-        paragraphs = []
-        for _ in range(random.randint(4, 8)):
-            words = random.randint(40, 100)
-            paragraph = " ".join(["Lorem ipsum"] * (words // 2))
-            paragraphs.append(paragraph)
-        
-        return "\n\n".join(paragraphs)
+    def _fill_from_published(self, content: Dict[str, List[Dict[str, Any]]],
+                             report: Dict[str, Dict[str, Any]]) -> Dict[str, List[Dict[str, Any]]]:
+        """Complete a run's content with the published items of every source it has no new items for.
+        
+        Sources that failed or timed out are reported as keeping their
+        previous items, and sources the run didn't scrape get their report
+        entry from the published manifest.
+        """
+        previous = self._load_published()
+        current = snapshots.read_current(self.output_dir)
+        previous_report = {}
+        if current is not None:
+            try:
+                previous_report = snapshots.read_manifest(self.output_dir, current).get("sources", {})
+            except (OSError, ValueError):
+                previous_report = {}
+        
+        result = {}
+        for name in SOURCES:
+            if name in content:
+                result[name] = content[name]
+                continue
+            result[name] = previous.get(name, [])
+            if name not in report:
+                report[name] = previous_report.get(name, {"status": "skipped"})
+                continue
+            report[name]["items"] = len(result[name])
+            if "error" in report[name]:
+                print(f"Source {name} {report[name]['status']}: {report[name]['error']}; "
+                      f"keeping {len(result[name])} previous items")
+        return result
     
-    def _generate_mock_tags(self, category: str) -> List[str]:
-        """Generate mock tags based on category"""
-        tag_pools = {
-            "tech": ["AI", "Machine Learning", "Blockchain", "Cloud", "Cybersecurity", "IoT", "Data Science", "Programming", "DevOps", "Web3"],
-            "health": ["Nutrition", "Fitness", "Mental Health", "Sleep", "Wellness", "Diet", "Exercise", "Mindfulness", "Supplements", "Immunity"],
-            "stocks": ["Investing", "Market Analysis", "ETFs", "Dividends", "Growth Stocks", "Value Investing", "Retirement", "Trading", "Financial Planning", "Economy"]
-        }
-        
-        pool = tag_pools.get(category, ["General"])
-        return random.sample(pool, k=random.randint(2, 4))
+    def source_validators(self) -> Dict[str, str]:
+        """Get the conditional request headers for the source being scraped.
+        
+        Producers that fetch over HTTP send these and return None when the
+        source answers 304 Not Modified, which keeps the published items.
+        """
+        state = self.source_state.get(getattr(self._local, "source", None), {})
+        headers = {}
+        if state.get("etag"):
+            headers["If-None-Match"] = state["etag"]
+        if state.get("last_modified"):
+            headers["If-Modified-Since"] = state["last_modified"]
+        return headers
     
-    def _get_random_source(self, category: str) -> str:
-        """Get a random source based on category"""
-        sources = {
-            "tech": ["medium.com", "dev.to", "techcrunch.com", "wired.com", "theverge.com"],
-            "health": ["healthline.com", "webmd.com", "medicalnewstoday.com", "health.harvard.edu", "mayoclinic.org"],
-            "stocks": ["finance.yahoo.com", "moneycontrol.com", "bloomberg.com", "cnbc.com", "marketwatch.com"]
-        }
-        
-        return random.choice(sources.get(category, ["example.com"]))
+    def set_source_validators(self, etag: Optional[str] = None, last_modified: Optional[str] = None):
+        """Remember the ETag and Last-Modified the source being scraped returned.
+        
+        They are sent on later runs only once the items scraped with them are
+        published, so a run that fails after fetching doesn't get a 304 for
+        content that was never stored.
+        """
+        self._local.validators = {"etag": etag, "last_modified": last_modified}
     
-    def _get_random_image_url(self) -> str:
-        """Get a random placeholder image URL"""
-        image_ids = [
-            "2977565", "3861969", "4050315", "5483077", "5483064", 
-            "5483071", "5473950", "5473947", "5473945", "5473954"
-        ]
-        image_id = random.choice(image_ids)
-        return f"https://images.pexels.com/photos/{image_id}/pexels-photo-{image_id}.jpeg"
+    def fetch_source(self, url: str) -> Optional[Response]:
+        """Fetch the feed of the source being scraped, or None if it hasn't changed.
+        
+        The request carries the validators stored for the source, and the
+        ones the server returns are stored for the next run, so a producer
+        can hand a None straight back to keep the published items.
+        """
+        response = self.fetcher.get(url, headers=self.source_validators())
+        if response.not_modified:
+            return None
+        self.set_source_validators(etag=response.headers.get("etag"),
+                                   last_modified=response.headers.get("last-modified"))
+        return response
     
-    def _generate_mock_horoscope(self, sign: str) -> str:
-        """Generate a mock horoscope prediction"""
-        templates = [
-            "Today brings a focus on {area}. You may find yourself {action}, which could lead to {outcome}. Take time to {advice}.",
-            "The alignment of {planet} suggests {area} will be significant today. Consider {advice} to make the most of opportunities.",
-            "{area} takes center stage today. Your natural tendency to {trait} serves you well, but remember to {advice}.",
-            "A {aspect} aspect between {planet} and your sign brings attention to {area}. This is an excellent day to {action}."
-        ]
-        
-        areas = ["relationships", "career matters", "personal growth", "financial decisions", "creative pursuits", "home and family"]
-        actions = ["reflecting on past decisions", "making bold moves", "connecting with old friends", "reassessing your goals", "exploring new opportunities"]
-        outcomes = ["unexpected insights", "positive developments", "meaningful connections", "a clearer perspective", "renewed enthusiasm"]
-        advice = ["trust your intuition", "maintain balance", "communicate openly", "focus on priorities", "be patient with yourself and others"]
-        planets = ["Mercury", "Venus", "Mars", "Jupiter", "Saturn", "the Moon", "the Sun"]
-        traits = ["be analytical", "show compassion", "take initiative", "seek harmony", "stay grounded", "adapt to change"]
-        aspects = ["favorable", "challenging", "transformative", "enlightening", "balancing"]
-        
-        template = random.choice(templates)
-        return template.format(
-            area=random.choice(areas),
-            action=random.choice(actions),
-            outcome=random.choice(outcomes),
-            advice=random.choice(advice),
-            planet=random.choice(planets),
-            trait=random.choice(traits),
-            aspect=random.choice(aspects)
-        )
+    def load_source_state(self) -> Dict[str, Dict[str, Any]]:
+        """Load the per-source fetch state saved by the last run"""
+        try:
+            with open(os.path.join(self.output_dir, SOURCE_STATE_FILE), 'r') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
     
-    def _get_random_author(self) -> str:
-        """Get a random author name for quotes"""
-        first_names = ["Albert", "Maya", "Marcus", "Marie", "Nelson", "Eleanor", "Mahatma", "Oprah", "Martin", "Jane"]
-        last_names = ["Einstein", "Angelou", "Aurelius", "Curie", "Mandela", "Roosevelt", "Gandhi", "Winfrey", "Luther King", "Austen"]
-        
-        i = random.randint(0, len(first_names) - 1)
-        return f"{first_names[i]} {last_names[i]}"
+    def update_source_state(self, fetch_state: Dict[str, Dict[str, Any]]):
+        """Record and persist the fetch state of sources whose content was published.
+        
+        Concurrent runs each swap in an updated copy under a lock, so readers
+        never see a state half updated and the file is never written from a
+        dict that is changing.
+        """
+        if not fetch_state:
+            return
+        with self._state_lock:
+            state = {name: dict(entry) for name, entry in self.source_state.items()}
+            for name, entry in fetch_state.items():
+                state.setdefault(name, {}).update(entry)
+            self.source_state = state
+            path = os.path.join(self.output_dir, SOURCE_STATE_FILE)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(state, f, indent=2)
+            os.replace(tmp_path, path)
     
-    def _generate_mock_quote(self) -> str:
-        """Generate a mock motivational quote"""
-        templates = [
-            "The only way to do great work is to {action}.",
-            "{concept} is not the absence of {challenge}, but the ability to {action} despite it.",
-            "The future belongs to those who {action}.",
-            "Life is 10% what happens to you and 90% how you {action}.",
-            "Success is not final, failure is not fatal; it's the {concept} that counts."
-        ]
-        
-        actions = [
-            "love what you do", 
-            "believe in yourself", 
-            "persist in the face of obstacles", 
-            "learn from yesterday", 
-            "build their dreams today",
-            "respond to it",
-            "embrace change"
-        ]
-        
-        concepts = ["Courage", "Happiness", "Success", "Wisdom", "Strength", "Resilience"]
-        challenges = ["fear", "difficulty", "uncertainty", "failure", "doubt"]
-        
-        template = random.choice(templates)
-        return template.format(
-            action=random.choice(actions),
-            concept=random.choice(concepts),
-            challenge=random.choice(challenges)
-        )
+    def _load_published(self) -> Dict[str, List[Dict[str, Any]]]:
+        """Load every content type from the published generation, if there is one"""
+        generation = snapshots.read_current(self.output_dir)
+        if generation is None:
+            return {}
+        directory = snapshots.generation_dir(self.output_dir, generation)
+        content = {}
+        for name, filename in CONTENT_FILES.items():
+            try:
+                with open(os.path.join(directory, filename), 'r') as f:
+                    content[name] = json.load(f)
+            except (FileNotFoundError, json.JSONDecodeError):
+                pass
+        return content
     
-    def _generate_mock_joke(self) -> str:
-        """Generate a mock joke"""
-        jokes = [
-            "Why don't scientists trust atoms? Because they make up everything!",
-            "I told my wife she was drawing her eyebrows too high. She looked surprised.",
-            "Parallel lines have so much in common. It's a shame they'll never meet.",
-            "Why do we tell actors to 'break a leg?' Because every play has a cast.",
-            "I'm reading a book about anti-gravity. It's impossible to put down!",
-            "Did you hear about the mathematician who's afraid of negative numbers? He'll stop at nothing to avoid them.",
-            "Why was six afraid of seven? Because seven eight nine!",
-            "What's the best thing about Switzerland? I don't know, but the flag is a big plus.",
-            "I would tell you a construction joke, but I'm still working on it.",
-            "How does a penguin build its house? Igloos it together!"
-        ]
-        
-        return random.choice(jokes)
+    def publish(self, content: Dict[str, List[Dict[str, Any]]],
+                report: Optional[Dict[str, Dict[str, Any]]] = None) -> int:
+        """Write content to a new generation directory and atomically publish it.
+        
+        Categories whose file is byte-for-byte the same as in the published
+        generation are hard-linked instead of rewritten, and when nothing
+        changed at all no new generation is published. The ids added, changed
+        and removed in each category are recorded in the manifest and kept on
+        ``last_changes``. Returns the generation now published.
+        """
+        current = snapshots.read_current(self.output_dir)
+        previous_manifest = None
+        if current is not None:
+            try:
+                previous_manifest = snapshots.read_manifest(self.output_dir, current)
+            except (OSError, ValueError):
+                previous_manifest = None
+        previous_files = previous_manifest["files"] if previous_manifest else {}
+        
+        existing = snapshots.list_generations(self.output_dir)
+        generation = (existing[-1] if existing else 0) + 1
+        
+        files = {}
+        links = {}
+        changes = {}
+        manifest = {
+            "generation": generation,
+            "created": datetime.now().isoformat(),
+            "files": {},
+            "sources": report or {}
+        }
+        for content_type, data in content.items():
+            filename = CONTENT_FILES[content_type]
+            encoded = json.dumps(data, indent=2).encode("utf-8")
+            digest = snapshots.sha256_bytes(encoded)
+            item_hashes = {item["id"]: item_hash(item) for item in data}
+            previous = previous_files.get(content_type)
+            if previous is not None and previous["sha256"] == digest:
+                links[filename] = os.path.join(snapshots.generation_dir(self.output_dir, current),
+                                               previous["file"])
+            else:
+                files[filename] = encoded
+            changes[content_type] = diff_items(previous.get("items", {}) if previous else {}, item_hashes)
+            manifest["files"][content_type] = {
+                "file": filename,
+                "count": len(data),
+                "sha256": digest,
+                "items": item_hashes
+            }
+        
+        self.last_changes = {name: diff for name, diff in changes.items() if any(diff.values())}
+        if previous_manifest is not None and not files:
+            print(f"No content changes; generation {current} stays published")
+            return current
+        manifest["changes"] = self.last_changes
+        
+        files[search.INDEX_FILE] = self._build_search_index(content, manifest)
+        files[related.RELATED_FILE] = self._build_related(content, manifest)
+        
+        path = snapshots.write_generation(self.output_dir, generation, files, manifest, links)
+        if self.db is not None:
+            self.db.write_generation(generation, manifest, content)
+        snapshots.publish_generation(self.output_dir, generation)
+        if self.archive is not None:
+            self.archive.append(generation, content, self.last_changes)
+        summary = ", ".join(f"{name} +{len(diff['added'])} ~{len(diff['changed'])} -{len(diff['removed'])}"
+                            for name, diff in self.last_changes.items())
+        print(f"Published generation {generation} to {path} ({summary})")
+        
+        removed = snapshots.prune_generations(self.output_dir, self.keep_generations)
+        if removed:
+            print(f"Pruned generations {removed}")
+        return generation
     
-    def _generate_mock_brain_teaser(self) -> tuple[str, str]:
-        """Generate a mock brain teaser with question and answer"""
-        teasers = [
-            (
-                "I speak without a mouth and hear without ears. I have no body, but I come alive with wind. What am I?",
-                "An echo"
-            ),
-            (
-                "The more you take, the more you leave behind. What am I?",
-                "Footsteps"
-            ),
-            (
-                "What has keys but no locks, space but no room, and you can enter but not go in?",
-                "A keyboard"
-            ),
-            (
-                "What gets wetter as it dries?",
-                "A towel"
-            ),
-            (
-                "Forward I'm heavy, but backward I'm not. What am I?",
-                "The word 'ton'"
-            ),
-            (
-                "I have cities but no houses, forests but no trees, and rivers but no water. What am I?",
-                "A map"
-            ),
-            (
-                "What can travel around the world while staying in a corner?",
-                "A stamp"
-            ),
-            (
-                "The person who makes it doesn't want it. The person who buys it doesn't use it. The person who uses it doesn't know it. What is it?",
-                "A coffin"
-            ),
-            (
-                "What has a head and a tail, but no body?",
-                "A coin"
-            ),
-            (
-                "If you have me, you want to share me. If you share me, you don't have me. What am I?",
-                "A secret"
-            )
-        ]
-        
-        return random.choice(teasers)
+    def _published_path(self, filename: str) -> Optional[str]:
+        """Get the path of a file in the published generation, if there is one"""
+        previous = snapshots.read_current(self.output_dir)
+        if previous is None:
+            return None
+        return os.path.join(snapshots.generation_dir(self.output_dir, previous), filename)
+    
+    def _build_search_index(self, content: Dict[str, List[Dict[str, Any]]],
+                            manifest: Dict[str, Any]) -> bytes:
+        """Update the published generation's search index with this run's content"""
+        path = self._published_path(search.INDEX_FILE)
+        index = (search.SearchIndex.load(path) if path else None) or search.SearchIndex()
+        changes = index.update(content)
+        manifest["search_index"] = {"file": search.INDEX_FILE, **changes}
+        print(f"Search index: {changes['added']} added, {changes['changed']} changed, "
+              f"{changes['removed']} removed")
+        return index.to_json()
+    
+    def _build_related(self, content: Dict[str, List[Dict[str, Any]]],
+                       manifest: Dict[str, Any]) -> bytes:
+        """Update the published generation's related-articles table with this run's content"""
+        path = self._published_path(related.RELATED_FILE)
+        table = (related.RelatedTable.load(path) if path else None) or related.RelatedTable()
+        changes = table.update(content)
+        manifest["related"] = {"file": related.RELATED_FILE, **changes}
+        print(f"Related articles: {changes['recomputed']} recomputed, {changes['patched']} patched")
+        return table.to_json()
+    
+    def rollback(self, generation: Optional[int] = None) -> int:
+        """Republish a kept generation, by default the one before the current one"""
+        current = snapshots.read_current(self.output_dir)
+        available = snapshots.list_generations(self.output_dir)
+        if generation is None:
+            older = [g for g in available if current is None or g < current]
+            if not older:
+                raise ValueError("No earlier generation to roll back to")
+            generation = older[-1]
+        elif generation not in available:
+            raise ValueError(f"Generation {generation} is not available")
+        
+        snapshots.publish_generation(self.output_dir, generation)
+        print(f"Rolled back from generation {current} to {generation}")
+        return generation
+    
+    def _generate_mock_articles(self, category: str, count: int) -> List[Dict[str, Any]]:
+        """Generate mock articles for the given category"""
+        base_id = {"tech": 1000, "health": 2000, "stocks": 3000}[category]
+        content_type = next(name for name, short in ARTICLE_CATEGORIES.items() if short == category)
+        today = datetime.now()
+        return [self.mock_item(content_type, str(base_id + i), i, today) for i in range(count)]
 
 # Main function to run the scraper
 if __name__ == "__main__":
-    scraper = ContentScraper()
-    scraper.save_all_content()
-    print("Content scraping and generation complete!")
\ No newline at end of file
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Scrape and publish DailyBytes content")
+    parser.add_argument("--rollback", nargs="?", type=int, const=-1, metavar="GENERATION",
+                        help="republish an earlier generation instead of scraping")
+    parser.add_argument("--seed", type=int, help="seed the mock sources to reproduce their content")
+    args = parser.parse_args()
+    
+    scraper = ContentScraper(seed=args.seed)
+    if args.rollback is not None:
+        scraper.rollback(None if args.rollback < 0 else args.rollback)
+    else:
+        scraper.save_all_content()
+        print("Content scraping and generation complete!")
\ No newline at end of file
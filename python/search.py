@@ -0,0 +1,304 @@
+import hashlib
+import heapq
+from bisect import bisect_left
+import json
+import math
+import re
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# File the index is persisted to inside each generation directory
+INDEX_FILE = "search_index.json"
+
+# Fields searched for each content type; the first field is the title and
+# counts twice, so title matches rank above body matches
+SEARCH_FIELDS = {
+    "tech_news": ("title", "summary", "content", "tags"),
+    "health_tips": ("title", "summary", "content", "tags"),
+    "stock_news": ("title", "summary", "content", "tags"),
+    "quotes": ("text", "author", "category"),
+    "jokes": ("text", "category"),
+    "brain_teasers": ("question", "answer", "category"),
+}
+
+STOPWORDS = frozenset(
+    "a an and are as at be but by for from has have i in is it its of on or "
+    "that the this to was what when where which who why will with you your".split()
+)
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+
+# Terms in more documents than this are too costly to scan at query time.
+# For them the index keeps, per content type, a champion list of the
+# documents where the term weighs most, and queries score only those plus
+# documents that rarer query terms already matched.
+CHAMPION_THRESHOLD = 1000
+CHAMPION_SIZE = 250
+
+
+def tokenize(text: str) -> List[str]:
+    """Split text into lowercase terms, dropping stopwords"""
+    return [t for t in TOKEN_RE.findall(text.lower()) if t not in STOPWORDS]
+
+
+def document_text(name: str, item: Dict[str, Any]) -> str:
+    """Get the searchable text of an item"""
+    parts = []
+    for position, field in enumerate(SEARCH_FIELDS[name]):
+        value = item.get(field) or ""
+        if isinstance(value, list):
+            value = " ".join(value)
+        parts.append(value)
+        if position == 0:
+            parts.append(value)
+    return "\n".join(parts)
+
+
+def _term_frequency(postings: Tuple[List[int], List[int]], doc: int) -> int:
+    """Look up a doc's tf in a posting list, which is ordered by doc number"""
+    docs, tfs = postings
+    i = bisect_left(docs, doc)
+    if i < len(docs) and docs[i] == doc:
+        return tfs[i]
+    return 0
+
+
+class SearchIndex:
+    """Inverted index with BM25 ranking over items of a snapshot.
+
+    Documents get stable numbers. Updating the index only tokenizes new or
+    changed items; replaced and removed documents are tombstoned and skipped
+    at query time until enough of them accumulate to compact the postings.
+    Document frequencies only count live documents, so an updated index
+    ranks exactly like one built from scratch.
+    """
+
+    def __init__(self):
+        # doc number -> [content type, id, text hash, length], or None if removed
+        self.docs: List[Optional[List[Any]]] = []
+        # term -> ([doc, ...], [tf, ...]), ordered by doc number
+        self.postings: Dict[str, Tuple[List[int], List[int]]] = {}
+        # term -> content type -> docs where it weighs most, for terms over CHAMPION_THRESHOLD
+        self.champions: Dict[str, Dict[str, List[int]]] = {}
+        # term -> live docs containing it
+        self.df: Dict[str, int] = {}
+        # doc number -> distinct terms, or None if removed; rebuilt from the postings on load
+        self.doc_terms: List[Optional[List[str]]] = []
+        self.by_key: Dict[Tuple[str, str], int] = {}
+        self.total_length = 0
+        self.live = 0
+
+    def update(self, content: Dict[str, List[Dict[str, Any]]]) -> Dict[str, int]:
+        """Bring the index in line with a snapshot's content"""
+        seen = set()
+        touched = set()
+        added = changed = 0
+        for name in SEARCH_FIELDS:
+            for item in content.get(name, []):
+                key = (name, item["id"])
+                if key in seen:
+                    continue
+                seen.add(key)
+                text = document_text(name, item)
+                text_hash = hashlib.sha1(text.encode("utf-8")).hexdigest()
+                doc = self.by_key.get(key)
+                if doc is not None:
+                    if self.docs[doc][2] == text_hash:
+                        continue
+                    touched.update(self._remove(doc))
+                    changed += 1
+                else:
+                    added += 1
+                touched.update(self._add(name, item["id"], text_hash, tokenize(text)))
+
+        removed = 0
+        for key in [key for key in self.by_key if key not in seen]:
+            touched.update(self._remove(self.by_key[key]))
+            removed += 1
+
+        if len(self.docs) > 2 * max(self.live, 1):
+            self.compact()
+        elif touched:
+            # The average document length moved, which reweighs every champion list
+            self._update_champions(touched.union(self.champions))
+        return {"added": added, "changed": changed, "removed": removed}
+
+    def _add(self, name: str, item_id: str, text_hash: str, terms: List[str]) -> Iterable[str]:
+        """Append a document and its postings, returning its distinct terms"""
+        doc = len(self.docs)
+        self.docs.append([name, item_id, text_hash, len(terms)])
+        self.by_key[(name, item_id)] = doc
+        self.total_length += len(terms)
+        self.live += 1
+        counts = Counter(terms)
+        for term, tf in counts.items():
+            postings = self.postings.get(term)
+            if postings is None:
+                postings = self.postings[term] = ([], [])
+            postings[0].append(doc)
+            postings[1].append(tf)
+            self.df[term] = self.df.get(term, 0) + 1
+        self.doc_terms.append(list(counts))
+        return counts.keys()
+
+    def _remove(self, doc: int) -> List[str]:
+        """Tombstone a document, returning its terms; its postings are dropped on the next compaction"""
+        name, item_id, _, length = self.docs[doc]
+        terms = self.doc_terms[doc]
+        self.docs[doc] = None
+        self.doc_terms[doc] = None
+        del self.by_key[(name, item_id)]
+        self.total_length -= length
+        self.live -= 1
+        for term in terms:
+            self.df[term] -= 1
+            if not self.df[term]:
+                del self.df[term]
+        return terms
+
+    def compact(self):
+        """Renumber live documents, drop postings of removed ones and rebuild champions"""
+        renumber = {}
+        docs = []
+        doc_terms = []
+        for old, entry in enumerate(self.docs):
+            if entry is not None:
+                renumber[old] = len(docs)
+                docs.append(entry)
+                doc_terms.append(self.doc_terms[old])
+        postings = {}
+        for term, (term_docs, tfs) in self.postings.items():
+            kept_docs = []
+            kept_tfs = []
+            for old, tf in zip(term_docs, tfs):
+                new = renumber.get(old)
+                if new is not None:
+                    kept_docs.append(new)
+                    kept_tfs.append(tf)
+            if kept_docs:
+                postings[term] = (kept_docs, kept_tfs)
+        self.docs = docs
+        self.doc_terms = doc_terms
+        self.postings = postings
+        self.by_key = {(entry[0], entry[1]): doc for doc, entry in enumerate(docs)}
+        self.champions = {}
+        self._update_champions(self.postings)
+
+    def _update_champions(self, terms: Iterable[str]):
+        """Recompute the per content type champion lists of the given terms"""
+        if not self.live:
+            self.champions = {}
+            return
+        avgdl = self.total_length / self.live
+        docs = self.docs
+        for term in terms:
+            if self.df.get(term, 0) <= CHAMPION_THRESHOLD:
+                self.champions.pop(term, None)
+                continue
+            term_docs, tfs = self.postings[term]
+            by_type: Dict[str, List[Tuple[float, str, int]]] = {}
+            for doc, tf in zip(term_docs, tfs):
+                entry = docs[doc]
+                if entry is not None:
+                    # Ties go by id rather than doc number, which depends on the update history
+                    by_type.setdefault(entry[0], []).append(
+                        (tf / (tf + K1 * (1 - B + B * entry[3] / avgdl)), entry[1], doc))
+            self.champions[term] = {name: [doc for _, _, doc in heapq.nlargest(CHAMPION_SIZE, weighted)]
+                                    for name, weighted in by_type.items()}
+
+    def search(self, query: str, limit: int = 10,
+               types: Optional[Iterable[str]] = None) -> List[Tuple[float, str, str]]:
+        """Rank documents for a query, returning (score, content type, id) best first"""
+        terms = [t for t in dict.fromkeys(tokenize(query)) if t in self.df]
+        if not terms or not self.live:
+            return []
+        allowed = set(types) if types else None
+        avgdl = self.total_length / self.live
+        docs = self.docs
+
+        def weight(tf: int, length: int) -> float:
+            return tf * (K1 + 1) / (tf + K1 * (1 - B + B * length / avgdl))
+
+        def idf(term: str) -> float:
+            df = self.df[term]
+            return math.log(1 + (self.live - df + 0.5) / (df + 0.5))
+
+        # Rare terms are scored exhaustively
+        scores: Dict[int, float] = {}
+        common = []
+        for term in terms:
+            term_docs, tfs = self.postings[term]
+            if term in self.champions:
+                common.append(term)
+                continue
+            term_idf = idf(term)
+            for doc, tf in zip(term_docs, tfs):
+                entry = docs[doc]
+                if entry is None or (allowed is not None and entry[0] not in allowed):
+                    continue
+                scores[doc] = scores.get(doc, 0.0) + term_idf * weight(tf, entry[3])
+
+        # Common terms only score what the rare terms matched plus their champions
+        if common:
+            for term in common:
+                for name, champions in self.champions[term].items():
+                    if allowed is None or name in allowed:
+                        for doc in champions:
+                            scores.setdefault(doc, 0.0)
+            for term in common:
+                term_idf = idf(term)
+                postings = self.postings[term]
+                for doc in scores:
+                    tf = _term_frequency(postings, doc)
+                    if tf:
+                        scores[doc] += term_idf * weight(tf, docs[doc][3])
+
+        # Equal scores go by content type and id, whatever the documents' numbering
+        best = heapq.nlargest(limit, scores.items(),
+                              key=lambda pair: (pair[1], docs[pair[0]][0], docs[pair[0]][1]))
+        return [(round(score, 4), docs[doc][0], docs[doc][1]) for doc, score in best]
+
+    def to_json(self) -> bytes:
+        """Serialize the index for storage next to its generation"""
+        return json.dumps({
+            "docs": self.docs,
+            "postings": self.postings,
+            "type_champions": self.champions,
+            "total_length": self.total_length,
+        }, separators=(",", ":")).encode("utf-8")
+
+    @classmethod
+    def from_json(cls, raw: bytes) -> "SearchIndex":
+        """Load an index written by to_json()"""
+        data = json.loads(raw)
+        index = cls()
+        index.docs = data["docs"]
+        index.postings = {term: (docs, tfs) for term, (docs, tfs) in data["postings"].items()}
+        index.total_length = data["total_length"]
+        index.by_key = {(entry[0], entry[1]): doc for doc, entry in enumerate(index.docs) if entry is not None}
+        index.live = len(index.by_key)
+        index.doc_terms = [[] if entry is not None else None for entry in index.docs]
+        for term, (docs, _) in index.postings.items():
+            for doc in docs:
+                if index.doc_terms[doc] is not None:
+                    index.doc_terms[doc].append(term)
+                    index.df[term] = index.df.get(term, 0) + 1
+        if "type_champions" in data:
+            index.champions = data["type_champions"]
+        else:
+            # Written before champions were kept per content type
+            index._update_champions(list(index.df))
+        return index
+
+    @classmethod
+    def load(cls, path: str) -> Optional["SearchIndex"]:
+        """Load an index from a file, or None if it is missing or unreadable"""
+        try:
+            with open(path, 'rb') as f:
+                return cls.from_json(f.read())
+        except (OSError, ValueError, KeyError):
+            return None
@@ -0,0 +1,139 @@
+import hashlib
+import json
+import os
+import shutil
+from typing import Any, Dict, List, Optional
+
+# Content types written by ContentScraper.save_all_content(), keyed by the
+# name used in the scraper and mapped to the file each one is stored in
+CONTENT_FILES = {
+    "tech_news": "tech_news.json",
+    "health_tips": "health_tips.json",
+    "stock_news": "stock_news.json",
+    "horoscopes": "horoscopes.json",
+    "quotes": "quotes.json",
+    "jokes": "jokes.json",
+    "brain_teasers": "brain_teasers.json",
+    "youtube_trending": "youtube_trending.json",
+}
+
+# Each scrape run is written to its own generation directory, and CURRENT
+# holds the number of the generation readers should use. Swapping CURRENT
+# with os.replace() publishes a whole generation at once.
+GENERATIONS_DIR = "generations"
+CURRENT_FILE = "CURRENT"
+MANIFEST_FILE = "manifest.json"
+
+
+def generation_dir(data_dir: str, generation: int) -> str:
+    """Get the directory holding a generation's files"""
+    return os.path.join(data_dir, GENERATIONS_DIR, f"{generation:08d}")
+
+
+def read_current(data_dir: str) -> Optional[int]:
+    """Get the number of the published generation, or None if there is none"""
+    try:
+        with open(os.path.join(data_dir, CURRENT_FILE), 'r') as f:
+            return int(f.read().strip())
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def read_manifest(data_dir: str, generation: int) -> Dict[str, Any]:
+    """Load the manifest of a generation"""
+    with open(os.path.join(generation_dir(data_dir, generation), MANIFEST_FILE), 'r') as f:
+        return json.load(f)
+
+
+def list_generations(data_dir: str) -> List[int]:
+    """List the complete generations on disk, oldest first"""
+    root = os.path.join(data_dir, GENERATIONS_DIR)
+    try:
+        names = os.listdir(root)
+    except FileNotFoundError:
+        return []
+    generations = []
+    for name in names:
+        if name.isdigit() and os.path.exists(os.path.join(root, name, MANIFEST_FILE)):
+            generations.append(int(name))
+    return sorted(generations)
+
+
+def sha256_bytes(data: bytes) -> str:
+    """Get the hex SHA-256 digest of some bytes"""
+    return hashlib.sha256(data).hexdigest()
+
+
+def write_file_durable(path: str, data: bytes):
+    """Write bytes to a file and flush them to disk"""
+    with open(path, 'wb') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def _fsync_dir(path: str):
+    """Flush a directory entry to disk where the platform supports it"""
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def write_generation(data_dir: str, generation: int, files: Dict[str, bytes],
+                     manifest: Dict[str, Any], links: Optional[Dict[str, str]] = None) -> str:
+    """Write a complete generation directory without publishing it.
+
+    Files go to a staging directory that is renamed into place once
+    everything, including the manifest, is on disk, so a generation directory
+    is never seen half-written. ``links`` maps file names to unchanged files
+    of an earlier generation, which are hard-linked rather than rewritten.
+    """
+    root = os.path.join(data_dir, GENERATIONS_DIR)
+    os.makedirs(root, exist_ok=True)
+    final_dir = generation_dir(data_dir, generation)
+    staging_dir = os.path.join(root, f".staging-{generation:08d}-{os.getpid()}")
+    shutil.rmtree(staging_dir, ignore_errors=True)
+    os.makedirs(staging_dir)
+
+    for filename, data in files.items():
+        write_file_durable(os.path.join(staging_dir, filename), data)
+    for filename, source in (links or {}).items():
+        try:
+            os.link(source, os.path.join(staging_dir, filename))
+        except OSError:
+            shutil.copyfile(source, os.path.join(staging_dir, filename))
+    write_file_durable(os.path.join(staging_dir, MANIFEST_FILE),
+                       json.dumps(manifest, indent=2).encode("utf-8"))
+    _fsync_dir(staging_dir)
+
+    os.rename(staging_dir, final_dir)
+    _fsync_dir(root)
+    return final_dir
+
+
+def publish_generation(data_dir: str, generation: int):
+    """Atomically point CURRENT at a generation"""
+    tmp_path = os.path.join(data_dir, f".{CURRENT_FILE}.{os.getpid()}.tmp")
+    write_file_durable(tmp_path, f"{generation}\n".encode("ascii"))
+    os.replace(tmp_path, os.path.join(data_dir, CURRENT_FILE))
+    _fsync_dir(data_dir)
+
+
+def prune_generations(data_dir: str, keep: int) -> List[int]:
+    """Delete all but the newest ``keep`` generations, never the published one"""
+    current = read_current(data_dir)
+    generations = list_generations(data_dir)
+    removed = []
+    for generation in generations[:-keep] if keep > 0 else generations:
+        if generation == current:
+            continue
+        shutil.rmtree(generation_dir(data_dir, generation), ignore_errors=True)
+        removed.append(generation)
+    return removed
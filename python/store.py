@@ -0,0 +1,339 @@
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+import metrics
+import related
+import search
+import snapshots
+from database import ContentDatabase
+from index import ContentIndex
+from models import CONTENT_MODELS
+from payloads import Payload, encode_json
+from pydantic import ValidationError
+from related import RelatedTable
+from search import SearchIndex
+from snapshots import CONTENT_FILES
+
+SNAPSHOT_CACHE = metrics.Counter("dailybytes_snapshot_cache_total",
+                                 "Lookups of values memoized on a snapshot, by result", ("result",))
+SNAPSHOT_LOAD_SECONDS = metrics.Histogram("dailybytes_snapshot_load_seconds",
+                                          "Time spent loading a new snapshot, by phase", ("phase",))
+_CACHE_HIT = SNAPSHOT_CACHE.labels("hit")
+_CACHE_MISS = SNAPSHOT_CACHE.labels("miss")
+_CACHE_EVICTED = SNAPSHOT_CACHE.labels("evicted")
+
+class Snapshot:
+    """An immutable, fully parsed copy of all content at one point in time"""
+
+    # Values memoized by cached() before the least recently used is evicted,
+    # so request parameters can't grow a snapshot's memory without limit
+    MAX_CACHED = 1024
+
+    def __init__(self, generation: int, data: Dict[str, List[Dict[str, Any]]],
+                 updated_at: Optional[str] = None, directory: Optional[str] = None,
+                 manifest: Optional[Dict[str, Any]] = None):
+        self.generation = generation
+        self.data = data
+        self.updated_at = updated_at
+        self.directory = directory
+        self.manifest = manifest or {}
+        self.loaded_at = time.time()
+        # Lookup tables and encodings, one per content type at most, kept as
+        # long as the snapshot
+        self._structures: Dict[Hashable, Any] = {}
+        # Values keyed by request parameters, least recently used first
+        self._cache: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+
+    def cached(self, key: Hashable, build: Callable[[], Any]) -> Any:
+        """Get a value derived from this snapshot for some request, building it on first use.
+
+        Since a snapshot never changes, values need no invalidation; past
+        MAX_CACHED, the least recently used one is evicted. Two threads may
+        race to build the same value; both results are equal, so the last
+        one wins.
+        """
+        with self._cache_lock:
+            try:
+                value = self._cache[key]
+                self._cache.move_to_end(key)
+                _CACHE_HIT.inc()
+                return value
+            except KeyError:
+                pass
+        _CACHE_MISS.inc()
+        value = build()
+        with self._cache_lock:
+            self._cache[key] = value
+            if len(self._cache) > self.MAX_CACHED:
+                self._cache.popitem(last=False)
+                _CACHE_EVICTED.inc()
+        return value
+
+    def structure(self, key: Hashable, build: Callable[[], Any]) -> Any:
+        """Get a structure built once per snapshot, such as an index.
+
+        Never evicted, so ``key`` must come from a fixed set rather than from
+        request parameters. If two threads race to build it, both get the one
+        stored first.
+        """
+        try:
+            return self._structures[key]
+        except KeyError:
+            return self._structures.setdefault(key, build())
+
+    def get(self, name: str) -> List[Dict[str, Any]]:
+        """Get the items for a content type"""
+        return self.data.get(name, [])
+
+    def encoded(self, name: str, fields: Optional[Tuple[str, ...]] = None) -> List[bytes]:
+        """Get each item of a content type as JSON bytes, encoded once per snapshot.
+
+        With ``fields``, each item is projected to just those keys first.
+        """
+        if fields is None:
+            return self.structure(("encoded", name), lambda: [encode_json(item) for item in self.get(name)])
+        return self.cached(("encoded", name, fields), lambda: [
+            encode_json({field: item.get(field) for field in fields}) for item in self.get(name)
+        ])
+
+    def digest(self, name: str) -> Optional[str]:
+        """Get the manifest checksum of a content type's file"""
+        return self.manifest.get("files", {}).get(name, {}).get("sha256")
+
+    def inherit(self, previous: "Snapshot", names: List[str]):
+        """Reuse the per-item encodings of content types unchanged since ``previous``"""
+        for name in names:
+            key = ("encoded", name)
+            if key in previous._structures:
+                self._structures[key] = previous._structures[key]
+
+    def index(self) -> ContentIndex:
+        """Get the id and sign lookup tables for this snapshot"""
+        return self.structure("index", lambda: ContentIndex(self.data))
+
+    def search_index(self) -> SearchIndex:
+        """Get the search index written with this generation, or build one if it has none"""
+        def build() -> SearchIndex:
+            index = None
+            if self.directory is not None:
+                index = SearchIndex.load(os.path.join(self.directory, search.INDEX_FILE))
+            if index is None:
+                index = SearchIndex()
+                index.update(self.data)
+            return index
+
+        return self.structure("search", build)
+
+    def related(self) -> RelatedTable:
+        """Get the related-articles table written with this generation, or build one"""
+        def build() -> RelatedTable:
+            table = None
+            if self.directory is not None:
+                table = RelatedTable.load(os.path.join(self.directory, related.RELATED_FILE))
+            if table is None:
+                table = RelatedTable()
+                table.update(self.data)
+            return table
+
+        return self.structure("related", build)
+
+    def item_payload(self, name: str, position: int) -> Payload:
+        """Get a single serialized item with its ETag"""
+        return self.cached(("item", name, position), lambda: Payload(self.encoded(name)[position]))
+
+    def is_complete(self) -> bool:
+        """Check whether every content type has at least one item"""
+        return all(self.data.get(name) for name in CONTENT_FILES)
+
+
+class ContentStore:
+    """Process-wide in-memory cache of the scraper output.
+
+    Files are parsed once per snapshot and served from memory afterwards. The
+    CURRENT pointer is stat'ed at most once every ``check_interval`` seconds,
+    so the hot path does no file I/O and no JSON parsing between checks. A hit
+    is an access served without touching the disk, a miss is one that had to
+    check the pointer, and a reload is a miss that found a new generation.
+
+    A new generation is read, validated and indexed by load(), which never
+    runs on the caller of current(): the refresh thread calls it after
+    publishing, and a pointer change noticed by current() starts it on a
+    background thread. Requests keep getting the previous snapshot until the
+    new one is swapped in whole.
+
+    With a ``db``, the generation named by the pointer is read from SQLite
+    instead of from its directory.
+    """
+
+    def __init__(self, data_dir: str, check_interval: float = 1.0,
+                 db: Optional[ContentDatabase] = None):
+        self.data_dir = data_dir
+        self.db = db
+        self.check_interval = check_interval
+        self.hits = 0
+        self.misses = 0
+        self.reloads = 0
+        self._lock = threading.Lock()
+        # Held for a whole load, so loads run one at a time without holding up current()
+        self._load_lock = threading.Lock()
+        self._loading = False
+        self._snapshot = Snapshot(0, {})
+        self._signature: Optional[Tuple[int, int, int]] = None
+        self._next_check = 0.0
+        self._stale = True
+
+    def current(self) -> Snapshot:
+        """Get the current snapshot, starting a background load if the files changed"""
+        now = time.monotonic()
+        if now < self._next_check:
+            self.hits += 1
+            return self._snapshot
+
+        with self._lock:
+            if now >= self._next_check:
+                self._next_check = now + self.check_interval
+                self.misses += 1
+                if not self._loading and (self._stale or self._read_signature() != self._signature):
+                    self._loading = True
+                    threading.Thread(target=self._load_in_background, name="store-load", daemon=True).start()
+            else:
+                self.hits += 1
+            return self._snapshot
+
+    def get(self, name: str) -> List[Dict[str, Any]]:
+        """Get the items for a content type from the current snapshot"""
+        return self.current().get(name)
+
+    def invalidate(self):
+        """Force the next access to check the files for changes"""
+        with self._lock:
+            self._next_check = 0.0
+            self._stale = True
+
+    def load(self) -> Snapshot:
+        """Load the published generation, if it isn't being served yet, and swap it in.
+
+        Blocks while the generation is read, validated and indexed, so call it
+        off the event loop. Returns the snapshot served afterwards.
+        """
+        with self._load_lock:
+            with self._lock:
+                self._stale = False
+            signature = self._read_signature()
+            snapshot = self._load(self._snapshot)
+            with self._lock:
+                self._signature = signature
+                if snapshot is not None:
+                    self._snapshot = snapshot
+                    self.reloads += 1
+                return self._snapshot
+
+    def stats(self) -> Dict[str, Any]:
+        """Get cache counters and details about the current snapshot"""
+        snapshot = self.current()
+        return {
+            "generation": snapshot.generation,
+            "updated_at": snapshot.updated_at,
+            "hits": self.hits,
+            "misses": self.misses,
+            "reloads": self.reloads,
+        }
+
+    def _load_in_background(self):
+        try:
+            self.load()
+        except Exception as e:
+            print(f"Failed to load the published generation: {e}")
+        finally:
+            self._loading = False
+
+    def _read_signature(self) -> Optional[Tuple[int, int, int]]:
+        """Get the (inode, mtime, size) of the CURRENT pointer, or None if missing"""
+        try:
+            st = os.stat(os.path.join(self.data_dir, snapshots.CURRENT_FILE))
+        except FileNotFoundError:
+            return None
+        return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+    def _load(self, previous: Snapshot) -> Optional[Snapshot]:
+        """Parse the published generation into a new snapshot, or None to keep ``previous``.
+
+        If the generation cannot be read or fails its manifest checks, the
+        previous snapshot keeps being served. Content types whose checksum
+        matches the previous snapshot reuse its validated items and encodings
+        instead of being read and validated again.
+        """
+        generation = snapshots.read_current(self.data_dir)
+        if generation is None or generation == previous.generation:
+            return None
+
+        started = time.perf_counter()
+        try:
+            if self.db is not None:
+                manifest, raw_data = self.db.load_generation(generation)
+            else:
+                manifest, raw_data = self._read_generation(generation, previous)
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Failed to load generation {generation}: {e}")
+            return None
+
+        read = time.perf_counter()
+        SNAPSHOT_LOAD_SECONDS.labels("read").observe(read - started)
+
+        snapshot = Snapshot(generation, {}, manifest.get("created"),
+                            snapshots.generation_dir(self.data_dir, generation), manifest)
+        unchanged = [name for name in manifest["files"]
+                     if name in previous.data and snapshot.digest(name) == previous.digest(name)]
+        for name in manifest["files"]:
+            if name in unchanged:
+                snapshot.data[name] = previous.data[name]
+            else:
+                snapshot.data[name] = self._validate(name, raw_data[name])
+        snapshot.inherit(previous, unchanged)
+        validated = time.perf_counter()
+        SNAPSHOT_LOAD_SECONDS.labels("validate").observe(validated - read)
+        # Build the lookup tables here rather than on the first request
+        snapshot.index()
+        SNAPSHOT_LOAD_SECONDS.labels("index").observe(time.perf_counter() - validated)
+        return snapshot
+
+    def _read_generation(self, generation: int, previous: Optional[Snapshot] = None
+                         ) -> Tuple[Dict[str, Any], Dict[str, List[Dict[str, Any]]]]:
+        """Read a generation's manifest and files, checking them against the manifest.
+
+        Files with the same checksum as in ``previous`` are not read.
+        """
+        manifest = snapshots.read_manifest(self.data_dir, generation)
+        directory = snapshots.generation_dir(self.data_dir, generation)
+        data = {}
+        for name, entry in manifest["files"].items():
+            if previous is not None and name in previous.data and previous.digest(name) == entry["sha256"]:
+                continue
+            with open(os.path.join(directory, entry["file"]), 'rb') as f:
+                raw = f.read()
+            if snapshots.sha256_bytes(raw) != entry["sha256"]:
+                raise ValueError(f"checksum mismatch for {entry['file']}")
+            data[name] = json.loads(raw)
+        return manifest, data
+
+    def _validate(self, name: str, items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Check items against their response model once, so requests can skip it.
+
+        Items come back normalized to exactly what the model would serialize,
+        and any that don't fit the model are dropped.
+        """
+        model = CONTENT_MODELS.get(name)
+        if model is None:
+            return items
+        valid = []
+        for item in items:
+            try:
+                valid.append(model.model_validate(item).model_dump(mode="json"))
+            except ValidationError as e:
+                print(f"Dropping invalid {name} item {item.get('id')!r}: {e.error_count()} errors")
+        return valid
@@ -0,0 +1,41 @@
+import json
+import shutil
+import tempfile
+import unittest
+from datetime import datetime, timedelta, timezone
+
+from archive import ContentArchive, parse_bound
+
+
+class ParseBoundTest(unittest.TestCase):
+    def test_bare_date_covers_whole_day_as_upper_bound(self):
+        self.assertEqual(parse_bound("2024-01-10"), datetime(2024, 1, 10))
+        self.assertEqual(parse_bound("2024-01-10", end=True), datetime(2024, 1, 10, 23, 59, 59, 999999))
+
+    def test_offset_is_converted_to_local_time(self):
+        instant = datetime(2024, 1, 10, 12, 0, tzinfo=timezone(timedelta(hours=5)))
+        expected = instant.astimezone().replace(tzinfo=None)
+        self.assertEqual(parse_bound("2024-01-10T12:00:00+05:00"), expected)
+        self.assertEqual(parse_bound("2024-01-10T07:00:00Z"), expected)
+        self.assertEqual(parse_bound("2024-01-10T12:00:00"), datetime(2024, 1, 10, 12, 0))
+
+
+class ContentArchiveTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.archive = ContentArchive(self.directory)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_query_with_utc_bounds_finds_records_archived_now(self):
+        self.archive.append(1, {"quotes": [{"id": "1", "text": "Hi"}]}, {"quotes": {"added": ["1"]}})
+        now = datetime.now(timezone.utc)
+        start = parse_bound((now - timedelta(minutes=1)).isoformat())
+        end = parse_bound((now + timedelta(minutes=1)).isoformat())
+        records = [json.loads(line) for line in self.archive.query(["quotes"], start, end)]
+        self.assertEqual([(r["change"], r["item"]["id"]) for r in records], [("added", "1")])
+
+
+if __name__ == "__main__":
+    unittest.main()
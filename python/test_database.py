@@ -0,0 +1,84 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+
+from database import ContentDatabase
+from scraper import item_hash
+
+
+def article(item_id, tags, date="2024-01-01", title="Title"):
+    return {"id": item_id, "title": title, "tags": tags, "date": date}
+
+
+def manifest(content, created=None):
+    return {
+        "created": created or datetime.now().isoformat(),
+        "files": {name: {"count": len(items), "items": {item["id"]: item_hash(item) for item in items}}
+                  for name, items in content.items()},
+    }
+
+
+class ContentDatabaseTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "content.db")
+        self.db = ContentDatabase(self.path)
+
+    def tearDown(self):
+        self.db.close()
+        shutil.rmtree(self.directory)
+
+    def write(self, generation, content, created=None):
+        self.db.write_generation(generation, manifest(content, created), content)
+
+    def stored_rows(self):
+        with sqlite3.connect(self.path) as conn:
+            return conn.execute("SELECT COUNT(*) FROM items").fetchone()[0]
+
+    def test_filters_apply_to_newest_version(self):
+        self.write(1, {"tech_news": [article("1", ["AI"]), article("2", ["AI"])]})
+        self.write(2, {"tech_news": [article("1", ["Cloud"]), article("2", ["AI"], date="2024-02-01")]})
+        self.assertEqual([item["id"] for item in self.db.query(tag="AI")], ["2"])
+        self.assertEqual(self.db.query(tag="Cloud"), [article("1", ["Cloud"])])
+        self.assertEqual([item["id"] for item in self.db.query(until="2024-01-15")], ["1"])
+        self.assertEqual(self.db.query(category="quotes"), [])
+
+    def test_removed_items_stay_in_history(self):
+        self.write(1, {"tech_news": [article("1", ["AI"]), article("2", ["AI"])]})
+        self.write(2, {"tech_news": [article("2", ["AI"])]})
+        self.assertEqual(sorted(item["id"] for item in self.db.query(tag="AI")), ["1", "2"])
+
+    def test_stores_only_changed_items(self):
+        first = {"tech_news": [article(str(i), ["AI"]) for i in range(50)]}
+        self.write(1, first)
+        second = {"tech_news": [article("0", ["AI"], title="Changed")] + first["tech_news"][1:]}
+        self.write(2, second)
+        self.assertEqual(self.stored_rows(), 51)
+        self.assertEqual(self.db.load_generation(1)[1], first)
+        self.assertEqual(self.db.load_generation(2)[1], second)
+
+    def test_republished_version_is_newest(self):
+        first = {"tech_news": [article("1", ["AI"])]}
+        self.write(1, first)
+        self.write(2, {"tech_news": [article("1", ["Cloud"])]})
+        self.write(3, first)
+        self.assertEqual(self.db.query(tag="AI"), first["tech_news"])
+        self.assertEqual(self.db.query(tag="Cloud"), [])
+        self.assertEqual(self.db.load_generation(3)[1], first)
+
+    def test_prunes_versions_older_than_history(self):
+        old = (datetime.now() - timedelta(days=self.db.history_days + 1)).isoformat()
+        self.write(1, {"tech_news": [article("1", ["AI"]), article("2", ["AI"])]}, created=old)
+        latest = {"tech_news": [article("1", ["Cloud"]), article("2", ["AI"])]}
+        self.write(2, latest)
+        self.assertEqual(self.stored_rows(), 2)
+        self.assertEqual(self.db.load_generation(2)[1], latest)
+        with self.assertRaises(KeyError):
+            self.db.load_generation(1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,92 @@
+import contextlib
+import io
+import os
+import shutil
+import tempfile
+import unittest
+
+import snapshots
+from dedup import DEDUP_FILE, NearDuplicateFilter
+from scraper import SOURCES, ContentScraper
+
+BODY = ("Markets rallied on Tuesday as investors weighed fresh inflation data from the Labor Department. "
+        "Bond yields slipped while technology shares led the gains, and analysts said the figures made a "
+        "pause in rate rises more likely at the central bank's next meeting later this month.")
+
+
+def article(item_id, title="Stocks rally on inflation data", source="bloomberg.com", date="2024-01-01",
+            body=BODY):
+    return {"id": item_id, "title": title, "summary": "", "content": body, "source": source, "date": date}
+
+
+class NearDuplicateFilterTest(unittest.TestCase):
+    def setUp(self):
+        self.state_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.state_dir)
+
+    def run_filter(self, items):
+        dedup = NearDuplicateFilter(self.state_dir)
+        content, dropped = dedup.filter({"stock_news": items})
+        dedup.save()
+        return [item["id"] for item in content["stock_news"]], dropped
+
+    def test_drops_story_republished_under_new_id(self):
+        self.run_filter([article("1")])
+        kept, dropped = self.run_filter([article("2", "Stocks rally after inflation data")])
+        self.assertEqual(kept, [])
+        self.assertEqual(dropped, [{"id": "2", "category": "stock_news", "duplicate_of": "1"}])
+
+    def test_keeps_items_listed_together(self):
+        kept, dropped = self.run_filter([article("1"), article("2")])
+        self.assertEqual(kept, ["1", "2"])
+        self.assertEqual(dropped, [])
+
+    def test_keeps_same_text_from_other_source_or_day(self):
+        self.run_filter([article("1")])
+        kept, _ = self.run_filter([article("2", source="cnbc.com"), article("3", date="2024-01-02")])
+        self.assertEqual(kept, ["2", "3"])
+
+    def test_refreshes_relisted_id(self):
+        self.run_filter([article("1")])
+        other = article("2", "Bonds slide", body="Treasury prices fell sharply after a weak auction.")
+        kept, _ = self.run_filter([article("1"), other])
+        self.assertEqual(kept, ["1", "2"])
+
+
+class ScraperDedupTest(unittest.TestCase):
+    def setUp(self):
+        self.output_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.output_dir)
+
+    def scrape(self, scraper):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return scraper.save_all_content()
+
+    def test_mock_scrape_keeps_every_id(self):
+        for seed in range(8):
+            scraper = ContentScraper(self.output_dir, archive=False, seed=seed)
+            generation = self.scrape(scraper)
+            scraper.fetcher.close()
+            manifest = snapshots.read_manifest(self.output_dir, generation)
+            for name in ("tech_news", "health_tips", "stock_news"):
+                self.assertEqual(manifest["files"][name]["count"], 10, f"seed {seed} {name}")
+                self.assertNotIn("duplicates", scraper.last_report[name])
+
+    def test_saves_fingerprints_only_for_new_generation(self):
+        scraper = ContentScraper(self.output_dir, archive=False, seed=1)
+        self.addCleanup(scraper.fetcher.close)
+        self.scrape(scraper)
+        path = os.path.join(self.output_dir, DEDUP_FILE)
+        os.remove(path)
+        for method in SOURCES.values():
+            setattr(scraper, method, lambda: None)
+        self.scrape(scraper)
+        self.assertFalse(os.path.exists(path))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,133 @@
+import asyncio
+import contextlib
+import io
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+import snapshots
+from events import EventBroadcaster
+
+# Longest a test waits for an event, in seconds
+TIMEOUT = 5.0
+
+
+def parse(chunk):
+    """Decode the events of a chunk as (event, data, id), skipping comments and retry hints"""
+    events = []
+    for block in chunk.decode("utf-8").split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.splitlines() if line and not line.startswith(":"))
+        if "event" in fields:
+            events.append((fields["event"], json.loads(fields["data"]), fields.get("id")))
+    return events
+
+
+class EventBroadcasterTest(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.data_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.data_dir)
+
+    async def asyncTearDown(self):
+        if self.broadcaster._task is not None:
+            self.broadcaster._task.cancel()
+
+    def publish(self, *generations):
+        for generation in generations:
+            manifest = {"created": f"2024-01-{generation:02d}T00:00:00",
+                        "changes": {"quotes": {"added": [str(generation)]}}}
+            if not os.path.isdir(snapshots.generation_dir(self.data_dir, generation)):
+                snapshots.write_generation(self.data_dir, generation, {}, manifest)
+            snapshots.publish_generation(self.data_dir, generation)
+
+    async def start(self, history=8):
+        """Start a broadcaster and wait until it has loaded the generations published so far"""
+        self.broadcaster = EventBroadcaster(self.data_dir, history=history, poll_interval=0.01,
+                                            heartbeat_interval=60)
+        self.broadcaster.start()
+        await asyncio.wait_for(self.broadcaster._ready.wait(), TIMEOUT)
+
+    async def caught_up(self, generation):
+        """Wait until the broadcaster has seen CURRENT move to a generation"""
+        async def seen():
+            while self.broadcaster._current != generation:
+                await asyncio.sleep(0.005)
+        await asyncio.wait_for(seen(), TIMEOUT)
+
+    def connect(self, last_event_id=None):
+        stream = self.broadcaster.stream(last_event_id)
+        self.addAsyncCleanup(stream.aclose)
+        return stream
+
+    async def listen(self, stream):
+        """Start receiving in the background once the client waits for new events"""
+        pending = asyncio.create_task(self.receive(stream))
+        await asyncio.sleep(0.05)
+        return pending
+
+    async def receive(self, stream):
+        """Get the next chunk of events, skipping the retry hint"""
+        while True:
+            events = parse(await asyncio.wait_for(stream.__anext__(), TIMEOUT))
+            if events:
+                return [(event, data.get("generation"), event_id) for event, data, event_id in events]
+
+    async def test_resumes_after_last_event_id(self):
+        self.publish(1, 2, 3)
+        await self.start()
+        stream = self.connect(last_event_id=1)
+        self.assertEqual(await self.receive(stream), [("generation", 2, "2"), ("generation", 3, "3")])
+        self.publish(4)
+        self.assertEqual(await self.receive(stream), [("generation", 4, "4")])
+
+    async def test_new_client_gets_only_new_generations(self):
+        self.publish(1, 2)
+        await self.start()
+        pending = await self.listen(self.connect())
+        self.publish(3)
+        self.assertEqual(await pending, [("generation", 3, "3")])
+
+    async def test_up_to_date_client_waits_for_next_generation(self):
+        self.publish(1, 2)
+        await self.start()
+        pending = await self.listen(self.connect(last_event_id=2))
+        self.publish(3)
+        self.assertEqual(await pending, [("generation", 3, "3")])
+
+    async def test_resets_client_older_than_the_buffer(self):
+        self.publish(1, 2, 3, 4, 5)
+        await self.start(history=2)
+        self.assertEqual(await self.receive(self.connect(last_event_id=1)), [("reset", 5, None)])
+        self.assertEqual(await self.receive(self.connect(last_event_id=3)),
+                         [("generation", 4, "4"), ("generation", 5, "5")])
+
+    async def test_resets_client_that_falls_behind_while_connected(self):
+        self.publish(1)
+        await self.start(history=2)
+        stream = self.connect(last_event_id=0)
+        self.assertEqual(await self.receive(stream), [("generation", 1, "1")])
+        self.publish(2, 3, 4)
+        await self.caught_up(4)
+        self.assertEqual(await self.receive(stream), [("reset", 4, None)])
+
+    async def test_resets_client_when_history_cannot_be_loaded(self):
+        # The generations directory can't be listed
+        with open(os.path.join(self.data_dir, snapshots.GENERATIONS_DIR), 'w'):
+            pass
+        with open(os.path.join(self.data_dir, snapshots.CURRENT_FILE), 'w') as f:
+            f.write("1\n")
+        with contextlib.redirect_stdout(io.StringIO()):
+            await self.start()
+        self.assertEqual(await self.receive(self.connect(last_event_id=1)), [("reset", None, None)])
+
+    async def test_rollback_is_announced_without_an_id(self):
+        self.publish(1, 2)
+        await self.start()
+        pending = await self.listen(self.connect(last_event_id=2))
+        self.publish(1)
+        self.assertEqual(await pending, [("rollback", 1, None)])
+
+
+if __name__ == "__main__":
+    unittest.main()
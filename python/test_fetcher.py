@@ -0,0 +1,121 @@
+import http.server
+import shutil
+import tempfile
+import threading
+import unittest
+
+from fetcher import MAX_DRAIN, Fetcher
+
+LARGE_BODY = b"x" * (MAX_DRAIN * 8)
+
+
+class StubHandler(http.server.BaseHTTPRequestHandler):
+    """Serves a few fixed documents over keep-alive connections and records every request"""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self.server.requests.append((self.path, self.client_address[1], dict(self.headers)))
+        if self.path == "/feed":
+            if self.headers.get("If-None-Match") == '"v1"':
+                self.send_response(304)
+                self.send_header("ETag", '"v1"')
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            self.reply(b"<rss><item>one</item><item>two</item></rss>",
+                       {"ETag": '"v1"', "Cache-Control": "max-age=0"})
+        elif self.path == "/large":
+            self.reply(LARGE_BODY, {"Cache-Control": "no-store"})
+        elif self.path == "/small":
+            self.reply(b"y" * 1024, {"Cache-Control": "no-store"})
+        elif self.path == "/moved":
+            self.reply(b"moved", {"Location": "/small"}, status=301)
+        elif self.path == "/moved-large":
+            self.reply(LARGE_BODY, {"Location": "/small"}, status=302)
+        else:
+            self.reply(b"missing", status=404)
+
+    def reply(self, body, headers=None, status=200):
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class FetcherTest(unittest.TestCase):
+    def setUp(self):
+        self.server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+        self.server.requests = []
+        threading.Thread(target=self.server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True).start()
+        self.base = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self.cache_dir = tempfile.mkdtemp()
+        self.fetcher = Fetcher(self.cache_dir, rate=0)
+
+    def tearDown(self):
+        self.fetcher.close()
+        self.server.shutdown()
+        self.server.server_close()
+        shutil.rmtree(self.cache_dir)
+
+    def ports(self):
+        """Client ports of the requests the server got, one per connection used"""
+        return [port for _, port, _ in self.server.requests]
+
+    def test_reuses_kept_alive_connection(self):
+        for _ in range(3):
+            self.assertEqual(len(self.fetcher.get(self.base + "/small").body), 1024)
+        self.assertEqual(len(self.server.requests), 3)
+        self.assertEqual(len(set(self.ports())), 1)
+
+    def test_revalidates_cached_response(self):
+        first = self.fetcher.get(self.base + "/feed")
+        second = self.fetcher.get(self.base + "/feed")
+        self.assertFalse(first.from_cache)
+        self.assertEqual(second.status, 200)
+        self.assertTrue(second.from_cache)
+        self.assertEqual(second.body, first.body)
+        self.assertEqual(self.fetcher.not_modified, 1)
+        self.assertEqual(self.server.requests[1][2].get("If-None-Match"), '"v1"')
+
+    def test_passes_caller_conditional_through(self):
+        self.fetcher.get(self.base + "/feed")
+        response = self.fetcher.get(self.base + "/feed", headers={"If-None-Match": '"v1"'})
+        self.assertTrue(response.not_modified)
+        self.assertFalse(response.from_cache)
+        self.assertEqual(response.body, b"")
+
+    def test_closes_connection_left_with_large_body(self):
+        with self.fetcher.stream(self.base + "/large") as (status, _, body):
+            self.assertEqual(status, 200)
+            body.read(16)
+        self.fetcher.get(self.base + "/small")
+        self.assertNotEqual(self.ports()[0], self.ports()[1])
+
+    def test_drains_small_remainder_to_reuse_connection(self):
+        with self.fetcher.stream(self.base + "/small") as (_, _, body):
+            body.read(16)
+        self.fetcher.get(self.base + "/small")
+        self.assertEqual(self.ports()[0], self.ports()[1])
+
+    def test_follows_redirect_on_same_connection(self):
+        self.assertEqual(len(self.fetcher.get(self.base + "/moved").body), 1024)
+        self.assertEqual([path for path, _, _ in self.server.requests], ["/moved", "/small"])
+        self.assertEqual(self.ports()[0], self.ports()[1])
+
+    def test_closes_connection_after_redirect_with_large_body(self):
+        self.assertEqual(len(self.fetcher.get(self.base + "/moved-large").body), 1024)
+        self.assertNotEqual(self.ports()[0], self.ports()[1])
+
+    def test_iter_xml_yields_items(self):
+        items = [element.text for element in self.fetcher.iter_xml(self.base + "/feed", "item")]
+        self.assertEqual(items, ["one", "two"])
+
+
+if __name__ == "__main__":
+    unittest.main()
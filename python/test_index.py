@@ -0,0 +1,115 @@
+import random
+import unittest
+from datetime import datetime
+
+import mockdata
+from index import FACET_FIELDS, RANGE_FIELDS, ContentIndex, FacetIndex
+
+
+def brute_force(items, equals, at_most, at_least):
+    """Positions of the items matching the filters, checked one by one"""
+    def values(item, field):
+        value = item.get(field)
+        return value if isinstance(value, list) else [value]
+
+    return [
+        position for position, item in enumerate(items)
+        if all(value in values(item, field) for field, value in equals.items())
+        and all(item.get(field) is not None and item[field] <= value for field, value in at_most.items())
+        and all(item.get(field) is not None and item[field] >= value for field, value in at_least.items())
+    ]
+
+
+def brute_force_values(items, field):
+    """Every value a field takes, plus one out of range for ordered fields"""
+    values = set()
+    for item in items:
+        value = item.get(field)
+        values.update(value if isinstance(value, list) else [value])
+    values = sorted(values, key=str)
+    if field == "readTime":
+        values += [0, 100]
+    elif field == "date":
+        values += ["2000-01-01", "2099-01-01"]
+    return values
+
+
+class FacetIndexTest(unittest.TestCase):
+    def check_against_brute_force(self, name, count=500, queries=200):
+        rng = random.Random(name)
+        items = [mockdata.mock_item(rng, name, str(i), i, datetime(2024, 1, 10)) for i in range(count)]
+        fields = FACET_FIELDS[name]
+        facets = FacetIndex(items, fields)
+        for _ in range(queries):
+            equals, at_most, at_least = {}, {}, {}
+            for field in rng.sample(fields, rng.randint(1, len(fields))):
+                value = rng.choice(brute_force_values(items, field))
+                if field in RANGE_FIELDS:
+                    rng.choice([at_most, at_least])[field] = value
+                else:
+                    equals[field] = value
+            expected = brute_force(items, equals, at_most, at_least)
+            bitmap = facets.match(equals, at_most, at_least)
+            self.assertEqual(FacetIndex.positions(bitmap), expected, (equals, at_most, at_least))
+            self.assertEqual(FacetIndex.count(bitmap), len(expected))
+            counts = facets.counts(bitmap)
+            for field in fields:
+                expected_counts = {}
+                for position in expected:
+                    value = items[position].get(field)
+                    for v in value if isinstance(value, list) else [value]:
+                        expected_counts[str(v)] = expected_counts.get(str(v), 0) + 1
+                self.assertEqual(counts[field], expected_counts)
+
+    def test_articles_match_brute_force(self):
+        self.check_against_brute_force("tech_news")
+
+    def test_brain_teasers_match_brute_force(self):
+        self.check_against_brute_force("brain_teasers")
+
+    def test_videos_match_brute_force(self):
+        self.check_against_brute_force("youtube_trending")
+
+    def test_missing_value_matches_nothing(self):
+        facets = FacetIndex([{"tags": ["AI"], "date": "2024-01-01"}], ("tags", "date"))
+        self.assertEqual(facets.match({"tags": "Web3"}, {}, {}), 0)
+        self.assertEqual(facets.match({}, {"date": "2023-12-31"}, {}), 0)
+        self.assertEqual(facets.match({}, {}, {"date": "2024-01-02"}), 0)
+
+
+def articles(*ids):
+    return {"tech_news": [{"id": item_id} for item_id in ids]}
+
+
+class CursorResumeTest(unittest.TestCase):
+    def page(self, data, cursor, size=3):
+        """Ids of the page after cursor, and the cursor of its last item"""
+        items = data["tech_news"]
+        start = 0 if cursor is None else ContentIndex(data).resume("tech_news", cursor, len(items))
+        page = items[start:start + size]
+        return [item["id"] for item in page], f"{start + len(page) - 1}:{page[-1]['id']}" if page else None
+
+    def test_resumes_after_item_moved_by_republish(self):
+        _, cursor = self.page(articles("a", "b", "c", "d", "e", "f"), None)
+        self.assertEqual(cursor, "2:c")
+        republished = articles("new1", "new2", "a", "b", "c", "d", "e", "f")
+        self.assertEqual(self.page(republished, cursor)[0], ["d", "e", "f"])
+
+    def test_resumes_at_old_position_when_item_dropped(self):
+        _, cursor = self.page(articles("a", "b", "c", "d", "e", "f"), None)
+        self.assertEqual(self.page(articles("a", "b", "d", "e", "f"), cursor)[0], ["d", "e", "f"])
+        self.assertEqual(self.page(articles("x"), cursor)[0], [])
+
+    def test_ignores_same_id_in_other_type(self):
+        data = dict(articles("a", "b", "c", "d"), quotes=[{"id": "z"}])
+        self.assertEqual(self.page(data, "1:z")[0], ["b", "c", "d"])
+
+    def test_bare_id_must_be_listed(self):
+        index = ContentIndex(articles("a", "b", "c"))
+        self.assertEqual(index.resume("tech_news", "b", 3), 2)
+        self.assertIsNone(index.resume("tech_news", "gone", 3))
+        self.assertIsNone(index.resume("tech_news", "x:gone", 3))
+
+
+if __name__ == "__main__":
+    unittest.main()
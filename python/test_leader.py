@@ -0,0 +1,86 @@
+import contextlib
+import io
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import unittest
+
+import leader
+from leader import LeaderElection, RefreshSpool
+
+# Longest a test waits for an election, in seconds
+TIMEOUT = 5.0
+
+# Holds the leader lock of the data directory given as argument until stdin closes
+HOLDER = """
+import sys
+from leader import LeaderElection
+LeaderElection(sys.argv[1], on_elected=lambda: None).start()
+sys.stdin.read()
+"""
+
+
+@unittest.skipIf(leader.fcntl is None, "needs POSIX locks")
+class LeaderElectionTest(unittest.TestCase):
+    def setUp(self):
+        self.data_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.data_dir)
+
+    def hold_lock(self):
+        """Start another process that takes the leader lock first"""
+        holder = subprocess.Popen([sys.executable, "-c", HOLDER, self.data_dir], stdin=subprocess.PIPE,
+                                  stdout=subprocess.PIPE, cwd=os.path.dirname(os.path.abspath(leader.__file__)))
+        self.addCleanup(holder.wait)
+        self.addCleanup(holder.kill)
+        self.assertIn(b"elected", holder.stdout.readline())
+        return holder
+
+    def test_takes_over_when_leader_exits(self):
+        holder = self.hold_lock()
+        elected = threading.Event()
+        election = LeaderElection(self.data_dir, on_elected=elected.set, retry_interval=0.02)
+        with contextlib.redirect_stdout(io.StringIO()):
+            election.start()
+            self.assertFalse(elected.wait(0.2))
+            self.assertFalse(election.is_leader)
+            holder.stdin.close()
+            holder.wait(TIMEOUT)
+            self.assertTrue(elected.wait(TIMEOUT))
+        self.assertTrue(election.is_leader)
+        with open(os.path.join(self.data_dir, leader.LOCK_FILE)) as f:
+            self.assertIn(f'"pid": {os.getpid()}', f.read())
+
+
+class RefreshSpoolTest(unittest.TestCase):
+    def setUp(self):
+        self.data_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.data_dir)
+        self.spool = RefreshSpool(self.data_dir)
+
+    def test_leader_drains_requests_oldest_first_once(self):
+        first = self.spool.submit(["quotes"])
+        second = self.spool.submit()
+        self.assertEqual(self.spool.status(first), {"requestId": first, "status": "queued"})
+        self.assertEqual(self.spool.drain(), [(first, ["quotes"]), (second, None)])
+        self.assertEqual(self.spool.drain(), [])
+
+    def test_any_process_reads_recorded_status(self):
+        request_id = self.spool.submit(["jokes"])
+        self.spool.drain()
+        RefreshSpool(self.data_dir).record(request_id, {"requestId": request_id, "status": "running"})
+        self.assertEqual(self.spool.status(request_id)["status"], "running")
+
+    def test_rejects_ids_that_are_not_hex(self):
+        self.assertIsNone(self.spool.status("../../CURRENT"))
+
+    def test_prunes_old_status(self):
+        self.spool.record("ab", {"status": "succeeded"})
+        self.spool.prune(max_age=-1)
+        self.assertIsNone(self.spool.status("ab"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,120 @@
+import contextlib
+import io
+import threading
+import time
+import unittest
+
+from refresh import RefreshManager
+
+# Longest a test waits for a background job, in seconds
+TIMEOUT = 5.0
+
+
+class FakeScraper:
+    """Scrapes nothing, failing each source as many times as told and blocking while held"""
+
+    def __init__(self, failures=None, crash=False):
+        self.failures = dict(failures or {})
+        self.crash = crash
+        self.source_state = {}
+        self.calls = []
+        self.generation = 0
+        self.released = threading.Event()
+        self.released.set()
+        self.started = threading.Semaphore(0)
+
+    def save_all_content(self, on_source_done, sources):
+        self.calls.append(list(sources))
+        self.started.release()
+        self.released.wait(TIMEOUT)
+        if self.crash:
+            raise RuntimeError("disk full")
+        for name in sources:
+            if self.failures.get(name, 0) > 0:
+                self.failures[name] -= 1
+                on_source_done(name, {"status": "failed", "error": "boom"})
+            else:
+                on_source_done(name, {"status": "success", "items": 1})
+        self.generation += 1
+        return self.generation
+
+
+class RefreshManagerTest(unittest.TestCase):
+    def setUp(self):
+        output = contextlib.redirect_stdout(io.StringIO())
+        output.__enter__()
+        self.addCleanup(output.__exit__, None, None, None)
+
+    def manager(self, scraper, **options):
+        options.setdefault("retry_base", 0.01)
+        options.setdefault("retry_max", 0.01)
+        return RefreshManager(scraper, **options)
+
+    def finish(self, job):
+        deadline = time.monotonic() + TIMEOUT
+        while job.status not in ("succeeded", "failed"):
+            self.assertLess(time.monotonic(), deadline, "job did not finish")
+            time.sleep(0.005)
+
+    def test_retries_only_failed_sources(self):
+        scraper = FakeScraper(failures={"quotes": 2})
+        job = self.manager(scraper).trigger(["quotes", "jokes"])
+        self.assertEqual(job.wait(TIMEOUT), 1)
+        self.finish(job)
+        self.assertEqual(scraper.calls, [["quotes", "jokes"], ["quotes"], ["quotes"]])
+        self.assertEqual((job.status, job.attempts, job.generation, job.error), ("succeeded", 3, 3, None))
+
+    def test_gives_up_after_max_attempts(self):
+        scraper = FakeScraper(failures={"quotes": 5})
+        job = self.manager(scraper, max_attempts=2).trigger(["quotes"])
+        self.finish(job)
+        self.assertEqual((job.status, job.attempts), ("failed", 2))
+        self.assertEqual(job.error, "quotes: boom")
+        # The first attempt still published a generation
+        self.assertEqual(job.wait(0), 1)
+
+    def test_future_fails_when_nothing_is_published(self):
+        job = self.manager(FakeScraper(crash=True), max_attempts=2).trigger(["quotes"])
+        with self.assertRaisesRegex(RuntimeError, "disk full"):
+            job.wait(TIMEOUT)
+        self.finish(job)
+        self.assertEqual((job.status, job.attempts), ("failed", 2))
+
+    def test_triggers_join_running_job_or_merge_into_queued_one(self):
+        scraper = FakeScraper()
+        scraper.released.clear()
+        manager = self.manager(scraper)
+        running = manager.trigger(["quotes", "jokes"])
+        self.assertTrue(scraper.started.acquire(timeout=TIMEOUT))
+        self.assertIs(manager.trigger(["jokes"]), running)
+        queued = manager.trigger(["quotes", "horoscopes"])
+        self.assertIsNot(queued, running)
+        self.assertEqual(queued.status, "queued")
+        self.assertIs(manager.trigger(["tech_news"]), queued)
+        self.assertEqual(queued.targets, ["tech_news", "horoscopes", "quotes"])
+        scraper.released.set()
+        self.finish(running)
+        self.finish(queued)
+        self.assertEqual(scraper.calls, [["quotes", "jokes"], ["tech_news", "horoscopes", "quotes"]])
+        self.assertEqual([job.id for job in manager.jobs()], [queued.id, running.id])
+
+    def test_runs_disjoint_jobs_together(self):
+        scraper = FakeScraper()
+        scraper.released.clear()
+        manager = self.manager(scraper)
+        first = manager.trigger(["quotes"])
+        self.assertTrue(scraper.started.acquire(timeout=TIMEOUT))
+        second = manager.trigger(["jokes"])
+        self.assertTrue(scraper.started.acquire(timeout=TIMEOUT))
+        self.assertEqual((first.status, second.status), ("running", "running"))
+        scraper.released.set()
+        self.finish(first)
+        self.finish(second)
+
+    def test_rejects_unknown_sources(self):
+        with self.assertRaises(ValueError):
+            self.manager(FakeScraper()).trigger(["weather"])
+
+
+if __name__ == "__main__":
+    unittest.main()
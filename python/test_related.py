@@ -0,0 +1,84 @@
+import copy
+import os
+import random
+import shutil
+import tempfile
+import unittest
+from datetime import datetime
+
+import mockdata
+from index import ARTICLE_TYPES
+from related import RELATED_FILE, RelatedTable
+
+# Patched rows keep their scores against unchanged articles from the previous
+# update, while document frequencies have since moved a little
+SCORE_TOLERANCE = 0.02
+
+
+def mock_articles(rng, count, start=0):
+    today = datetime(2024, 1, 10)
+    return {name: [mockdata.mock_item(rng, name, f"{name}-{i}", i, today) for i in range(start, start + count)]
+            for name in ARTICLE_TYPES}
+
+
+def built(content):
+    table = RelatedTable()
+    table.update(content)
+    return table
+
+
+class RelatedTableTest(unittest.TestCase):
+    def setUp(self):
+        self.rng = random.Random(3)
+        self.content = mock_articles(self.rng, 300)
+
+    def change_some(self):
+        """Replace ten articles of each type by five new ones and retitle one"""
+        added = mock_articles(self.rng, 5, start=1000)
+        for name in ARTICLE_TYPES:
+            items = added[name] + self.content[name][10:]
+            items[20] = dict(items[20], title="Quantum volcano penguins")
+            self.content[name] = items
+        return {items[i]["id"] for items in self.content.values() for i in list(range(5)) + [20]}
+
+    def test_incremental_update_matches_rebuild(self):
+        table = built(self.content)
+        before = copy.deepcopy(table.neighbours)
+        changed = self.change_some()
+        live = {item["id"] for items in self.content.values() for item in items}
+        stats = table.update(self.content)
+        fresh = built(self.content)
+        self.assertGreater(stats["patched"], 0)
+        self.assertEqual(set(table.neighbours), set(fresh.neighbours))
+        for item_id, neighbours in table.neighbours.items():
+            others = [other for other, _ in neighbours]
+            self.assertTrue(set(others) <= live - {item_id}, item_id)
+            if item_id in changed or not set(o for o, _ in before.get(item_id, [])) <= live - changed:
+                self.assertEqual(neighbours, fresh.neighbours[item_id], item_id)
+            else:
+                self.assertEqual(len(neighbours), len(fresh.neighbours[item_id]), item_id)
+                for (_, score), (_, expected) in zip(neighbours, fresh.neighbours[item_id]):
+                    self.assertAlmostEqual(score, expected, delta=SCORE_TOLERANCE, msg=item_id)
+
+    def test_mostly_changed_content_is_rebuilt(self):
+        table = built(self.content)
+        self.content = mock_articles(self.rng, 200, start=2000)
+        table.update(self.content)
+        self.assertEqual(table.neighbours, built(self.content).neighbours)
+
+    def test_loaded_table_updates_like_the_original(self):
+        table = built(self.content)
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, RELATED_FILE)
+        with open(path, 'wb') as f:
+            f.write(table.to_json())
+        loaded = RelatedTable.load(path)
+        self.change_some()
+        table.update(self.content)
+        loaded.update(self.content)
+        self.assertEqual(loaded.neighbours, table.neighbours)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,122 @@
+import contextlib
+import http.server
+import io
+import json
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+import snapshots
+from fetcher import Fetcher
+from scraper import SOURCE_STATE_FILE, ContentScraper
+
+FEED = [{"id": "t1", "title": "One", "summary": "", "content": "", "source": "example.com",
+         "date": "2024-01-10", "readTime": 3, "tags": [], "imageUrl": ""}]
+
+
+class FeedHandler(http.server.BaseHTTPRequestHandler):
+    """Serves one JSON feed with an ETag and answers matching conditionals with 304"""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self.server.conditionals.append(self.headers.get("If-None-Match"))
+        if self.headers.get("If-None-Match") == '"v1"':
+            self.send_response(304)
+            self.send_header("ETag", '"v1"')
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        body = json.dumps(FEED).encode("utf-8")
+        self.send_response(200)
+        self.send_header("ETag", '"v1"')
+        self.send_header("Cache-Control", "no-store")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class IncrementalScrapeTest(unittest.TestCase):
+    def setUp(self):
+        self.output_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.output_dir)
+        fetcher = Fetcher(os.path.join(self.output_dir, "http_cache"), rate=0)
+        self.addCleanup(fetcher.close)
+        self.scraper = ContentScraper(self.output_dir, archive=False, deduplicate=False, seed=1, fetcher=fetcher)
+
+    def scrape(self, **options):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return self.scraper.save_all_content(**options)
+
+    def published_file(self, generation, name):
+        manifest = snapshots.read_manifest(self.output_dir, generation)
+        return os.path.join(snapshots.generation_dir(self.output_dir, generation), manifest["files"][name]["file"])
+
+    def serve_feed(self):
+        server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), FeedHandler)
+        server.conditionals = []
+        threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        url = f"http://127.0.0.1:{server.server_address[1]}/feed"
+
+        def scrape_tech_news():
+            response = self.scraper.fetch_source(url)
+            return None if response is None else json.loads(response.body)
+
+        return server, scrape_tech_news
+
+    def test_unchanged_scrape_publishes_nothing(self):
+        first = self.scrape()
+        self.assertEqual(self.scrape(), first)
+        self.assertEqual(snapshots.list_generations(self.output_dir), [first])
+
+    def test_writes_only_changed_content(self):
+        first = self.scrape()
+        self.scraper.seed = 2
+        second = self.scrape(sources=["quotes"])
+        self.assertEqual(second, first + 1)
+        self.assertEqual(list(self.scraper.last_changes), ["quotes"])
+        self.assertFalse(os.path.samefile(self.published_file(first, "quotes"),
+                                          self.published_file(second, "quotes")))
+        for name in ("tech_news", "jokes", "youtube_trending"):
+            self.assertTrue(os.path.samefile(self.published_file(first, name),
+                                             self.published_file(second, name)), name)
+
+    def test_not_modified_source_keeps_published_items(self):
+        server, scrape_tech_news = self.serve_feed()
+        self.scraper.scrape_tech_news = scrape_tech_news
+        first = self.scrape(sources=["tech_news"])
+        self.assertEqual(self.scraper.source_state["tech_news"]["etag"], '"v1"')
+        second = self.scrape(sources=["tech_news"])
+        self.assertEqual(server.conditionals, [None, '"v1"'])
+        self.assertEqual(self.scraper.last_report["tech_news"]["status"], "unchanged")
+        self.assertEqual(second, first)
+        with open(self.published_file(second, "tech_news")) as f:
+            self.assertEqual(json.load(f), FEED)
+
+    def test_keeps_validators_of_unpublished_content(self):
+        server, scrape_tech_news = self.serve_feed()
+        self.scraper.scrape_tech_news = scrape_tech_news
+
+        def fail(*args):
+            raise OSError("disk full")
+
+        self.scraper.publish = fail
+        with self.assertRaises(OSError):
+            self.scrape(sources=["tech_news"])
+        self.assertNotIn("tech_news", self.scraper.source_state)
+        self.assertFalse(os.path.exists(os.path.join(self.output_dir, SOURCE_STATE_FILE)))
+        # The next run fetches the feed again instead of getting a 304
+        del self.scraper.publish
+        self.scrape(sources=["tech_news"])
+        self.assertEqual(server.conditionals, [None, None])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,68 @@
+import random
+import unittest
+from datetime import datetime
+
+import mockdata
+from search import CHAMPION_SIZE, CHAMPION_THRESHOLD, SEARCH_FIELDS, SearchIndex
+
+QUERIES = ["success courage", "penguin", "market volatility", "lorem ai", "towel echo", "investing", "ipsum"]
+TYPE_FILTERS = [None, ["quotes"], ["tech_news"], ["jokes", "brain_teasers"]]
+
+
+def mock_content(rng, count, start=0):
+    today = datetime(2024, 1, 10)
+    return {name: [mockdata.mock_item(rng, name, f"{name}-{i}", i, today) for i in range(start, start + count)]
+            for name in SEARCH_FIELDS}
+
+
+def built(content):
+    index = SearchIndex()
+    index.update(content)
+    return index
+
+
+class SearchIndexTest(unittest.TestCase):
+    def assert_same_results(self, index, content):
+        fresh = built(content)
+        for query in QUERIES:
+            for types in TYPE_FILTERS:
+                self.assertEqual(index.search(query, 10, types), fresh.search(query, 10, types), (query, types))
+
+    def test_incremental_update_matches_rebuild(self):
+        rng = random.Random(1)
+        content = mock_content(rng, 2000)
+        index = SearchIndex.from_json(built(content).to_json())
+        # Replace 300 items of each type, remove 100 and add 100 new ones
+        replaced = mock_content(rng, 300)
+        added = mock_content(rng, 100, start=5000)
+        for name in content:
+            content[name] = replaced[name] + content[name][300:1900] + added[name]
+        index.update(content)
+        self.assertLessEqual(len(index.docs), 2 * index.live, "update compacted the index")
+        self.assert_same_results(index, content)
+        self.assert_same_results(SearchIndex.from_json(index.to_json()), content)
+
+    def test_compacted_index_matches_rebuild(self):
+        rng = random.Random(2)
+        index = built(mock_content(rng, 300))
+        content = mock_content(rng, 200, start=1000)
+        index.update(content)
+        self.assertEqual(len(index.docs), index.live)
+        self.assert_same_results(index, content)
+
+    def test_type_filter_finds_common_term_outside_champions(self):
+        content = {
+            "tech_news": [{"id": str(i), "title": "market market market", "summary": "", "content": "",
+                           "tags": []} for i in range(CHAMPION_THRESHOLD + 1)],
+            "quotes": [{"id": f"q{i}", "text": f"a long quote about the market number {i} and more words",
+                        "author": "", "category": ""} for i in range(3)],
+        }
+        index = built(content)
+        self.assertIn("market", index.champions)
+        self.assertEqual(len(index.champions["market"]["tech_news"]), CHAMPION_SIZE)
+        results = index.search("market", 10, ["quotes"])
+        self.assertEqual(sorted(item_id for _, _, item_id in results), ["q0", "q1", "q2"])
+
+
+if __name__ == "__main__":
+    unittest.main()